@@ -0,0 +1,28 @@
+"""user version
+
+Revision ID: 7d2e5b9c4f18
+Revises: a41c3e9d7b52
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2e5b9c4f18'
+down_revision: Union[str, None] = 'a41c3e9d7b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('users', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE users SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'updated_at')
+    op.drop_column('users', 'version')
@@ -0,0 +1,316 @@
+"""
+Latency percentiles and throughput of the auth, users and page routers.
+
+Boots `auth_app` (with the page router) in process against a throw-away SQLite database,
+or `--database-url` (e.g. a local PostgreSQL), seeds users and single-use tokens, and sends
+`--requests` requests per endpoint at every concurrency level of `--levels` through an
+ASGI transport, so the numbers measure the application and not a network stack.
+bcrypt-bound endpoints (login, create, bulk import, user page) run a fraction of the requests.
+
+Results are printed as a table and written as JSON with `--save`; `--baseline` compares
+p50/p99 latency and throughput with a saved run and exits with status 1 when any of them
+is more than `--threshold` worse, or when an endpoint answers more 4xx/5xx than before.
+
+	python benchmarks/api_suite.py --save baseline.json
+	python benchmarks/api_suite.py --baseline baseline.json --threshold 0.25 --save current.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = "Aa1!password"
+
+# request index -> (url, httpx request kwargs)
+RequestBuilder = Callable[[int], Tuple[str, dict]]
+
+
+class Scenario(NamedTuple):
+	name: str
+	method: str
+	build: RequestBuilder
+	share: float = 1.0
+
+
+class Fixtures(NamedTuple):
+	admin_headers: dict
+	user_headers: dict
+	user_ids: List[int]
+	deletable_ids: List[int]
+	refresh_tokens: List[str]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+	index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+	return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+	values = sorted(latencies)
+	return {
+		'requests': len(values),
+		'errors': errors,
+		'rps': round(len(values) / elapsed, 2),
+		'mean_ms': round(statistics.fmean(values) * 1000, 3),
+		'p50_ms': round(percentile(values, 0.50) * 1000, 3),
+		'p90_ms': round(percentile(values, 0.90) * 1000, 3),
+		'p99_ms': round(percentile(values, 0.99) * 1000, 3),
+		'max_ms': round(values[-1] * 1000, 3),
+	}
+
+
+def configure_environment(args: argparse.Namespace):
+	"""
+	Settings are read on import, so the environment is set before the application is imported
+	"""
+	database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'api_suite.db')}"
+	os.environ["DATABASE_URL"] = database_url
+	os.environ.setdefault("SECRET_KEY", "api-suite")
+	os.environ.setdefault("ALGORITHM", "HS256")
+	os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+	sys.argv = [sys.argv[0], "--template"]
+
+
+def seed(users: int, deletable: int, refresh_tokens: int) -> Fixtures:
+	from fastapi_auth_user.auth.hashing import pwd_context
+	from fastapi_auth_user.auth.service import AuthenticationService
+	from fastapi_auth_user.database import db_helper
+	from fastapi_auth_user.models import Role, RoleNameEnum, User
+
+	db_helper.create_all_tables()
+	db_helper.create_role_initial()
+	password = pwd_context.hash(PASSWORD)
+	with db_helper.session() as db:
+		roles = {role.name: role for role in db.query(Role).all()}
+		admin = User(username="admin", email="admin@example.com", password=password)
+		admin.roles = [roles[RoleNameEnum.ADMIN.value], roles[RoleNameEnum.USER.value]]
+		db.add(admin)
+		seeded = []
+		for number in range(users + deletable):
+			user = User(username=f"user{number}", email=f"user{number}@example.com", password=password)
+			user.roles = [roles[RoleNameEnum.USER.value]]
+			seeded.append(user)
+		db.add_all(seeded)
+		db.commit()
+
+		service = AuthenticationService(db)
+		admin_token = service.issue_tokens(admin).access_token.token
+		user_token = service.issue_tokens(seeded[0]).access_token.token
+		tokens = [service.issue_tokens(admin).refresh_token.token for _ in range(refresh_tokens)]
+		kept, doomed = seeded[:users], seeded[users:]
+		return Fixtures(
+			admin_headers={"Authorization": f"Bearer {admin_token}"},
+			user_headers={"Authorization": f"Bearer {user_token}"},
+			user_ids=[user.id for user in kept],
+				deletable_ids=[user.id for user in doomed],
+			refresh_tokens=tokens,
+		)
+
+
+def scenarios(fixtures: Fixtures, bulk_size: int) -> List[Scenario]:
+	admin, ids = fixtures.admin_headers, fixtures.user_ids
+	deletable, refresh_tokens = iter(fixtures.deletable_ids), iter(fixtures.refresh_tokens)
+	created = itertools.count()
+	# every role request targets another user, so a level never re-adds a role an earlier one added
+	role_added, role_removed = itertools.cycle(ids), itertools.cycle(ids)
+
+	def user_id(index: int) -> int:
+		return ids[index % len(ids)]
+
+	def unchanged(index: int) -> dict:
+		# ETag of a seeded user, current until the write scenarios after the GETs run
+		return dict(admin, **{"If-None-Match": f'W/"{user_id(index)}-1"'})
+
+	def new_user(index: int) -> dict:
+		number = next(created)
+		return {"username": f"bench{number}", "email": f"bench{number}@example.com", "password": PASSWORD}
+
+	def patched_user() -> dict:
+		number = next(created)
+		return {"username": f"patched{number}", "email": f"patched{number}@example.com"}
+
+	login_form = {"username": "admin@example.com", "password": PASSWORD}
+	page_form = {"email": "admin@example.com", "password": PASSWORD}
+	return [
+		# auth/router.py
+		Scenario("POST /api/login", "post", lambda i: ("/api/login", {"data": login_form}), 0.1),
+		Scenario("GET /api/profile/me", "get", lambda i: ("/api/profile/me", {"headers": admin})),
+		Scenario("GET /api/profile/me (304)", "get",
+		         lambda i: ("/api/profile/me", {"headers": dict(admin, **{"If-None-Match": "*"})})),
+		Scenario("POST /api/refresh-token", "post",
+		         lambda i: ("/api/refresh-token", {"json": {"refresh_token": next(refresh_tokens)}})),
+		Scenario("POST /api/logout", "post",
+		         lambda i: ("/api/logout", {"json": {"refresh_token": next(refresh_tokens)}})),
+		Scenario("GET /.well-known/jwks.json", "get", lambda i: ("/.well-known/jwks.json", {})),
+		# users/router.py
+		Scenario("GET /api/", "get", lambda i: ("/api/?limit=50", {"headers": admin})),
+		Scenario("GET /api/{user_id}", "get", lambda i: (f"/api/{user_id(i)}", {"headers": admin})),
+		Scenario("GET /api/{user_id} (304)", "get", lambda i: (f"/api/{user_id(i)}", {"headers": unchanged(i)})),
+		Scenario("POST /api/", "post", lambda i: ("/api/", {"headers": admin, "json": new_user(i)}), 0.1),
+		Scenario("PATCH /api/{user_id}", "patch",
+		         lambda i: (f"/api/{user_id(i)}", {"headers": admin, "json": patched_user()})),
+		Scenario("DELETE /api/{user_id}", "delete", lambda i: (f"/api/{next(deletable)}", {"headers": admin})),
+		Scenario("GET /api/user/role/{user_id}", "get",
+		         lambda i: (f"/api/user/role/{user_id(i)}", {"headers": admin})),
+		Scenario("POST /api/user/role/{user_id}", "post",
+		         lambda i: (f"/api/user/role/{next(role_added)}?role=Moderator", {"headers": admin})),
+		Scenario("DELETE /api/user/role/{user_id}", "delete",
+		         lambda i: (f"/api/user/role/{next(role_removed)}?role=Moderator", {"headers": admin})),
+		Scenario("POST /api/user/role/bulk", "post", lambda i: ("/api/user/role/bulk", {
+			"headers": admin, "json": {"user_ids": ids[:50], "role": "Moderator"}})),
+		Scenario("POST /api/users/bulk", "post",
+		         lambda i: ("/api/users/bulk", {"headers": admin, "json": [new_user(i) for _ in range(bulk_size)]}),
+		         0.02),
+		Scenario("GET /api/users/export", "get", lambda i: ("/api/users/export?format=ndjson", {"headers": admin}), 0.1),
+		# page/router.py
+		Scenario("GET /", "get", lambda i: ("/", {})),
+		Scenario("POST /user-page", "post", lambda i: ("/user-page", {"data": page_form}), 0.1),
+		# last: bumps the token generation of its user
+		Scenario("POST /api/logout-all", "post", lambda i: ("/api/logout-all", {"headers": fixtures.user_headers})),
+	]
+
+
+async def run_level(client, scenario: Scenario, requests: int, concurrency: int) -> dict:
+	indexes = iter(range(requests))
+	latencies: List[float] = []
+	errors = 0
+
+	async def worker():
+		nonlocal errors
+		for index in indexes:
+			url, kwargs = scenario.build(index)
+			started = time.perf_counter()
+			response = await client.request(scenario.method.upper(), url, **kwargs)
+			latencies.append(time.perf_counter() - started)
+			if response.status_code >= 400:
+				errors += 1
+
+	started = time.perf_counter()
+	await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+	return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run_suite(args: argparse.Namespace, levels: List[int]) -> Dict[str, Dict[str, dict]]:
+	import httpx
+	from fastapi_auth_user.__main__ import auth_app
+
+	# DELETE, refresh and logout consume a seeded user or token per request
+	consumed = args.requests * len(levels) + args.warmup
+	fixtures = seed(args.users, consumed, 2 * consumed)
+	suite = [scenario for scenario in scenarios(fixtures, args.bulk_size)
+	         if not args.only or any(part in scenario.name for part in args.only)]
+
+	results: Dict[str, Dict[str, dict]] = {}
+	await auth_app.router.startup()
+	try:
+		transport = httpx.ASGITransport(app=auth_app)
+		async with httpx.AsyncClient(transport=transport, base_url="http://api-suite", timeout=None) as client:
+			for scenario in suite:
+				requests = max(1, int(args.requests * scenario.share))
+				await run_level(client, scenario, min(requests, args.warmup), 1)
+				results[scenario.name] = {}
+				for concurrency in levels:
+					results[scenario.name][str(concurrency)] = await run_level(client, scenario, requests, concurrency)
+					print_row(scenario.name, concurrency, results[scenario.name][str(concurrency)])
+	finally:
+		await auth_app.router.shutdown()
+	return results
+
+
+def print_row(name: str, concurrency: int, result: dict):
+	print(f"{name:<34}{concurrency:>4}{result['requests']:>6}{result['errors']:>5}{result['rps']:>10.1f}"
+	      f"{result['p50_ms']:>10.2f}{result['p90_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+
+
+def compare(results: Dict[str, Dict[str, dict]], baseline: Dict[str, Dict[str, dict]], threshold: float) -> List[str]:
+	"""
+	Return: "endpoint @concurrency: metric baseline -> current" for every metric worse than `threshold`
+	"""
+	regressions = []
+	for name, levels in results.items():
+		for concurrency, result in levels.items():
+			before = baseline.get(name, {}).get(concurrency)
+			if before is None:
+				continue
+			checks = [
+				('p50_ms', result['p50_ms'] > before['p50_ms'] * (1 + threshold)),
+				('p99_ms', result['p99_ms'] > before['p99_ms'] * (1 + threshold)),
+				('rps', result['rps'] < before['rps'] * (1 - threshold)),
+				('errors', result['errors'] > before['errors']),
+			]
+			regressions.extend(f"{name} @{concurrency}: {metric} {before[metric]} -> {result[metric]}"
+			                   for metric, worse in checks if worse)
+	return regressions
+
+
+def metadata(args: argparse.Namespace, levels: List[int]) -> dict:
+	try:
+		commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+		                        cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+	except OSError:
+		commit = None
+
+	return {
+		'commit': commit,
+		'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'database': os.environ["DATABASE_URL"].split(':', 1)[0],
+		'requests': args.requests,
+		'levels': levels,
+		'users': args.users,
+	}
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and level")
+	parser.add_argument("--levels", default="1,8,32", help="concurrency levels")
+	parser.add_argument("--users", type=int, default=1000,
+	                    help="seeded users; at least requests x levels keeps role requests conflict free")
+	parser.add_argument("--bulk-size", type=int, default=10, help="users per bulk import request")
+	parser.add_argument("--warmup", type=int, default=5, help="untimed requests per endpoint")
+	parser.add_argument("--only", action="append", help="run endpoints whose name contains this (repeatable)")
+	parser.add_argument("--database-url", help="default: a temporary SQLite file")
+	parser.add_argument("--save", help="write the results as JSON")
+	parser.add_argument("--baseline", help="JSON results to compare with")
+	parser.add_argument("--threshold", type=float, default=0.2, help="tolerated relative slowdown")
+	args = parser.parse_args()
+
+	levels = [int(level) for level in args.levels.split(',')]
+	configure_environment(args)
+
+	import logging
+	# 4xx paths log at ERROR; the table counts them instead
+	logging.disable(logging.ERROR)
+
+	print(f"{'endpoint':<34}{'conc':>4}{'reqs':>6}{'err':>5}{'rps':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+	results = asyncio.run(run_suite(args, levels))
+
+	if args.save:
+		with open(args.save, "w") as file:
+			json.dump({'meta': metadata(args, levels), 'results': results}, file, indent=2)
+
+	if args.baseline:
+		with open(args.baseline) as file:
+			baseline = json.load(file)
+		regressions = compare(results, baseline['results'], args.threshold)
+		print(f"\nbaseline {baseline['meta'].get('commit')} ({baseline['meta'].get('time')}): "
+		      f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+		for regression in regressions:
+			print(f"  {regression}")
+		sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+	main()
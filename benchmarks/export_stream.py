@@ -0,0 +1,103 @@
+"""
+Streaming export: time to first byte, total time and peak memory per table size.
+
+Seeds `--sizes` users (each with one role) into a throw-away SQLite database in turn and
+reads the stream `GET /api/users/export` returns (`UserService.export_users`) to the end.
+The chunks are counted and dropped, as a server writing them to the socket would, and
+peak memory is traced with tracemalloc; with streaming it stays flat as the table grows.
+Then checks once that the endpoint answers with the same body.
+
+	python benchmarks/export_stream.py --sizes 1000 10000 50000 --format csv
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "export_stream.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "export-stream")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("HASH_WORKERS", "0")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, insert, select
+
+from fastapi_auth_user.__main__ import auth_app
+from fastapi_auth_user.auth.hashing import pwd_context
+from fastapi_auth_user.database import db_helper
+from fastapi_auth_user.models import Role, RoleNameEnum, User
+from fastapi_auth_user.models.models import user_role_association
+from fastapi_auth_user.users.schema import ExportFormat
+from fastapi_auth_user.users.service import UserService
+
+PASSWORD = "Aa1!password"
+
+
+def seed_admin():
+	db_helper.create_all_tables()
+	db_helper.create_role_initial()
+	with db_helper.session() as db:
+		roles = {role.name: role.id for role in db.query(Role).all()}
+		admin = db.scalar(insert(User).returning(User.id), [
+			{"username": "admin", "email": "admin@example.com", "password": pwd_context.hash(PASSWORD)}])
+		db.execute(insert(user_role_association), [{"user_id": admin, "role_id": roles[RoleNameEnum.ADMIN.value]}])
+		db.commit()
+
+
+def grow_to(users: int):
+	with db_helper.session() as db:
+		role_id = db.scalar(select(Role.id).where(Role.name == RoleNameEnum.USER.value))
+		start = db.scalar(select(func.count(User.id)))
+		if start >= users:
+			return
+		ids = db.scalars(insert(User).returning(User.id), [
+			{"username": f"user{number}", "email": f"user{number}@example.com", "password": "x"}
+			for number in range(start, users)
+		]).all()
+		db.execute(insert(user_role_association), [{"user_id": user_id, "role_id": role_id} for user_id in ids])
+		db.commit()
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+	parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+	args = parser.parse_args()
+
+	logging.disable(logging.INFO)
+	seed_admin()
+	export_format = ExportFormat(args.format)
+	print(f"{'users':>8} {'first byte ms':>14} {'total ms':>10} {'MB':>8} {'peak MB':>9}")
+	for size in sorted(args.sizes):
+		grow_to(size)
+		size_bytes, first_byte = 0, None
+		with db_helper.session() as db:
+			tracemalloc.start()
+			start = time.perf_counter()
+			for chunk in UserService(db).export_users(export_format):
+				if first_byte is None:
+					first_byte = time.perf_counter() - start
+				size_bytes += len(chunk.encode())
+			total = time.perf_counter() - start
+			_, peak = tracemalloc.get_traced_memory()
+			tracemalloc.stop()
+		print(f"{size:>8} {first_byte * 1000:>14.2f} {total * 1000:>10.1f} "
+		      f"{size_bytes / 2 ** 20:>8.2f} {peak / 2 ** 20:>9.2f}")
+
+	with TestClient(auth_app) as client:
+		login = client.post("/api/login", data={"username": "admin@example.com", "password": PASSWORD})
+		headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+		response = client.get(f"/api/users/export?format={args.format}", headers=headers)
+		if response.status_code >= 400 or len(response.content) != size_bytes:
+			raise RuntimeError(f"endpoint: {response.status_code} {len(response.content)} != {size_bytes} bytes")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,107 @@
+"""
+Cost of one service log line on the request thread: colored StreamHandler (development)
+vs the LOG_PRODUCTION queue pipeline, with and without Success sampling.
+
+Every pipeline writes to os.devnull, each write blocked for `--write-us` to stand in for a
+terminal, pipe or log shipper that is not instantly ready. "caller us" is the time the logging
+call takes on the calling thread, "drained us" includes waiting for the listener thread to
+write everything.
+
+	python benchmarks/logging_overhead.py --lines 20000 --write-us 50
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from logging.handlers import QueueListener
+from queue import SimpleQueue
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "logging")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from fastapi_auth_user.logger.logger import (
+	ColoredFormatter,
+	ContextFilter,
+	DeferredQueueHandler,
+	JsonFormatter,
+	SuccessSampler
+)
+
+
+class BlockingStream:
+	def __init__(self, write_seconds: float):
+		self.write_seconds = write_seconds
+		self.stream = open(os.devnull, "w")
+
+	def write(self, text: str):
+		if self.write_seconds:
+			time.sleep(self.write_seconds)
+		self.stream.write(text)
+
+	def flush(self):
+		self.stream.flush()
+
+
+WRITE_SECONDS = 0.0
+
+
+def devnull_handler(formatter: logging.Formatter) -> logging.Handler:
+	handler = logging.StreamHandler(BlockingStream(WRITE_SECONDS))
+	handler.setFormatter(formatter)
+	return handler
+
+
+def colored(logger: logging.Logger):
+	logger.addHandler(devnull_handler(ColoredFormatter("%(levelname)s:\t%(asctime)s\t%(name)s\t%(message)s")))
+	return lambda name: logger.info(f"Method[{name}]: Success"), None
+
+
+def queued(logger: logging.Logger, sample_rates: str = ""):
+	queue = SimpleQueue()
+	handler = DeferredQueueHandler(queue)
+	handler.addFilter(SuccessSampler.from_setting(sample_rates))
+	handler.addFilter(ContextFilter())
+	logger.addHandler(handler)
+	listener = QueueListener(queue, devnull_handler(JsonFormatter()))
+	listener.start()
+	return lambda name: logger.info("Method[%s]: Success", name), listener
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--lines", type=int, default=20000)
+	parser.add_argument("--write-us", type=float, default=50)
+	args = parser.parse_args()
+
+	global WRITE_SECONDS
+	WRITE_SECONDS = args.write_us / 1e6
+
+	pipelines = {
+		"colored (development)": lambda logger: colored(logger),
+		"queue + json": lambda logger: queued(logger),
+		"queue + json, INFO=0.1": lambda logger: queued(logger, "INFO=0.1"),
+	}
+	print(f"{'pipeline':<26} {'caller us':>10} {'drained us':>11}")
+	for number, (name, build) in enumerate(pipelines.items()):
+		logger = logging.getLogger(f"bench-{number}")
+		logger.propagate = False
+		logger.setLevel(logging.INFO)
+		log, listener = build(logger)
+
+		start = time.perf_counter()
+		for _ in range(args.lines):
+			log("get_all_users")
+		caller = time.perf_counter() - start
+		if listener is not None:
+			listener.stop()
+		drained = time.perf_counter() - start
+		print(f"{name:<26} {caller / args.lines * 1e6:>10.2f} {drained / args.lines * 1e6:>11.2f}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,148 @@
+"""
+Concurrent credential-stuffing burst against the login throttle.
+
+Fires `--attempts` wrong-password logins at once, first at one email and then at distinct
+emails from one client IP, through AuthenticationService (threads) and AsyncAuthenticationService
+(tasks). Exits with status 1 when more attempts reach bcrypt verify than the email / IP limit.
+
+	python benchmarks/login_throttle_burst.py --attempts 50
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "login_throttle_burst.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "login-throttle-burst")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("HASH_WORKERS", "2")
+os.environ.setdefault("LOGIN_MAX_FAILURES_PER_EMAIL", "5")
+os.environ.setdefault("LOGIN_MAX_FAILURES_PER_IP", "20")
+
+from fastapi import HTTPException
+
+from fastapi_auth_user.auth.hashing import PasswordHasher, password_hasher, pwd_context
+from fastapi_auth_user.auth.service import AuthenticationService, AsyncAuthenticationService
+from fastapi_auth_user.auth.user_forms import AuthUserDataForm
+from fastapi_auth_user.config import settings
+from fastapi_auth_user.database import db_helper, async_db_helper
+from fastapi_auth_user.models import User
+
+PASSWORD = "Aa1!password"
+
+
+class CountingHasher(PasswordHasher):
+	"""
+	The shared hasher, counting the verifications that got past the throttle
+	"""
+
+	def __init__(self):
+		super().__init__(0, 0)
+		self.verified = 0
+		self.__lock = threading.Lock()
+
+	def __count(self):
+		with self.__lock:
+			self.verified += 1
+
+	def verify(self, plain_password: str, hashed_password: str) -> bool:
+		self.__count()
+		return password_hasher.verify(plain_password, hashed_password)
+
+	async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+		self.__count()
+		return await password_hasher.verify_async(plain_password, hashed_password)
+
+
+def seed(users: int):
+	db_helper.create_all_tables()
+	password = pwd_context.hash(PASSWORD)
+	with db_helper.session() as db:
+		db.add_all(User(username=f"user{number}", email=f"user{number}@example.com", password=password)
+		           for number in range(users))
+		db.commit()
+
+
+def login_form(email: str) -> AuthUserDataForm:
+	return AuthUserDataForm(email=email, password="wrong", username=None)
+
+
+def sync_burst(emails, client_ip: str, hasher: CountingHasher):
+	barrier = threading.Barrier(len(emails))
+
+	def login(email: str) -> int:
+		with db_helper.session() as db:
+			service = AuthenticationService(db)
+			service.hasher = hasher
+			barrier.wait()
+			try:
+				service.get_tokens(login_form(email), client_ip)
+			except HTTPException as err:
+				return err.status_code
+			return 200
+
+	with ThreadPoolExecutor(max_workers=len(emails)) as executor:
+		return list(executor.map(login, emails))
+
+
+async def async_burst(emails, client_ip: str, hasher: CountingHasher):
+	async def login(email: str) -> int:
+		async with async_db_helper.session_factory() as db:
+			service = AsyncAuthenticationService(db)
+			service.hasher = hasher
+			try:
+				await service.get_tokens(login_form(email), client_ip)
+			except HTTPException as err:
+				return err.status_code
+			return 200
+
+	statuses = await asyncio.gather(*(login(email) for email in emails))
+	await async_db_helper.dispose()
+	return statuses
+
+
+def report(name: str, statuses, hasher: CountingHasher, limit: int) -> bool:
+	ok = hasher.verified <= limit
+	throttled = sum(1 for status in statuses if status == 429)
+	print(f"{'ok  ' if ok else 'FAIL'}  {name:<28} {len(statuses)} attempts, {throttled} throttled, "
+	      f"{hasher.verified} reached verify (limit {limit})")
+	return ok
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--attempts", type=int, default=50, help="concurrent logins per burst")
+	args = parser.parse_args()
+
+	logging.disable(logging.ERROR)
+	seed(4 * args.attempts)
+	email_limit, ip_limit = int(settings.LOGIN_MAX_FAILURES_PER_EMAIL), int(settings.LOGIN_MAX_FAILURES_PER_IP)
+	emails = [f"user{number}@example.com" for number in range(4 * args.attempts)]
+	batches = [emails[start:start + args.attempts] for start in range(0, len(emails), args.attempts)]
+
+	results = []
+	try:
+		for name, runner in (("sync", sync_burst), ("async", lambda *burst: asyncio.run(async_burst(*burst)))):
+			hasher = CountingHasher()
+			statuses = runner([batches.pop()[0]] * args.attempts, f"10.0.0.{len(results)}", hasher)
+			results.append(report(f"{name}: one email", statuses, hasher, email_limit))
+
+			hasher = CountingHasher()
+			statuses = runner(batches.pop(), f"10.0.1.{len(results)}", hasher)
+			results.append(report(f"{name}: one IP", statuses, hasher, ip_limit))
+	finally:
+		password_hasher.shutdown()
+
+	sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,81 @@
+"""
+Offset vs keyset pagination of the users table.
+
+Seeds `--rows` users (1M by default) into a SQLite file, then reads one page at
+several depths with `UserRepository.get_all` (OFFSET/LIMIT) and
+`UserRepository.get_page` (WHERE id > :after ORDER BY id LIMIT) and prints the
+median latency of each. Offset latency grows with the depth, keyset stays flat.
+The last column reads the keyset page as LiteUser column rows instead of entities.
+
+	python benchmarks/pagination.py --rows 1000000 --limit 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_DB = os.path.join(tempfile.gettempdir(), "fastapi_auth_user_pagination.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DEFAULT_DB}")
+os.environ.setdefault("SECRET_KEY", "pagination")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from sqlalchemy import func, insert, select
+
+from fastapi_auth_user.database import db_helper
+from fastapi_auth_user.models import User
+from fastapi_auth_user.users.repository import UserRepository, lite_user_columns
+
+BATCH = 50_000
+
+
+def seed(rows: int):
+	db_helper.create_all_tables()
+	with db_helper.session() as db:
+		existing = db.scalar(select(func.count(User.id)))
+		for start in range(existing, rows, BATCH):
+			db.execute(insert(User), [
+				{"username": f"user{number}", "email": f"user{number}@example.com", "password": "-"}
+				for number in range(start, min(start + BATCH, rows))
+			])
+			db.commit()
+		return max(existing, rows)
+
+
+def measure(fn, repeat: int) -> float:
+	timings = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		fn()
+		timings.append(time.perf_counter() - start)
+	return statistics.median(timings) * 1000
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--rows", type=int, default=1_000_000)
+	parser.add_argument("--limit", type=int, default=10)
+	parser.add_argument("--repeat", type=int, default=5)
+	args = parser.parse_args()
+
+	rows = seed(args.rows)
+	print(f"{rows} users, page size {args.limit}")
+	print(f"{'depth':>10} {'offset ms':>12} {'keyset ms':>12} {'rows ms':>12}")
+
+	with db_helper.session() as db:
+		repository = UserRepository(db)
+		for depth in (0, rows // 100, rows // 10, rows // 2, rows - args.limit):
+			after_id = db.scalar(select(User.id).order_by(User.id).offset(depth).limit(1)) - 1
+			offset_ms = measure(lambda: repository.get_all(depth, args.limit), args.repeat)
+			keyset_ms = measure(lambda: repository.get_page(after_id, args.limit), args.repeat)
+			db.expunge_all()
+			rows_ms = measure(lambda: repository.get_page(after_id, args.limit, columns=lite_user_columns), args.repeat)
+			print(f"{depth:>10} {offset_ms:>12.3f} {keyset_ms:>12.3f} {rows_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,106 @@
+"""
+Exact number of SQL statements per endpoint.
+
+Boots `auth_app` against a throw-away SQLite database, seeds users with roles and
+runs every endpoint inside `assert_query_count`. Exits with status 1 and prints the
+offending statements when an endpoint issues more (or fewer) queries than listed in
+EXPECTED, so an N+1 regression fails CI.
+
+	python benchmarks/query_counts.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "query_counts.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "query-counts")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("HASH_WORKERS", "0")
+# endpoints over their declared query_budget raise instead of logging a warning
+os.environ.setdefault("QUERY_BUDGET_STRICT", "True")
+
+import logging
+
+from fastapi.testclient import TestClient
+
+from fastapi_auth_user.__main__ import auth_app
+from fastapi_auth_user.auth.hashing import pwd_context
+from fastapi_auth_user.database import db_helper
+from fastapi_auth_user.database.db_utils import assert_query_count
+from fastapi_auth_user.models import Role, RoleNameEnum, User
+
+PASSWORD = "Aa1!password"
+USERS = 100
+
+# endpoint name -> (method, url, request kwargs, expected statements)
+EXPECTED = {
+	"GET /api/": ("get", f"/api/?limit={USERS}", {}, 1),
+	"GET /api/{user_id}": ("get", "/api/2", {}, 1),
+	"GET /api/user/role/{user_id}": ("get", "/api/user/role/2", {}, 1),
+	# conditional GETs of unchanged users: version lookup only, 304
+	"GET /api/{user_id} If-None-Match": ("get", "/api/2", {"headers": {"If-None-Match": 'W/"2-1"'}}, 1),
+	"GET /api/user/role/{user_id} If-None-Match": ("get", "/api/user/role/2",
+	                                               {"headers": {"If-None-Match": 'W/"2-1"'}}, 1),
+	"GET /api/profile/me If-None-Match": ("get", "/api/profile/me", {"headers": {"If-None-Match": 'W/"1-1"'}}, 1),
+	"POST /api/user/role/{user_id}": ("post", "/api/user/role/2?role=Moderator", {}, 4),
+	"DELETE /api/user/role/{user_id}": ("delete", "/api/user/role/2?role=Moderator", {}, 4),
+	# stale tag after the role writes: version lookup plus the full read
+	"GET /api/{user_id} stale If-None-Match": ("get", "/api/2", {"headers": {"If-None-Match": 'W/"2-1"'}}, 2),
+	"GET /api/profile/me": ("get", "/api/profile/me", {}, 1),
+	"POST /api/login": ("post", "/api/login", {"data": {"username": "admin@example.com", "password": PASSWORD}}, 1),
+	"POST /api/refresh-token": ("post", "/api/refresh-token", {"json": {"refresh_token": None}}, 2),
+	"POST /api/": ("post", "/api/", {"json": {"username": "created", "email": "created@example.com",
+	                                          "password": PASSWORD}}, 2),
+	"PATCH /api/{user_id}": ("patch", "/api/2", {"json": {"username": "patched", "email": "patched@example.com"}}, 2),
+	"DELETE /api/{user_id}": ("delete", "/api/3", {}, 2),
+	# last: drops the cached principal of the token the other requests use
+	"POST /api/logout-all": ("post", "/api/logout-all", {}, 2),
+}
+
+
+def seed():
+	db_helper.create_all_tables()
+	db_helper.create_role_initial()
+	password = pwd_context.hash(PASSWORD)
+	with db_helper.session() as db:
+		roles = {role.name: role for role in db.query(Role).all()}
+		admin = User(username="admin", email="admin@example.com", password=password)
+		admin.roles = [roles[RoleNameEnum.ADMIN.value], roles[RoleNameEnum.USER.value]]
+		db.add(admin)
+		for number in range(USERS):
+			user = User(username=f"user{number}", email=f"user{number}@example.com", password=password)
+			user.roles = [roles[RoleNameEnum.USER.value]]
+			db.add(user)
+		db.commit()
+
+
+def main():
+	logging.disable(logging.INFO)
+	seed()
+	failures = 0
+
+	with TestClient(auth_app) as client:
+		login = client.post("/api/login", data={"username": "admin@example.com", "password": PASSWORD})
+		headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+		EXPECTED["POST /api/refresh-token"][2]["json"]["refresh_token"] = login.json()["refresh_token"]
+		client.get("/api/", headers=headers)
+
+		for name, (method, url, kwargs, expected) in EXPECTED.items():
+			request_headers = dict(headers, **kwargs.get("headers", {}))
+			try:
+				with assert_query_count(db_helper.engine, expected) as counter:
+					response = getattr(client, method)(url, **dict(kwargs, headers=request_headers))
+				print(f"ok    {name:<44} {counter.count} queries ({response.status_code})")
+			except AssertionError as err:
+				failures += 1
+				print(f"FAIL  {name:<44} {err}")
+
+	sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,127 @@
+"""
+Response serialization: response_model validation + stdlib json vs FAST_JSON.
+
+Seeds `--users` users into a throw-away SQLite database, then
+1. serializes one page of LiteUser rows both ways (what FastAPI does per request:
+   validate against response_model, jsonable_encoder, json.dumps -- or the
+   precompiled encoder + orjson), and
+2. calls every read endpoint `--requests` times with FAST_JSON off and on and
+   prints requests/sec of each.
+
+	python benchmarks/serialization.py --users 1000 --requests 200
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "serialization.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "serialization")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("HASH_WORKERS", "0")
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from pydantic import parse_obj_as
+from sqlalchemy import insert, select
+
+from fastapi_auth_user.__main__ import auth_app
+from fastapi_auth_user.auth.hashing import pwd_context
+from fastapi_auth_user.config import settings
+from fastapi_auth_user.database import db_helper
+from fastapi_auth_user.models import Role, RoleNameEnum, User
+from fastapi_auth_user.models.models import user_role_association
+from fastapi_auth_user.users.encoders import lite_user_encoder
+from fastapi_auth_user.users.repository import UserRepository, lite_user_columns
+from fastapi_auth_user.users.schema import LiteUser
+
+PASSWORD = "Aa1!password"
+
+
+def seed(users: int):
+	db_helper.create_all_tables()
+	db_helper.create_role_initial()
+	password = pwd_context.hash(PASSWORD)
+	with db_helper.session() as db:
+		roles = {role.name: role.id for role in db.query(Role).all()}
+		db.execute(insert(User), [{"username": "admin", "email": "admin@example.com", "password": password}] + [
+			{"username": f"user{number}", "email": f"user{number}@example.com", "password": password}
+			for number in range(users)
+		])
+		ids = list(db.scalars(select(User.id)))
+		db.execute(insert(user_role_association),
+		           [{"user_id": user_id, "role_id": roles[RoleNameEnum.USER.value]} for user_id in ids] +
+		           [{"user_id": ids[0], "role_id": roles[RoleNameEnum.ADMIN.value]}])
+		db.commit()
+
+
+def per_second(fn, seconds: float = 1.0) -> float:
+	calls, start = 0, time.perf_counter()
+	while time.perf_counter() - start < seconds:
+		fn()
+		calls += 1
+	return calls / (time.perf_counter() - start)
+
+
+def serialize_page(users: int):
+	with db_helper.session() as db:
+		rows = UserRepository(db).get_all(0, users, columns=lite_user_columns)
+
+	def validated() -> bytes:
+		models: List[LiteUser] = parse_obj_as(List[LiteUser], rows)
+		return json.dumps(jsonable_encoder(models)).encode()
+
+	def encoded() -> bytes:
+		return orjson.dumps(lite_user_encoder.encode_many(rows))
+
+	assert json.loads(validated()) == json.loads(encoded())
+	print(f"serialize {len(rows)} LiteUser rows")
+	print(f"  response_model + json  {per_second(validated):10.1f} pages/s")
+	print(f"  encoder + orjson       {per_second(encoded):10.1f} pages/s")
+
+
+def endpoints(users: int, requests: int):
+	with TestClient(auth_app) as client:
+		login = client.post("/api/login", data={"username": "admin@example.com", "password": PASSWORD})
+		headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+		urls = [f"/api/?limit={users}", f"/api/?after=&limit={users}", "/api/2", "/api/profile/me", "/api/user/role/2"]
+
+		print(f"\n{'endpoint':<28} {'stdlib req/s':>14} {'FAST_JSON req/s':>16}")
+		for url in urls:
+			results = []
+			for fast_json in (False, True):
+				settings.FAST_JSON = fast_json
+				bodies = set()
+				start = time.perf_counter()
+				for _ in range(requests):
+					response = client.get(url, headers=headers)
+					bodies.add(response.content)
+				results.append(requests / (time.perf_counter() - start))
+				if response.status_code >= 400 or len(bodies) != 1:
+					raise RuntimeError(f"{url}: {response.status_code} {response.text[:200]}")
+			print(f"{url:<28} {results[0]:>14.1f} {results[1]:>16.1f}")
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--users", type=int, default=1000)
+	parser.add_argument("--requests", type=int, default=200)
+	args = parser.parse_args()
+
+	logging.disable(logging.INFO)
+	seed(args.users)
+	serialize_page(args.users)
+	endpoints(args.users, args.requests)
+
+
+if __name__ == "__main__":
+	main()
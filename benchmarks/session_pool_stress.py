@@ -0,0 +1,97 @@
+"""
+Concurrency stress for the per-request session lifecycle.
+
+Every simulated request opens a session through `DatabaseHelper.session_dependency`
+(exactly what FastAPI does), reads a user through `UserService` and closes the session.
+A fixed round-trip latency is injected on each statement, so throughput is bound by
+how many connections the pool can hand out at once and should grow with the pool size.
+
+	python benchmarks/session_pool_stress.py --pool-sizes 1 2 4 8 --threads 32
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_DB = os.path.join(tempfile.gettempdir(), "fastapi_auth_user_stress.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DEFAULT_DB}")
+os.environ.setdefault("SECRET_KEY", "stress")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("HASH_WORKERS", "0")
+
+from sqlalchemy import event
+
+from fastapi_auth_user.config import settings
+from fastapi_auth_user.database import DatabaseHelper
+from fastapi_auth_user.models import User
+from fastapi_auth_user.users.service import UserService
+
+
+def seed(helper: DatabaseHelper) -> int:
+	helper.create_all_tables()
+	helper.create_role_initial()
+	with helper.session() as db:
+		user = db.query(User).filter(User.email == "stress@example.com").first()
+		if user is None:
+			user = User(username="stress", email="stress@example.com", password="-")
+			db.add(user)
+			db.commit()
+		return user.id
+
+
+def request(helper: DatabaseHelper, user_id: int):
+	for db in helper.session_dependency():
+		UserService(db).get_by_id(user_id)
+
+
+def run(pool_size: int, threads: int, requests: int, latency: float) -> float:
+	helper = DatabaseHelper(settings.get_db_url(), pool_size=pool_size, max_overflow=0, pool_timeout=60)
+	user_id = seed(helper)
+	event.listen(helper.engine, "before_cursor_execute", lambda *_: time.sleep(latency))
+
+	start = time.perf_counter()
+	with ThreadPoolExecutor(max_workers=threads) as executor:
+		for future in [executor.submit(request, helper, user_id) for _ in range(requests)]:
+			future.result()
+	elapsed = time.perf_counter() - start
+
+	checked_out = helper.engine.pool.checkedout()
+	helper.engine.dispose()
+	if checked_out:
+		raise RuntimeError(f"{checked_out} connection(s) were not returned to the pool")
+
+	return requests / elapsed
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+	parser.add_argument("--threads", type=int, default=32)
+	parser.add_argument("--requests", type=int, default=400)
+	parser.add_argument("--latency-ms", type=float, default=5.0)
+	parser.add_argument("--min-scaling", type=float, default=0.5,
+	                    help="fail unless throughput grows by at least this share of the pool size ratio")
+	args = parser.parse_args()
+
+	logging.disable(logging.INFO)
+
+	results = {}
+	for pool_size in args.pool_sizes:
+		results[pool_size] = run(pool_size, args.threads, args.requests, args.latency_ms / 1000)
+		print(f"pool_size={pool_size:<4} {results[pool_size]:10.1f} req/s")
+
+	smallest, largest = min(results), max(results)
+	scaling = results[largest] / results[smallest]
+	expected = (largest / smallest) * args.min_scaling
+	print(f"scaling x{scaling:.2f} (required x{expected:.2f})")
+	sys.exit(0 if scaling >= expected else 1)
+
+
+if __name__ == "__main__":
+	main()
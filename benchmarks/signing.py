@@ -0,0 +1,61 @@
+"""
+Token signing and verification per second: key material parsed on every call
+(`jwt.encode(claims, SECRET_KEY or PEM)`, as before) vs the preloaded key ring.
+
+	python benchmarks/signing.py --seconds 1
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "signing")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from ecdsa import NIST256p, SigningKey as ECDSAKey
+from jose import jwt
+
+from fastapi_auth_user.auth.signing import SigningBackend, load_key
+
+
+def per_second(fn, seconds: float) -> float:
+	calls, start = 0, time.perf_counter()
+	while time.perf_counter() - start < seconds:
+		fn()
+		calls += 1
+	return calls / (time.perf_counter() - start)
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--seconds", type=float, default=1.0)
+	args = parser.parse_args()
+
+	claims = {"email": "admin@example.com", "sub": "1", "roles": ["Admin"], "exp": time.time() + 3600}
+	materials = {
+		"HS256": "signing-secret",
+		"ES256": ECDSAKey.generate(curve=NIST256p).to_pem().decode(),
+	}
+
+	print(f"{'algorithm':<10} {'operation':<8} {'parse per call/s':>17} {'preloaded/s':>12}")
+	for algorithm, material in materials.items():
+		backend = SigningBackend(load_key("bench", algorithm, material))
+		token = backend.sign(claims)
+		verify_material = material if algorithm == "HS256" else backend.active.verify_key.to_pem().decode()
+
+		rows = {
+			"sign": (lambda: jwt.encode(claims, material, algorithm=algorithm), lambda: backend.sign(claims)),
+			"verify": (lambda: jwt.decode(token, verify_material, algorithms=[algorithm]),
+			           lambda: backend.verify(token)),
+		}
+		for operation, (parsed, preloaded) in rows.items():
+			print(f"{algorithm:<10} {operation:<8} {per_second(parsed, args.seconds):>17.1f} "
+			      f"{per_second(preloaded, args.seconds):>12.1f}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,120 @@
+"""
+Latency and statement count of every write endpoint.
+
+Boots `auth_app` against a throw-away SQLite database and calls each write endpoint
+`--requests` times on distinct users. A fixed `--latency-ms` is injected on every
+statement to stand in for the network round trip to a database server, so the
+numbers show what each saved statement is worth.
+
+	python benchmarks/write_paths.py --requests 200 --latency-ms 1
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "write_paths.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "write-paths")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("HASH_WORKERS", "0")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert, select
+
+from fastapi_auth_user.__main__ import auth_app
+from fastapi_auth_user.auth.hashing import pwd_context
+from fastapi_auth_user.database import db_helper
+from fastapi_auth_user.database.db_utils import QueryCounter
+from fastapi_auth_user.models import Role, RoleNameEnum, User
+from fastapi_auth_user.models.models import user_role_association
+
+PASSWORD = "Aa1!password"
+
+
+def seed(users: int) -> list:
+	db_helper.create_all_tables()
+	db_helper.create_role_initial()
+	password = pwd_context.hash(PASSWORD)
+	with db_helper.session() as db:
+		roles = {role.name: role.id for role in db.query(Role).all()}
+		admin = db.scalar(insert(User).returning(User.id),
+		                  [{"username": "admin", "email": "admin@example.com", "password": password}])
+		db.execute(insert(user_role_association), [
+			{"user_id": admin, "role_id": roles[RoleNameEnum.ADMIN.value]},
+			{"user_id": admin, "role_id": roles[RoleNameEnum.USER.value]},
+		])
+		db.execute(insert(User), [
+			{"username": f"user{number}", "email": f"user{number}@example.com", "password": password}
+			for number in range(users)
+		])
+		ids = list(db.scalars(select(User.id).where(User.id != admin).order_by(User.id)))
+		db.execute(insert(user_role_association),
+		           [{"user_id": user_id, "role_id": roles[RoleNameEnum.USER.value]} for user_id in ids])
+		db.commit()
+	return ids
+
+
+def endpoints(ids: list, batch: int):
+	"""
+	name -> callable(number) returning (method, url, request kwargs); each call works on another user
+	"""
+	chunks = [ids[start:start + batch] for start in range(0, len(ids), batch)]
+	return {
+		"POST /api/": lambda n: ("post", "/api/", {"json": {
+			"username": f"created{n}", "email": f"created{n}@example.com", "password": PASSWORD}}),
+		"PATCH /api/{user_id}": lambda n: ("patch", f"/api/{ids[n]}", {"json": {
+			"username": f"patched{n}", "email": f"patched{n}@example.com"}}),
+		"POST /api/user/role/{user_id}": lambda n: ("post", f"/api/user/role/{ids[n]}?role=Moderator", {}),
+		"DELETE /api/user/role/{user_id}": lambda n: ("delete", f"/api/user/role/{ids[n]}?role=Moderator", {}),
+		"POST /api/user/role/bulk": lambda n: ("post", "/api/user/role/bulk", {"json": {
+			"user_ids": chunks[n % len(chunks)], "role": "Moderator"}}),
+		"DELETE /api/user/role/bulk": lambda n: ("request", "/api/user/role/bulk", {"method": "DELETE", "json": {
+			"user_ids": chunks[n % len(chunks)], "role": "Moderator"}}),
+		"DELETE /api/{user_id}": lambda n: ("delete", f"/api/{ids[n]}", {}),
+	}
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--requests", type=int, default=200)
+	parser.add_argument("--latency-ms", type=float, default=1.0)
+	parser.add_argument("--bulk-size", type=int, default=100)
+	args = parser.parse_args()
+
+	logging.disable(logging.INFO)
+	ids = seed(args.requests)
+	latency = args.latency_ms / 1000
+	event.listen(db_helper.engine, "before_cursor_execute", lambda *_: time.sleep(latency))
+
+	print(f"{args.requests} requests per endpoint, {args.latency_ms} ms per statement")
+	print(f"{'endpoint':<34} {'statements':>10} {'p50 ms':>9} {'p95 ms':>9}")
+	with TestClient(auth_app) as client:
+		login = client.post("/api/login", data={"username": "admin@example.com", "password": PASSWORD})
+		headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+		for name, build in endpoints(ids, args.bulk_size).items():
+			timings, statements = [], []
+			for number in range(args.requests):
+				method, url, kwargs = build(number)
+				with QueryCounter(db_helper.engine) as counter:
+					start = time.perf_counter()
+					response = getattr(client, method)(url=url, headers=headers, **kwargs)
+					timings.append((time.perf_counter() - start) * 1000)
+				if response.status_code >= 400:
+					raise RuntimeError(f"{name}: {response.status_code} {response.text}")
+				statements.append(counter.count)
+
+			p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+			print(f"{name:<34} {statistics.median(statements):>10.0f} "
+			      f"{statistics.median(timings):>9.2f} {p95:>9.2f}")
+
+
+if __name__ == "__main__":
+	main()
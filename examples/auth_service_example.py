@@ -2,7 +2,8 @@ from typing import Optional
 
 from pydantic import BaseModel
 
-from fastapi_auth_user.auth import auth_service
+from fastapi_auth_user.auth import AuthenticationService
+from fastapi_auth_user.database import db_helper
 from fastapi_auth_user.users.schema import Tokens
 
 
@@ -18,5 +19,7 @@ if __name__ == "__main__":
 		password="password123",
 		username="username123"
 	)
-	tokens: Tokens = auth_service.get_tokens(user_data)
-	user = auth_service.get_user_by_token(tokens.access_token.token)
+	with db_helper.session() as db:
+		auth_service = AuthenticationService(db)
+		tokens: Tokens = auth_service.get_tokens(user_data)
+		user = auth_service.get_user_by_token(tokens.access_token.token)
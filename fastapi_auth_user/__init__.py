@@ -1 +1,7 @@
-from .__main__ import auth_app
\ No newline at end of file
+def __getattr__(name: str):
+	# The app is built on first access, so processes that only import a submodule
+	# (the spawned bcrypt workers) do not construct it
+	if name == 'auth_app':
+		from .__main__ import auth_app
+		return auth_app
+	raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -5,11 +5,26 @@ import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from sqlalchemy.exc import SQLAlchemyError
 
-from fastapi_auth_user.auth import auth_router
-from fastapi_auth_user.users import user_router
+from fastapi_auth_user.auth import jwks_router
+from fastapi_auth_user.auth.hashing import password_hasher
+from fastapi_auth_user.config import settings
+from fastapi_auth_user.database import db_helper, async_db_helper, role_registry, QueryStatsMiddleware, \
+	query_stats_enabled
+from fastapi_auth_user.logger import FastApiAuthLogger, LogLevel, LogContextMiddleware, stop_log_listener
+from fastapi_auth_user.metrics import MetricsMiddleware, metrics_router
+from fastapi_auth_user.users.encoders import default_response_class
+from fastapi_auth_user.users.router import NEXT_CURSOR_HEADER
 
-auth_app = FastAPI(title='AuthApi')
+if settings.ASYNC_DATABASE:
+	from fastapi_auth_user.auth.async_router import async_auth_router as auth_router
+	from fastapi_auth_user.users.async_router import async_user_router as user_router
+else:
+	from fastapi_auth_user.auth import auth_router
+	from fastapi_auth_user.users import user_router
+
+auth_app = FastAPI(title='AuthApi', default_response_class=default_response_class())
 
 origins = [
 	"http://localhost:3005",
@@ -23,11 +38,21 @@ auth_app.add_middleware(
 	allow_credentials=True,
 	allow_methods=["*"],
 	allow_headers=["*"],
+	expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+if settings.LOG_PRODUCTION:
+	auth_app.add_middleware(LogContextMiddleware)
+
+if settings.METRICS_ENABLED:
+	auth_app.add_middleware(MetricsMiddleware)
+
+if query_stats_enabled():
+	auth_app.add_middleware(QueryStatsMiddleware)
+
 parser = argparse.ArgumentParser()
 parser.add_argument("-t", "--template", required=False, action=argparse.BooleanOptionalAction)
-args = parser.parse_args()
+args, _ = parser.parse_known_args()
 
 if args.template:
 	from fastapi_auth_user.page import page_router
@@ -38,6 +63,30 @@ if args.template:
 
 auth_app.include_router(user_router)
 auth_app.include_router(auth_router)
+auth_app.include_router(jwks_router)
+
+if settings.METRICS_ENABLED:
+	auth_app.include_router(metrics_router)
+
+
+@auth_app.on_event("startup")
+async def warm_role_registry():
+	try:
+		if settings.ASYNC_DATABASE:
+			async with async_db_helper.session_factory() as db:
+				await role_registry.load_async(db)
+		else:
+			with db_helper.session() as db:
+				role_registry.load(db)
+	except SQLAlchemyError as err:
+		FastApiAuthLogger("startup", LogLevel.INFO).warning("Role registry is loaded on first use: %s", err)
+
+
+@auth_app.on_event("shutdown")
+async def shutdown_resources():
+	password_hasher.shutdown()
+	stop_log_listener()
+	await async_db_helper.dispose()
 
 
 def start():
@@ -1,2 +1,4 @@
-from .router import auth_router, auth_service
-from .service import AuthenticationService
\ No newline at end of file
+from .router import auth_router, jwks_router, get_auth_service
+from .service import AuthenticationService, AsyncAuthenticationService
+from .middleware import AuthMiddleware, TokenVerifier, JWKSKeyProvider
+from .permissions import RolePermissions
@@ -0,0 +1,89 @@
+from fastapi import APIRouter, Depends, Request, Response, status
+
+from .user_forms import AuthUserDataForm, ResetUserPasswordDataForm
+from ..database import async_db_helper, AsyncDatabase, query_budget
+from ..users.conditional import NOT_MODIFIED_RESPONSES, is_conditional, not_modified_response, set_validators
+from ..users.encoders import encoded_response, lite_user_encoder, token_data_encoder
+from ..users.schema import Tokens, LiteUser, RefreshToken, TokenData
+from .router import token_data
+from .service import AsyncAuthenticationService, oauth2_scheme
+
+async_auth_router = APIRouter(
+	prefix='/api',
+	tags=["Authentication"],
+	dependencies=[],
+	responses={status.HTTP_404_NOT_FOUND: {"description": "Not found"}},
+)
+
+
+def get_auth_service(db: AsyncDatabase = Depends(async_db_helper.session_dependency)) -> AsyncAuthenticationService:
+	return AsyncAuthenticationService(db)
+
+
+@async_auth_router.post("/login", response_model=TokenData, status_code=status.HTTP_200_OK,
+                        dependencies=[query_budget(2)])
+async def login_user(
+		request: Request,
+		user_data: AuthUserDataForm = Depends(AuthUserDataForm.as_form),
+		service: AsyncAuthenticationService = Depends(get_auth_service)
+):
+	user_data.email = user_data.username if user_data.email is None else user_data.email
+	client_ip = request.client.host if request.client is not None else None
+	tokens: Tokens = await service.get_tokens(user_data, client_ip)
+	return encoded_response(token_data(tokens), token_data_encoder.encode)
+
+
+@async_auth_router.get("/profile/me", response_model=LiteUser, status_code=status.HTTP_201_CREATED,
+                       responses=NOT_MODIFIED_RESPONSES, dependencies=[query_budget(3)])
+async def get_user_by_token(
+		request: Request,
+		response: Response,
+		token: str = Depends(oauth2_scheme),
+		service: AsyncAuthenticationService = Depends(get_auth_service)
+):
+	if is_conditional(request):
+		not_modified = not_modified_response(request, await service.get_user_version_by_token(token))
+		if not_modified is not None:
+			return not_modified
+
+	user = await service.get_user_by_token(token)
+	return encoded_response(user, lite_user_encoder.encode, status_code=status.HTTP_201_CREATED,
+	                        response=set_validators(response, user))
+
+
+@async_auth_router.post("/reset-password", response_model=LiteUser, status_code=status.HTTP_201_CREATED)
+async def reset_password(
+		token: str = Depends(oauth2_scheme),
+		user_data: ResetUserPasswordDataForm = Depends(ResetUserPasswordDataForm.as_form),
+		service: AsyncAuthenticationService = Depends(get_auth_service)
+):
+	return await service.reset_password(token, user_data.new_password)
+
+
+@async_auth_router.post("/refresh-token", response_model=TokenData, status_code=status.HTTP_200_OK,
+                        dependencies=[query_budget(4)])
+async def refresh_token(
+		token: RefreshToken,
+		service: AsyncAuthenticationService = Depends(get_auth_service)
+):
+	return encoded_response(token_data(await service.refresh_access_token(token)), token_data_encoder.encode)
+
+
+@async_auth_router.post("/logout", status_code=status.HTTP_204_NO_CONTENT, response_class=Response,
+                        dependencies=[query_budget(2)])
+async def logout(
+		token: RefreshToken,
+		service: AsyncAuthenticationService = Depends(get_auth_service)
+):
+	await service.logout(token)
+	return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@async_auth_router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT, response_class=Response,
+                        dependencies=[query_budget(3)])
+async def logout_all(
+		token: str = Depends(oauth2_scheme),
+		service: AsyncAuthenticationService = Depends(get_auth_service)
+):
+	await service.logout_all(token)
+	return Response(status_code=status.HTTP_204_NO_CONTENT)
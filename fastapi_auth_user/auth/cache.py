@@ -0,0 +1,95 @@
+import hashlib
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Optional, Set, Tuple
+
+from ..config import settings
+from ..metrics import metrics_registry
+from ..users.schema import Principal
+
+
+class TokenCache:
+	"""
+	LRU cache of verified access tokens, keyed by the SHA-256 digest of the token.
+	An entry lives until the token expires, `ttl` seconds pass or it is evicted by size.
+	"""
+
+	def __init__(self, max_size: int, ttl: int):
+		self.max_size = max_size
+		self.ttl = ttl
+		self.hits = 0
+		self.misses = 0
+		self.__entries: OrderedDict[str, Tuple[Principal, float]] = OrderedDict()
+		self.__user_keys: Dict[int, Set[str]] = {}
+		self.__lock = Lock()
+
+	@staticmethod
+	def digest(token: str) -> str:
+		return hashlib.sha256(token.encode()).hexdigest()
+
+	def get(self, token: str) -> Optional[Principal]:
+		key = self.digest(token)
+		with self.__lock:
+			entry = self.__entries.get(key)
+			if entry is None:
+				self.misses += 1
+				return None
+
+			principal, expires_at = entry
+			if expires_at <= time.time():
+				self.__remove(key)
+				self.misses += 1
+				return None
+
+			self.__entries.move_to_end(key)
+			self.hits += 1
+			return principal
+
+	def set(self, token: str, principal: Principal, expires_at: float):
+		if self.max_size <= 0:
+			return
+
+		key = self.digest(token)
+		expires_at = min(expires_at, time.time() + self.ttl)
+		with self.__lock:
+			if key in self.__entries:
+				self.__remove(key)
+			self.__entries[key] = (principal, expires_at)
+			self.__user_keys.setdefault(principal.id, set()).add(key)
+
+			while len(self.__entries) > self.max_size:
+				self.__remove(next(iter(self.__entries)))
+
+	def invalidate_user(self, user_id: int):
+		with self.__lock:
+			for key in self.__user_keys.pop(user_id, set()):
+				self.__entries.pop(key, None)
+
+	def clear(self):
+		with self.__lock:
+			self.__entries.clear()
+			self.__user_keys.clear()
+
+	def stats(self) -> dict:
+		return {
+			'size': len(self.__entries),
+			'hits': self.hits,
+			'misses': self.misses,
+		}
+
+	def __remove(self, key: str):
+		principal, _ = self.__entries.pop(key)
+		keys = self.__user_keys.get(principal.id)
+		if keys is not None:
+			keys.discard(key)
+			if not keys:
+				del self.__user_keys[principal.id]
+
+
+token_cache = TokenCache(
+	max_size=settings.TOKEN_CACHE_SIZE,
+	ttl=settings.TOKEN_CACHE_TTL_SECONDS,
+)
+
+metrics_registry.register_stats('token_cache', token_cache.stats, counters=('hits', 'misses'))
@@ -0,0 +1,26 @@
+import time
+from typing import Optional
+
+from ..users.schema import Principal
+
+
+def principal_from_claims(payload: dict, max_age_seconds: int) -> Optional[Principal]:
+	"""
+	Return: principal built from signed role claims, or None if the token has no claims
+	or they are older than `max_age_seconds`
+	"""
+	if payload.get('sub') is None or payload.get('roles') is None or payload.get('iat') is None:
+		return None
+
+	claims_age = time.time() - payload.get('iat')
+	if claims_age > max_age_seconds:
+		return None
+
+	return Principal(id=int(payload.get('sub')), email=payload.get('email'), roles=frozenset(payload.get('roles')))
+
+
+def claims_expire_at(payload: dict, max_age_seconds: int) -> float:
+	"""
+	Return: moment a principal built from `payload` stops being valid (token expiry or claims age)
+	"""
+	return min(payload.get('exp'), payload.get('iat') + max_age_seconds)
@@ -6,3 +6,17 @@ class PermissionException(Exception):
 		self.message = message
 		self.role = role
 		super().__init__(self.message)
+
+
+class LoginThrottledException(Exception):
+	def __init__(self, message: str = 'Too many failed login attempts', retry_after: int = 1):
+		self.message = message
+		self.retry_after = retry_after
+		super().__init__(self.message)
+
+
+class HashingQueueFullException(Exception):
+	def __init__(self, message: str = 'Password hashing queue is full', retry_after: int = 1):
+		self.message = message
+		self.retry_after = retry_after
+		super().__init__(self.message)
@@ -0,0 +1,144 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from threading import BoundedSemaphore, Lock
+from typing import Callable, List, Optional
+
+from .exception import HashingQueueFullException
+from ..config import settings
+from ..hash_worker import hash_batch, hash_password, pwd_context, verify_password
+from ..metrics.instrument import PASSWORD_HASH_DURATION, observe_each, observe_since
+
+
+class PasswordHasher:
+	"""
+	Runs bcrypt in a dedicated process pool so hashing never holds the GIL of a request worker.
+	At most `max_workers + max_queue_size` jobs are admitted; further calls are rejected at once
+	with HashingQueueFullException. `max_workers=0` hashes inline in the calling thread.
+	"""
+
+	def __init__(self, max_workers: int, max_queue_size: int):
+		self.__max_workers = max_workers
+		self.__slots = BoundedSemaphore(max_workers + max_queue_size) if max_workers > 0 else None
+		self.__executor: Optional[ProcessPoolExecutor] = None
+		self.__lock = Lock()
+
+	@property
+	def executor(self) -> ProcessPoolExecutor:
+		if self.__executor is None:
+			with self.__lock:
+				if self.__executor is None:
+					self.__executor = ProcessPoolExecutor(
+						max_workers=self.__max_workers,
+						mp_context=multiprocessing.get_context("spawn"),
+					)
+		return self.__executor
+
+	def submit(self, fn: Callable, *args) -> Future:
+		if self.__slots is None:
+			future = Future()
+			try:
+				future.set_result(fn(*args))
+			except Exception as err:
+				future.set_exception(err)
+			return future
+
+		if not self.__slots.acquire(blocking=False):
+			raise HashingQueueFullException()
+
+		try:
+			future = self.executor.submit(fn, *args)
+		except Exception:
+			self.__slots.release()
+			raise
+
+		future.add_done_callback(lambda _: self.__slots.release())
+		return future
+
+	def hash(self, password: str) -> str:
+		started = time.perf_counter()
+		try:
+			return self.submit(hash_password, password).result()
+		finally:
+			observe_since(PASSWORD_HASH_DURATION, started, 'hash')
+
+	def verify(self, plain_password: str, hashed_password: str) -> bool:
+		started = time.perf_counter()
+		try:
+			return self.submit(verify_password, plain_password, hashed_password).result()
+		finally:
+			observe_since(PASSWORD_HASH_DURATION, started, 'verify')
+
+	def hash_many(self, passwords: List[str], chunk_size: int = 32) -> List[str]:
+		"""
+		Hash a batch in chunks spread over the pool. Unlike single calls it waits for free slots
+		instead of failing, and keeps at most `max_workers` chunks in flight, so the rest of the
+		queue stays available to interactive logins.
+		Each password is observed as a 'hash' with the mean duration of its chunk.
+		"""
+		chunks = [passwords[start:start + chunk_size] for start in range(0, len(passwords), chunk_size)]
+		if self.__slots is None:
+			hashes = []
+			for chunk in chunks:
+				started = time.perf_counter()
+				hashes.extend(hash_batch(chunk))
+				observe_each(PASSWORD_HASH_DURATION, time.perf_counter() - started, len(chunk), 'hash')
+			return hashes
+
+		in_flight = BoundedSemaphore(self.__max_workers)
+		futures = []
+		seconds = [0.0] * len(chunks)
+		for index, chunk in enumerate(chunks):
+			in_flight.acquire()
+			self.__slots.acquire()
+			started = time.perf_counter()
+			try:
+				future = self.executor.submit(hash_batch, chunk)
+			except Exception:
+				self.__slots.release()
+				in_flight.release()
+				raise
+
+			def chunk_done(_, index=index, started=started):
+				seconds[index] = time.perf_counter() - started
+				self.__slots.release()
+				in_flight.release()
+
+			future.add_done_callback(chunk_done)
+			futures.append(future)
+
+		hashes = [hashed for future in futures for hashed in future.result()]
+		# Observed here rather than in chunk_done, which runs outside the caller's service method context
+		for chunk, chunk_seconds in zip(chunks, seconds):
+			observe_each(PASSWORD_HASH_DURATION, chunk_seconds, len(chunk), 'hash')
+		return hashes
+
+	async def hash_many_async(self, passwords: List[str], chunk_size: int = 32) -> List[str]:
+		return await asyncio.to_thread(self.hash_many, passwords, chunk_size)
+
+	async def hash_async(self, password: str) -> str:
+		started = time.perf_counter()
+		try:
+			return await asyncio.wrap_future(self.submit(hash_password, password))
+		finally:
+			observe_since(PASSWORD_HASH_DURATION, started, 'hash')
+
+	async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+		started = time.perf_counter()
+		try:
+			return await asyncio.wrap_future(self.submit(verify_password, plain_password, hashed_password))
+		finally:
+			observe_since(PASSWORD_HASH_DURATION, started, 'verify')
+
+	def shutdown(self):
+		with self.__lock:
+			if self.__executor is not None:
+				self.__executor.shutdown(wait=True, cancel_futures=True)
+				self.__executor = None
+
+
+password_hasher = PasswordHasher(
+	max_workers=settings.HASH_WORKERS,
+	max_queue_size=settings.HASH_QUEUE_SIZE,
+)
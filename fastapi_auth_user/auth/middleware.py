@@ -0,0 +1,151 @@
+import json
+import time
+from threading import Lock
+from typing import Dict, Optional, Protocol
+from urllib.request import urlopen
+
+from jose import jwt, JWTError
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .cache import TokenCache
+from .claims import principal_from_claims, claims_expire_at
+from .signing import SigningKey, key_from_jwk, verify_token
+from ..logger import FastApiAuthLogger, LogLevel
+from ..users.schema import Principal
+
+
+class KeyProvider(Protocol):
+	def get_key(self, kid: Optional[str]) -> Optional[SigningKey]:
+		...
+
+
+class JWKSKeyProvider:
+	"""
+	Public keys of the auth service, fetched from its /.well-known/jwks.json and kept for `ttl` seconds.
+	A token signed with an unknown `kid` (a rotated key) triggers a refetch, at most once per
+	`min_refresh_interval` seconds so garbage kids cannot hammer the auth service.
+	"""
+
+	def __init__(self, jwks_url: str, ttl: int = 300, min_refresh_interval: int = 30, timeout: float = 5.0):
+		self.jwks_url = jwks_url
+		self.ttl = ttl
+		self.min_refresh_interval = min_refresh_interval
+		self.timeout = timeout
+		self.__keys: Dict[Optional[str], SigningKey] = {}
+		self.__fetched_at = 0.0
+		self.__lock = Lock()
+		self.__logger = FastApiAuthLogger("jwks key provider", LogLevel.INFO)
+
+	def needs_refresh(self, kid: Optional[str]) -> bool:
+		age = time.monotonic() - self.__fetched_at
+		return age > self.ttl or (kid not in self.__keys and age > self.min_refresh_interval)
+
+	def refresh(self):
+		with self.__lock:
+			try:
+				with urlopen(self.jwks_url, timeout=self.timeout) as response:
+					jwks = json.load(response)
+				keys = {}
+				for public_jwk in jwks.get('keys', []):
+					key = key_from_jwk(public_jwk)
+					keys[key.kid] = key
+				self.__keys = keys
+				self.__logger.info("Method[%s]: Success", self.refresh.__name__)
+			except Exception as err:
+				# keep serving the keys we have, retry after min_refresh_interval
+				self.__logger.error("Method[%s](%s): Error", self.refresh.__name__, err)
+			finally:
+				self.__fetched_at = time.monotonic()
+
+	def get_key(self, kid: Optional[str]) -> Optional[SigningKey]:
+		if self.needs_refresh(kid):
+			self.refresh()
+		return self.__keys.get(kid)
+
+
+class TokenVerifier:
+	"""
+	Verifies access tokens locally and turns their role claims into a Principal.
+	Verified tokens are cached (by SHA-256 digest) until they expire, `cache_ttl` passes
+	or their claims are older than `claims_max_age_minutes`; a hit skips the signature check.
+	Tokens need the role claims the auth service issues with STATELESS_AUTH=True.
+	"""
+
+	def __init__(
+			self,
+			key_provider: KeyProvider,
+			cache_size: int = 10000,
+			cache_ttl: int = 300,
+			claims_max_age_minutes: int = 15
+	):
+		self.key_provider = key_provider
+		self.claims_max_age = claims_max_age_minutes * 60
+		self.cache = TokenCache(cache_size, cache_ttl)
+
+	def verify(self, token: str) -> Optional[Principal]:
+		"""
+		Return: principal of a valid token, None if the token is invalid, expired or has no role claims
+		"""
+		principal = self.cache.get(token)
+		if principal is not None:
+			return principal
+
+		try:
+			payload = verify_token(token, self.key_provider.get_key)
+		except JWTError:
+			return None
+
+		principal = principal_from_claims(payload, self.claims_max_age)
+		if principal is not None:
+			self.cache.set(token, principal, claims_expire_at(payload, self.claims_max_age))
+		return principal
+
+	def needs_refresh(self, token: str) -> bool:
+		"""
+		Return: True when verifying `token` would fetch keys (the middleware does it off the event loop)
+		"""
+		needs_refresh = getattr(self.key_provider, 'needs_refresh', None)
+		if needs_refresh is None:
+			return False
+		try:
+			return needs_refresh(jwt.get_unverified_header(token).get('kid'))
+		except JWTError:
+			return False
+
+
+class AuthMiddleware:
+	"""
+	ASGI middleware for services that trust this auth service: verifies the bearer token
+	locally and sets `request.state.principal` (None without a valid token). Pair it with
+	`RolePermissions(...).get_state_permissions` to guard routes.
+
+		verifier = TokenVerifier(JWKSKeyProvider("https://auth.example.com/.well-known/jwks.json"))
+		app.add_middleware(AuthMiddleware, verifier=verifier)
+	"""
+
+	def __init__(self, app: ASGIApp, verifier: TokenVerifier):
+		self.app = app
+		self.verifier = verifier
+
+	async def __call__(self, scope: Scope, receive: Receive, send: Send):
+		if scope['type'] in ('http', 'websocket'):
+			scope.setdefault('state', {})['principal'] = await self.__principal(scope)
+		await self.app(scope, receive, send)
+
+	async def __principal(self, scope: Scope) -> Optional[Principal]:
+		token = self.bearer_token(scope)
+		if token is None:
+			return None
+
+		if self.verifier.needs_refresh(token):
+			return await run_in_threadpool(self.verifier.verify, token)
+		return self.verifier.verify(token)
+
+	@staticmethod
+	def bearer_token(scope: Scope) -> Optional[str]:
+		for name, value in scope.get('headers', ()):
+			if name == b'authorization':
+				scheme, _, token = value.decode('latin-1').partition(' ')
+				return (token.strip() or None) if scheme.lower() == 'bearer' else None
+		return None
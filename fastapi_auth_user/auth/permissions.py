@@ -1,13 +1,13 @@
 from typing import Union, List
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 
 from .exception import PermissionException
-from .service import AuthenticationService
-from ..database import db_helper
-from ..models import RoleNameEnum, User
-
-auth_service = AuthenticationService(next(db_helper.session_dependency()))
+from .service import AuthenticationService, AsyncAuthenticationService, oauth2_scheme
+from ..database import db_helper, async_db_helper, Database, AsyncDatabase
+from ..logger import set_log_user
+from ..models import RoleNameEnum
+from ..users.schema import Principal
 
 
 class RolePermissions:
@@ -16,21 +16,55 @@ class RolePermissions:
 
 	def get_permissions(
 			self,
-			token: str = Depends(auth_service.oauth2_scheme)
+			token: str = Depends(oauth2_scheme),
+			db: Database = Depends(db_helper.session_dependency)
 	) -> Union[bool, PermissionException]:
 		try:
-			current_user: User = auth_service.get_user_by_token(token)
-			for role in self.roles:
-				for user_role in current_user.roles:
-					if role.value == user_role.name:
-						return True
-			else:
-				raise PermissionException(message=f'Permission denied', role=str(self))
+			principal: Principal = AuthenticationService(db).get_principal_by_token(token)
+			set_log_user(principal.id)
+			return self.check_principal(principal)
 		except PermissionException as err:
 			raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(err))
 
 		except Exception:
 			raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Permission denied")
 
+	async def get_async_permissions(
+			self,
+			token: str = Depends(oauth2_scheme),
+			db: AsyncDatabase = Depends(async_db_helper.session_dependency)
+	) -> Union[bool, PermissionException]:
+		try:
+			principal: Principal = await AsyncAuthenticationService(db).get_principal_by_token(token)
+			set_log_user(principal.id)
+			return self.check_principal(principal)
+		except PermissionException as err:
+			raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(err))
+
+		except Exception:
+			raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Permission denied")
+
+	def get_state_permissions(self, request: Request) -> Union[bool, PermissionException]:
+		"""
+		Permissions from `request.state.principal` set by AuthMiddleware (no database, no token decoding)
+		"""
+		principal: Principal = getattr(request.state, 'principal', None)
+		if principal is None:
+			raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+			                    detail="Invalid authentication credentials",
+			                    headers={"WWW-Authenticate": "Bearer"})
+		set_log_user(principal.id)
+		try:
+			return self.check_principal(principal)
+		except PermissionException as err:
+			raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(err))
+
+	def check_principal(self, principal: Principal) -> bool:
+		for role in self.roles:
+			if role.value in principal.roles:
+				return True
+		else:
+			raise PermissionException(message=f'Permission denied', role=str(self))
+
 	def __repr__(self) -> str:
 		return f"RolePermissions([{','.join(role.value for role in self.roles)}])"
@@ -0,0 +1,100 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import status
+from sqlalchemy import delete, insert, update
+from sqlalchemy.exc import IntegrityError
+
+from ..database import Database, AsyncDatabase, RepositoryException
+from ..database.db_utils import insert_ignore_conflicts
+from ..models import RevokedToken, User
+
+
+def _revoke_statement(db, jti: str, user_id: int, expires_at: datetime):
+	"""
+	INSERT ... ON CONFLICT (jti) DO NOTHING RETURNING jti: no row back means the token was
+	already revoked (used). Dialects without ON CONFLICT raise IntegrityError on the primary key
+	"""
+	statement = insert_ignore_conflicts(db, RevokedToken, [RevokedToken.jti])
+	if statement is None:
+		statement = insert(RevokedToken)
+	return statement.values(jti=jti, user_id=user_id, expires_at=expires_at).returning(RevokedToken.jti)
+
+
+def _bump_generation_statement(user_id: int):
+	return (
+		update(User)
+		.where(User.id == user_id)
+		.values(token_generation=User.token_generation + 1)
+		.returning(User.token_generation)
+	)
+
+
+def _prune_statement(now: datetime):
+	return delete(RevokedToken).where(RevokedToken.expires_at <= now)
+
+
+def _user_not_found(user_id: int) -> RepositoryException:
+	return RepositoryException(status_code=status.HTTP_404_NOT_FOUND,
+	                           message=f"Record by this id({user_id}) not found")
+
+
+class TokenRepository:
+	def __init__(self, db: Database):
+		self.db = db
+
+	def revoke(self, jti: str, user_id: int, expires_at: datetime) -> bool:
+		"""
+		Return: True if this call revoked the token, False if it was revoked before
+		"""
+		try:
+			revoked: Optional[str] = self.db.scalar(_revoke_statement(self.db, jti, user_id, expires_at))
+		except IntegrityError:
+			self.db.rollback()
+			return False
+
+		self.db.commit()
+		return revoked is not None
+
+	def bump_generation(self, user_id: int) -> int:
+		generation: Optional[int] = self.db.scalar(_bump_generation_statement(user_id))
+		if generation is None:
+			self.db.rollback()
+			raise _user_not_found(user_id)
+
+		self.db.commit()
+		return generation
+
+	def prune(self, now: datetime) -> int:
+		result = self.db.execute(_prune_statement(now))
+		self.db.commit()
+		return result.rowcount
+
+
+class AsyncTokenRepository:
+	def __init__(self, db: AsyncDatabase):
+		self.db = db
+
+	async def revoke(self, jti: str, user_id: int, expires_at: datetime) -> bool:
+		try:
+			revoked: Optional[str] = await self.db.scalar(_revoke_statement(self.db, jti, user_id, expires_at))
+		except IntegrityError:
+			await self.db.rollback()
+			return False
+
+		await self.db.commit()
+		return revoked is not None
+
+	async def bump_generation(self, user_id: int) -> int:
+		generation: Optional[int] = await self.db.scalar(_bump_generation_statement(user_id))
+		if generation is None:
+			await self.db.rollback()
+			raise _user_not_found(user_id)
+
+		await self.db.commit()
+		return generation
+
+	async def prune(self, now: datetime) -> int:
+		result = await self.db.execute(_prune_statement(now))
+		await self.db.commit()
+		return result.rowcount
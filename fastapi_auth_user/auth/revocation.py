@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from ..config import settings
+from ..metrics import metrics_registry
+
+
+class RevocationStore:
+	"""
+	In-process map of revoked refresh-token ids (jti -> expiry). A token revoked here is refused
+	with a dict lookup and no SQL; the revoked_tokens table stays the source of truth across
+	processes (its primary key decides which rotation of a token wins). Entries leave at expiry
+	or, past `max_size`, oldest first. `prune_due` paces pruning of the table.
+	"""
+
+	def __init__(self, max_size: int, prune_seconds: int):
+		self.max_size = max_size
+		self.prune_seconds = prune_seconds
+		self.__revoked: OrderedDict[str, float] = OrderedDict()
+		self.__pruned_at = time.monotonic()
+		self.__lock = Lock()
+
+	def is_revoked(self, jti: str) -> bool:
+		expires_at = self.__revoked.get(jti)
+		return expires_at is not None and expires_at > time.time()
+
+	def revoke(self, jti: str, expires_at: float):
+		if self.max_size <= 0:
+			return
+
+		with self.__lock:
+			self.__revoked[jti] = expires_at
+			while len(self.__revoked) > self.max_size:
+				self.__revoked.popitem(last=False)
+
+	def prune_due(self) -> bool:
+		"""
+		Return: True for the one caller that should prune now (at most once per `prune_seconds`);
+		expired entries are dropped from memory at the same time
+		"""
+		with self.__lock:
+			if time.monotonic() - self.__pruned_at < self.prune_seconds:
+				return False
+
+			self.__pruned_at = time.monotonic()
+			now = time.time()
+			for jti in [jti for jti, expires_at in self.__revoked.items() if expires_at <= now]:
+				del self.__revoked[jti]
+			return True
+
+	def clear(self):
+		with self.__lock:
+			self.__revoked.clear()
+
+	def __len__(self) -> int:
+		return len(self.__revoked)
+
+
+revocation_store = RevocationStore(settings.REVOCATION_CACHE_SIZE, settings.REVOCATION_PRUNE_MINUTES * 60)
+
+metrics_registry.register_stats('revocation_store', lambda: {'size': len(revocation_store)})
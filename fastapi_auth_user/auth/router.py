@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, Response, status
 
 from .user_forms import AuthUserDataForm, ResetUserPasswordDataForm
-from ..database import db_helper
-from ..users.schema import Tokens, Token, UserAuth, LiteUser, RefreshToken, TokenData
-from .service import AuthenticationService
+from ..database import db_helper, Database, query_budget
+from ..users.conditional import NOT_MODIFIED_RESPONSES, is_conditional, not_modified_response, set_validators
+from ..users.encoders import encoded_response, lite_user_encoder, token_data_encoder
+from ..users.schema import Tokens, LiteUser, RefreshToken, TokenData
+from .service import AuthenticationService, oauth2_scheme
+from .signing import signing_backend
 
 auth_router = APIRouter(
 	prefix='/api',
@@ -12,15 +15,21 @@ auth_router = APIRouter(
 	responses={status.HTTP_404_NOT_FOUND: {"description": "Not found"}},
 )
 
-auth_service = AuthenticationService(next(db_helper.session_dependency()))
+jwks_router = APIRouter(tags=["Authentication"])
 
+JWKS_MAX_AGE_SECONDS = 300
 
-@auth_router.post("/login", response_model=TokenData, status_code=status.HTTP_200_OK)
-def login_user(
-		user_data: AuthUserDataForm = Depends(AuthUserDataForm.as_form),
-):
-	user_data.email = user_data.username if user_data.email is None else user_data.email
-	tokens: Tokens = auth_service.get_tokens(user_data)
+
+@jwks_router.get("/.well-known/jwks.json")
+def get_jwks(response: Response):
+	"""
+	Public keys for verifying access tokens locally; select the key by the token header `kid`
+	"""
+	response.headers['Cache-Control'] = f'public, max-age={JWKS_MAX_AGE_SECONDS}'
+	return signing_backend.jwks()
+
+
+def token_data(tokens: Tokens) -> TokenData:
 	return TokenData(
 		access_token_time=tokens.access_token.token_time,
 		access_token=tokens.access_token.token,
@@ -29,23 +38,73 @@ def login_user(
 	)
 
 
-@auth_router.get("/profile/me", response_model=UserAuth, status_code=status.HTTP_201_CREATED)
+def get_auth_service(db: Database = Depends(db_helper.session_dependency)) -> AuthenticationService:
+	return AuthenticationService(db)
+
+
+@auth_router.post("/login", response_model=TokenData, status_code=status.HTTP_200_OK, dependencies=[query_budget(1)])
+def login_user(
+		request: Request,
+		user_data: AuthUserDataForm = Depends(AuthUserDataForm.as_form),
+		auth_service: AuthenticationService = Depends(get_auth_service)
+):
+	user_data.email = user_data.username if user_data.email is None else user_data.email
+	client_ip = request.client.host if request.client is not None else None
+	tokens: Tokens = auth_service.get_tokens(user_data, client_ip)
+	return encoded_response(token_data(tokens), token_data_encoder.encode)
+
+
+@auth_router.get("/profile/me", response_model=LiteUser, status_code=status.HTTP_201_CREATED,
+                 responses=NOT_MODIFIED_RESPONSES, dependencies=[query_budget(2)])
 def get_user_by_token(
-		token: str = Depends(auth_service.oauth2_scheme),
+		request: Request,
+		response: Response,
+		token: str = Depends(oauth2_scheme),
+		auth_service: AuthenticationService = Depends(get_auth_service)
 ):
-	return auth_service.get_user_by_token(token)
+	if is_conditional(request):
+		not_modified = not_modified_response(request, auth_service.get_user_version_by_token(token))
+		if not_modified is not None:
+			return not_modified
+
+	user = auth_service.get_user_by_token(token)
+	return encoded_response(user, lite_user_encoder.encode, status_code=status.HTTP_201_CREATED,
+	                        response=set_validators(response, user))
 
 
 @auth_router.post("/reset-password", response_model=LiteUser, status_code=status.HTTP_201_CREATED)
 def reset_password(
-		token: str = Depends(auth_service.oauth2_scheme),
+		token: str = Depends(oauth2_scheme),
 		user_data: ResetUserPasswordDataForm = Depends(ResetUserPasswordDataForm.as_form),
+		auth_service: AuthenticationService = Depends(get_auth_service)
 ):
 	return auth_service.reset_password(token, user_data.new_password)
 
 
-@auth_router.post("/refresh-token", response_model=Token, status_code=status.HTTP_200_OK)
-async def refresh_token(
-		token: RefreshToken
+@auth_router.post("/refresh-token", response_model=TokenData, status_code=status.HTTP_200_OK,
+                  dependencies=[query_budget(3)])
+def refresh_token(
+		token: RefreshToken,
+		auth_service: AuthenticationService = Depends(get_auth_service)
+):
+	return encoded_response(token_data(auth_service.refresh_access_token(token)), token_data_encoder.encode)
+
+
+@auth_router.post("/logout", status_code=status.HTTP_204_NO_CONTENT, response_class=Response,
+                  dependencies=[query_budget(2)])
+def logout(
+		token: RefreshToken,
+		auth_service: AuthenticationService = Depends(get_auth_service)
+):
+	auth_service.logout(token)
+	return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@auth_router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT, response_class=Response,
+                  dependencies=[query_budget(2)])
+def logout_all(
+		token: str = Depends(oauth2_scheme),
+		auth_service: AuthenticationService = Depends(get_auth_service)
 ):
-	return auth_service.refresh_access_token(token)
+	auth_service.logout_all(token)
+	return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,26 +1,47 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional, Sequence, Tuple
+from uuid import uuid4
 
 from fastapi import HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-from passlib.context import CryptContext
+from jose import JWTError
+from sqlalchemy import Row
+from sqlalchemy.orm.interfaces import LoaderOption
 
+from .cache import token_cache
+from .claims import principal_from_claims, claims_expire_at
+from .exception import HashingQueueFullException, LoginThrottledException
+from .hashing import password_hasher
+from .repository import TokenRepository, AsyncTokenRepository
+from .revocation import revocation_store
+from .signing import signing_backend
+from .throttle import login_throttle
 from .user_forms import AuthUserDataForm
-from ..logger import FastApiAuthLogger, LogLevel
+from ..logger import FastApiAuthLogger, LogLevel, set_log_user
 from ..config import settings
-from ..database import Database, RepositoryException
+from ..database import Database, AsyncDatabase, RepositoryException
+from ..metrics import instrument_methods
 from ..models import User
-from ..users.repository import UserRepository
-from ..users.schema import Token, UserAuth, UserTokenResponse, Tokens, RefreshToken
+from ..users.repository import UserRepository, AsyncUserRepository, load_user_roles, load_user_password
+from ..users.schema import Token, UserBase, UserTokenResponse, Tokens, RefreshToken, Principal
 
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login", scheme_name='scheme_name')
 
+ACCESS_TOKEN_TYPE = 'access'
+REFRESH_TOKEN_TYPE = 'refresh'
+
+
+@instrument_methods
 class AuthenticationService:
 
 	def __init__(self, db: Database):
 		self.__db = db
-		self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-		self.oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login", scheme_name='scheme_name')
+		self.hasher = password_hasher
+		self.token_cache = token_cache
+		self.signing_backend = signing_backend
+		self.revocation_store = revocation_store
+		self.login_throttle = login_throttle
+		self.oauth2_scheme = oauth2_scheme
 		self.__logger = FastApiAuthLogger("auth service", LogLevel.INFO)
 
 	def create_token(self, data: dict, expires_delta: Optional[timedelta] = None) -> Token:
@@ -29,26 +50,115 @@ class AuthenticationService:
 			expire = datetime.utcnow() + expires_delta
 		else:
 			expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-		to_encode.update({"exp": expire})
+		to_encode.update({"exp": expire, "iat": datetime.utcnow()})
 
-		encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+		encoded_jwt = self.signing_backend.sign(to_encode)
 		token: Token = Token(token=encoded_jwt, token_time=expire)
 
 		return token
 
+	def token_claims(self, user: User) -> dict:
+		claims = UserBase.from_orm(user).dict()
+		if settings.STATELESS_AUTH:
+			claims.update({"sub": str(user.id), "roles": sorted(role.name for role in user.roles)})
+		return claims
+
+	def refresh_claims(self, user: User) -> dict:
+		"""
+		Return: claims of a single-use refresh token: its id (jti), the user and the user's token generation
+		"""
+		return {"sub": str(user.id), "email": user.email, "jti": uuid4().hex,
+		        "gen": user.token_generation, "typ": REFRESH_TOKEN_TYPE}
+
+	def issue_tokens(self, user: User) -> Tokens:
+		access_token: Token = self.create_token(data=self.token_claims(user))
+		refresh_token: Token = self.create_token(data=self.refresh_claims(user),
+		                                         expires_delta=timedelta(hours=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+		return Tokens(access_token=access_token, refresh_token=refresh_token)
+
+	@property
+	def claims_options(self) -> Sequence[LoaderOption]:
+		"""
+		Return: loader options for users whose token claims will be built (roles are claims in stateless mode)
+		"""
+		return (load_user_roles,) if settings.STATELESS_AUTH else ()
+
 	def password_hash(self, password: str) -> str:
-		return self.pwd_context.hash(password)
+		self.__end_read_transaction()
+		try:
+			return self.hasher.hash(password)
+		except HashingQueueFullException as err:
+			raise self.__hashing_unavailable(err)
 
 	def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-		return self.pwd_context.verify(plain_password, hashed_password)
+		self.__end_read_transaction()
+		try:
+			return self.hasher.verify(plain_password, hashed_password)
+		except HashingQueueFullException as err:
+			raise self.__hashing_unavailable(err)
 
-	def get_tokens(self, user_data: AuthUserDataForm) -> Tokens:
+	def hash_many(self, passwords: List[str]) -> List[str]:
+		self.__end_read_transaction()
+		return self.hasher.hash_many(passwords)
+
+	async def hash_many_async(self, passwords: List[str]) -> List[str]:
+		await self.__end_read_transaction_async()
+		return await self.hasher.hash_many_async(passwords)
+
+	async def hash_async(self, password: str) -> str:
+		await self.__end_read_transaction_async()
+		try:
+			return await self.hasher.hash_async(password)
+		except HashingQueueFullException as err:
+			raise self.__hashing_unavailable(err)
+
+	async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+		await self.__end_read_transaction_async()
 		try:
-			user = UserRepository(self.__db).get_user_by_email(user_data.email)
+			return await self.hasher.verify_async(plain_password, hashed_password)
+		except HashingQueueFullException as err:
+			raise self.__hashing_unavailable(err)
+
+	def __end_read_transaction(self):
+		"""
+		Commit what the request has read before bcrypt runs, so it does not hold a pooled connection and
+		an open transaction while it waits for a hash worker (the hash queue admits far more callers than
+		the pool has connections). Callers hash before they write; loaded entities stay usable
+		(expire_on_commit=False) and later statements check out a connection again.
+		"""
+		if self.__db.in_transaction():
+			self.__db.commit()
+
+	async def __end_read_transaction_async(self):
+		if self.__db.in_transaction():
+			await self.__db.commit()
+
+	def __hashing_unavailable(self, err: HashingQueueFullException) -> HTTPException:
+		self.__logger.warning("Method[%s](%s): Warning", self.password_hash.__name__, err.message)
+		return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+		                     detail=err.message,
+		                     headers={"Retry-After": str(err.retry_after)})
+
+	def login_throttled(self, err: LoginThrottledException) -> HTTPException:
+		self.__logger.warning("Method[%s](%s): Warning", self.get_tokens.__name__, err.message)
+		return HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+		                     detail=err.message,
+		                     headers={"Retry-After": str(err.retry_after)})
+
+	def get_tokens(self, user_data: AuthUserDataForm, client_ip: Optional[str] = None) -> Tokens:
+		"""
+		Login: throttled emails and IPs get 429 before the user is read or the password hashed
+		"""
+		attempt = None
+		try:
+			attempt = self.login_throttle.reserve(user_data.email, client_ip)
+			options = (*self.claims_options, load_user_password)
+			user = UserRepository(self.__db).get_user_by_email(user_data.email, options)
 
 			if user is None:
-				self.__logger.error(f"Method[{self.get_tokens.__name__}]" +
-				                    f"(There is no user with that e-mail:[{user_data.email}] address): Error")
+				self.login_throttle.record_failure(attempt)
+				self.__logger.error("Method[%s](There is no user with that e-mail:[%s] address): Error",
+				                    self.get_tokens.__name__, user_data.email)
 
 				raise RepositoryException(
 					status_code=status.HTTP_404_NOT_FOUND,
@@ -56,83 +166,343 @@ class AuthenticationService:
 				)
 
 			if not self.verify_password(user_data.password, user.password):
-				self.__logger.error(f"Method[{self.get_tokens.__name__}](Wrong password): Error")
+				self.login_throttle.record_failure(attempt)
+				self.__logger.error("Method[%s](Wrong password): Error", self.get_tokens.__name__)
 				raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
 				                    detail="Wrong password")
 
-			user_dict = UserAuth.from_orm(user).dict()
-			access_token: Token = self.create_token(data=user_dict)
-			refresh_token: Token = self.create_token(data=user_dict,
-			                                         expires_delta=timedelta(
-				                                         hours=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
-
-			tokens: Tokens = Tokens(access_token=access_token, refresh_token=refresh_token)
-			self.__logger.info(f"Method[{self.get_tokens.__name__}]: Success")
+			self.login_throttle.record_success(attempt)
+			set_log_user(user.id)
+			tokens: Tokens = self.issue_tokens(user)
+			self.__logger.info("Method[%s]: Success", self.get_tokens.__name__)
 			return tokens
 
+		except LoginThrottledException as err:
+			raise self.login_throttled(err)
+
 		except RepositoryException as err:
 			raise err
 
 		except HTTPException as http_err:
-			self.__logger.error(f"Method[{self.get_tokens.__name__}]({str(http_err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.get_tokens.__name__, http_err)
 			raise http_err
 
 		except Exception as err:
-			self.__logger.error(f"Method[{self.get_tokens.__name__}]({str(err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.get_tokens.__name__, err)
 			raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
 			                    detail="Internal server error")
 
-	def get_user_by_token(self, token: str) -> User:
-		try:
-			payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-
-			if payload is None:
-				self.__logger.error(f"Method[{self.get_user_by_token.__name__}](Payload is None): Error")
-				raise HTTPException(
-					status_code=status.HTTP_401_UNAUTHORIZED,
-					detail="Invalid authentication credentials",
-					headers={"WWW-Authenticate": "Bearer"},
-				)
+		finally:
+			self.login_throttle.release(attempt)
 
-			user = UserRepository(self.__db).get_user_by_email(payload.get('email'))
-			if user is None:
-				self.__logger.error(f"Method[{self.get_user_by_token.__name__}]" +
-				                    f"(User with email={payload.get('email')}): Error")
+	def get_user_by_token(self, token: str, options: Sequence[LoaderOption] = ()) -> User:
+		payload = self.decode_token(token)
+		user = self.__get_payload_user(payload, options)
+		self.__logger.info("Method[%s]: Success", self.get_user_by_token.__name__)
+		return user
 
-				raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-				                    detail="User not found")
+	def get_user_version_by_token(self, token: str) -> Optional[Row]:
+		"""
+		Return: id, version and updated_at of the token's user for conditional GETs, None if missing
+		"""
+		return UserRepository(self.__db).get_version_by_email(self.decode_token(token).get('email'))
+
+	def get_principal_by_token(self, token: str) -> Principal:
+		principal, payload = self.resolve_principal(token)
+		if principal is not None:
+			return principal
+
+		user = self.__get_payload_user(payload, (load_user_roles,))
+		return self.cache_principal(token, user, payload)
+
+	def resolve_principal(self, token: str) -> Tuple[Optional[Principal], Optional[dict]]:
+		"""
+		Return: principal from the token cache or the signed claims, and the decoded payload.
+		Principal is None when the user has to be loaded from the database
+		"""
+		principal = self.token_cache.get(token)
+		if principal is not None:
+			return principal, None
+
+		payload = self.decode_token(token)
+		principal = self.principal_from_claims(payload) if settings.STATELESS_AUTH else None
+		if principal is not None:
+			self.token_cache.set(token, principal,
+			                     claims_expire_at(payload, settings.ROLE_CLAIMS_MAX_AGE_MINUTES * 60))
+
+		return principal, payload
 
-			self.__logger.info(f"Method[{self.get_user_by_token.__name__}]: Success")
-			return user
+	def cache_principal(self, token: str, user: User, payload: dict) -> Principal:
+		principal = Principal(id=user.id, email=user.email, roles=frozenset(role.name for role in user.roles))
+		self.token_cache.set(token, principal, payload.get('exp'))
+		return principal
 
+	def principal_from_claims(self, payload: dict) -> Optional[Principal]:
+		"""
+		Return: principal built from signed role claims, or None if the token has no claims
+		or they are older than ROLE_CLAIMS_MAX_AGE_MINUTES (caller falls back to the database)
+		"""
+		return principal_from_claims(payload, settings.ROLE_CLAIMS_MAX_AGE_MINUTES * 60)
+
+	def decode_token(self, token: str, token_type: str = ACCESS_TOKEN_TYPE) -> dict:
+		"""
+		Return: verified claims of a `token_type` token (tokens without "typ" are access tokens)
+		"""
+		try:
+			payload = self.signing_backend.verify(token)
 		except JWTError:
+			payload = None
 
+		if payload is not None and payload.get('typ', ACCESS_TOKEN_TYPE) != token_type:
+			payload = None
+
+		if payload is None:
+			self.__logger.error("Method[%s](Invalid token): Error", self.decode_token.__name__)
 			raise HTTPException(
 				status_code=status.HTTP_401_UNAUTHORIZED,
 				detail="Invalid authentication credentials",
 				headers={"WWW-Authenticate": "Bearer"},
 			)
 
+		return payload
+
+	def __get_payload_user(self, payload: dict, options: Sequence[LoaderOption] = ()) -> User:
+		user = UserRepository(self.__db).get_user_by_email(payload.get('email'), options)
+		if user is None:
+			self.__logger.error("Method[%s](User with email=%s): Error",
+			                    self.get_user_by_token.__name__, payload.get('email'))
+
+			raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+			                    detail="User not found")
+
+		return user
+
 	def reset_password(self, token: str, new_password: str) -> UserTokenResponse:
 		try:
-			hashed_password = self.password_hash(new_password)
 			user: User = self.get_user_by_token(token)
+			hashed_password = self.password_hash(new_password)
 			updated_user = UserRepository(self.__db).set_password(user.id, hashed_password)
-			self.__logger.info(f"Method[{self.reset_password.__name__}]: Success")
+			self.token_cache.invalidate_user(user.id)
+			self.__logger.info("Method[%s]: Success", self.reset_password.__name__)
+			return updated_user
+		except RepositoryException as err:
+			self.__logger.error("Method[%s](%s): Error", self.reset_password.__name__, err)
+			raise err
+
+	def verify_refresh_token(self, token: str) -> dict:
+		"""
+		Return: claims of a refresh token not yet known as revoked to this process (no SQL)
+		"""
+		payload = self.decode_token(token, REFRESH_TOKEN_TYPE)
+		if payload.get('jti') is None or self.revocation_store.is_revoked(payload.get('jti')):
+			raise self.token_revoked()
+		return payload
+
+	def token_revoked(self) -> HTTPException:
+		self.__logger.error("Method[%s](Refresh token revoked): Error", self.verify_refresh_token.__name__)
+		return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+		                     detail="Refresh token revoked",
+		                     headers={"WWW-Authenticate": "Bearer"})
+
+	def revoke_refresh_token(self, payload: dict) -> bool:
+		"""
+		Return: True if this call revoked the token, False if it was used or revoked before
+		"""
+		repository = TokenRepository(self.__db)
+		revoked = repository.revoke(payload.get('jti'), int(payload.get('sub')),
+		                            datetime.utcfromtimestamp(payload.get('exp')))
+		self.revocation_store.revoke(payload.get('jti'), payload.get('exp'))
+		if self.revocation_store.prune_due():
+			repository.prune(datetime.utcnow())
+		return revoked
+
+	def refresh_access_token(self, token: RefreshToken) -> Tokens:
+		"""
+		Rotate a refresh token: it is revoked and a new access and refresh token pair is issued.
+		A used token, or one issued before the last logout-all, is refused
+		"""
+		try:
+			payload = self.verify_refresh_token(token.refresh_token)
+			user: User = self.__get_payload_user(payload, self.claims_options)
+			if user.token_generation != payload.get('gen') or not self.revoke_refresh_token(payload):
+				raise self.token_revoked()
+
+			tokens: Tokens = self.issue_tokens(user)
+			self.__logger.info("Method[%s]: Success", self.refresh_access_token.__name__)
+			return tokens
+
+		except HTTPException as http_err:
+			self.__logger.error("Method[%s](%s): Error", self.refresh_access_token.__name__, http_err)
+			raise http_err
+
+		except Exception as err:
+			self.__logger.error("Method[%s](%s): Error", self.refresh_access_token.__name__, err)
+			raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+			                    detail="User not found")
+
+	def logout(self, token: RefreshToken):
+		payload = self.decode_token(token.refresh_token, REFRESH_TOKEN_TYPE)
+		if payload.get('jti') is None:
+			raise self.token_revoked()
+
+		self.revoke_refresh_token(payload)
+		self.__logger.info("Method[%s]: Success", self.logout.__name__)
+
+	def logout_all(self, token: str):
+		"""
+		Revoke every refresh token of the token owner by bumping the user's token generation
+		"""
+		try:
+			user: User = self.get_user_by_token(token)
+			TokenRepository(self.__db).bump_generation(user.id)
+			self.token_cache.invalidate_user(user.id)
+			self.__logger.info("Method[%s]: Success", self.logout_all.__name__)
+		except RepositoryException as err:
+			self.__logger.error("Method[%s](%s): Error", self.logout_all.__name__, err.message)
+			raise HTTPException(status_code=err.status_code, detail=str(err.message))
+
+
+@instrument_methods
+class AsyncAuthenticationService(AuthenticationService):
+	"""
+	AuthenticationService over an AsyncSession: database-bound methods are coroutines,
+	token, claim and hashing helpers are inherited.
+	"""
+
+	def __init__(self, db: AsyncDatabase):
+		super().__init__(db)
+		self.__db = db
+		self.__logger = FastApiAuthLogger("auth service", LogLevel.INFO)
+
+	async def get_tokens(self, user_data: AuthUserDataForm, client_ip: Optional[str] = None) -> Tokens:
+		attempt = None
+		try:
+			attempt = self.login_throttle.reserve(user_data.email, client_ip)
+			user = await AsyncUserRepository(self.__db).get_user_by_email(user_data.email, (load_user_password,))
+
+			if user is None:
+				self.login_throttle.record_failure(attempt)
+				self.__logger.error("Method[%s](There is no user with that e-mail:[%s] address): Error",
+				                    self.get_tokens.__name__, user_data.email)
+
+				raise RepositoryException(
+					status_code=status.HTTP_404_NOT_FOUND,
+					message=f'There is no user with that e-mail address.'
+				)
+
+			if not await self.verify_async(user_data.password, user.password):
+				self.login_throttle.record_failure(attempt)
+				self.__logger.error("Method[%s](Wrong password): Error", self.get_tokens.__name__)
+				raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+				                    detail="Wrong password")
+
+			self.login_throttle.record_success(attempt)
+			set_log_user(user.id)
+			tokens: Tokens = self.issue_tokens(user)
+			self.__logger.info("Method[%s]: Success", self.get_tokens.__name__)
+			return tokens
+
+		except LoginThrottledException as err:
+			raise self.login_throttled(err)
+
+		except RepositoryException as err:
+			raise err
+
+		except HTTPException as http_err:
+			self.__logger.error("Method[%s](%s): Error", self.get_tokens.__name__, http_err)
+			raise http_err
+
+		except Exception as err:
+			self.__logger.error("Method[%s](%s): Error", self.get_tokens.__name__, err)
+			raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                    detail="Internal server error")
+
+		finally:
+			self.login_throttle.release(attempt)
+
+	async def get_user_by_token(self, token: str, options: Sequence[LoaderOption] = ()) -> User:
+		payload = self.decode_token(token)
+		user = await self.__get_payload_user(payload, options)
+		self.__logger.info("Method[%s]: Success", self.get_user_by_token.__name__)
+		return user
+
+	async def get_user_version_by_token(self, token: str) -> Optional[Row]:
+		return await AsyncUserRepository(self.__db).get_version_by_email(self.decode_token(token).get('email'))
+
+	async def get_principal_by_token(self, token: str) -> Principal:
+		principal, payload = self.resolve_principal(token)
+		if principal is not None:
+			return principal
+
+		user = await self.__get_payload_user(payload)
+		return self.cache_principal(token, user, payload)
+
+	async def __get_payload_user(self, payload: dict, options: Sequence[LoaderOption] = ()) -> User:
+		user = await AsyncUserRepository(self.__db).get_user_by_email(payload.get('email'), options)
+		if user is None:
+			self.__logger.error("Method[%s](User with email=%s): Error",
+			                    self.get_user_by_token.__name__, payload.get('email'))
+
+			raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+			                    detail="User not found")
+
+		return user
+
+	async def reset_password(self, token: str, new_password: str) -> UserTokenResponse:
+		try:
+			user: User = await self.get_user_by_token(token)
+			hashed_password = await self.hash_async(new_password)
+			updated_user = await AsyncUserRepository(self.__db).set_password(user.id, hashed_password)
+			self.token_cache.invalidate_user(user.id)
+			self.__logger.info("Method[%s]: Success", self.reset_password.__name__)
 			return updated_user
 		except RepositoryException as err:
-			self.__logger.error(f"Method[{self.reset_password.__name__}]({str(err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.reset_password.__name__, err)
 			raise err
 
-	def refresh_access_token(self, token: RefreshToken) -> Token:
+	async def revoke_refresh_token(self, payload: dict) -> bool:
+		repository = AsyncTokenRepository(self.__db)
+		revoked = await repository.revoke(payload.get('jti'), int(payload.get('sub')),
+		                                  datetime.utcfromtimestamp(payload.get('exp')))
+		self.revocation_store.revoke(payload.get('jti'), payload.get('exp'))
+		if self.revocation_store.prune_due():
+			await repository.prune(datetime.utcnow())
+		return revoked
+
+	async def refresh_access_token(self, token: RefreshToken) -> Tokens:
 		try:
-			user: User = self.get_user_by_token(token.refresh_token)
-			user_dict = UserAuth.from_orm(user).dict()
-			access_token: Token = self.create_token(user_dict)
-			self.__logger.info(f"Method[{self.refresh_access_token.__name__}]: Success")
-			return access_token
+			payload = self.verify_refresh_token(token.refresh_token)
+			user: User = await self.__get_payload_user(payload)
+			if user.token_generation != payload.get('gen') or not await self.revoke_refresh_token(payload):
+				raise self.token_revoked()
+
+			tokens: Tokens = self.issue_tokens(user)
+			self.__logger.info("Method[%s]: Success", self.refresh_access_token.__name__)
+			return tokens
+
+		except HTTPException as http_err:
+			self.__logger.error("Method[%s](%s): Error", self.refresh_access_token.__name__, http_err)
+			raise http_err
 
 		except Exception as err:
-			self.__logger.error(f"Method[{self.refresh_access_token.__name__}]({str(err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.refresh_access_token.__name__, err)
 			raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
 			                    detail="User not found")
+
+	async def logout(self, token: RefreshToken):
+		payload = self.decode_token(token.refresh_token, REFRESH_TOKEN_TYPE)
+		if payload.get('jti') is None:
+			raise self.token_revoked()
+
+		await self.revoke_refresh_token(payload)
+		self.__logger.info("Method[%s]: Success", self.logout.__name__)
+
+	async def logout_all(self, token: str):
+		try:
+			user: User = await self.get_user_by_token(token)
+			await AsyncTokenRepository(self.__db).bump_generation(user.id)
+			self.token_cache.invalidate_user(user.id)
+			self.__logger.info("Method[%s]: Success", self.logout_all.__name__)
+		except RepositoryException as err:
+			self.__logger.error("Method[%s](%s): Error", self.logout_all.__name__, err.message)
+			raise HTTPException(status_code=err.status_code, detail=str(err.message))
@@ -0,0 +1,135 @@
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from jose import jwk, jwt, JWTError
+from jose.backends.base import Key
+from jose.constants import ALGORITHMS
+
+from ..config import settings
+from ..metrics.instrument import JWT_DURATION, observe_since
+
+ASYMMETRIC_ALGORITHMS = ALGORITHMS.RSA | ALGORITHMS.EC
+
+
+class SigningKey(NamedTuple):
+	kid: Optional[str]
+	algorithm: str
+	key: Key
+	verify_key: Key
+	public_jwk: Optional[dict]
+
+
+def load_key(kid: Optional[str], algorithm: str, key_material: str) -> SigningKey:
+	"""
+	Parse a secret (HS*) or a PEM key (RS*, ES*) once into a python-jose key object.
+	Asymmetric keys also get their public JWK for /.well-known/jwks.json
+	"""
+	if algorithm not in ALGORITHMS.SUPPORTED:
+		raise ValueError(f"Unsupported JWT algorithm [{algorithm}] "
+		                 f"(supported: {', '.join(sorted(ALGORITHMS.SUPPORTED))})")
+
+	key = jwk.construct(key_material, algorithm)
+	if algorithm not in ASYMMETRIC_ALGORITHMS:
+		return SigningKey(kid=kid, algorithm=algorithm, key=key, verify_key=key, public_jwk=None)
+
+	verify_key = key if key.is_public() else key.public_key()
+	public_jwk = {**verify_key.to_dict(), 'use': 'sig'}
+	if kid is not None:
+		public_jwk['kid'] = kid
+
+	return SigningKey(kid=kid, algorithm=algorithm, key=key, verify_key=verify_key, public_jwk=public_jwk)
+
+
+def key_from_jwk(public_jwk: dict) -> SigningKey:
+	"""
+	Build a verification key from a published JWK; only asymmetric keys are accepted
+	"""
+	algorithm = public_jwk.get('alg')
+	if algorithm not in ASYMMETRIC_ALGORITHMS:
+		raise ValueError(f"Unsupported JWK algorithm [{algorithm}]")
+
+	key = jwk.construct(public_jwk, algorithm)
+	return SigningKey(kid=public_jwk.get('kid'), algorithm=algorithm, key=key, verify_key=key, public_jwk=public_jwk)
+
+
+def read_key_file(path: str) -> str:
+	with open(path) as key_file:
+		return key_file.read()
+
+
+class SigningBackend:
+	"""
+	Signs tokens with the active key and verifies them with any key of the ring.
+	Keys are parsed once; the token header `kid` picks the verification key, so tokens
+	signed before a rotation stay valid while their key is listed as a verify key.
+	"""
+
+	def __init__(self, active: SigningKey, verify_keys: List[SigningKey] = ()):
+		self.active = active
+		self.__keys: Dict[Optional[str], SigningKey] = {key.kid: key for key in verify_keys}
+		self.__keys[active.kid] = active
+
+	@classmethod
+	def from_settings(cls) -> 'SigningBackend':
+		"""
+		HS* signs with SECRET_KEY; RS*/ES* sign with JWT_PRIVATE_KEY_FILE and also verify
+		with the retired public keys of JWT_VERIFY_KEY_FILES (`kid:path,kid:path`)
+		"""
+		algorithm = settings.ALGORITHM
+		if algorithm not in ASYMMETRIC_ALGORITHMS:
+			return cls(load_key(settings.JWT_KEY_ID, algorithm, settings.SECRET_KEY))
+
+		if not settings.JWT_PRIVATE_KEY_FILE:
+			raise ValueError(f"JWT_PRIVATE_KEY_FILE is required for ALGORITHM={algorithm}")
+
+		active = load_key(settings.JWT_KEY_ID, algorithm, read_key_file(settings.JWT_PRIVATE_KEY_FILE))
+		verify_keys = []
+		for entry in filter(None, (settings.JWT_VERIFY_KEY_FILES or '').split(',')):
+			kid, _, path = entry.strip().partition(':')
+			verify_keys.append(load_key(kid, algorithm, read_key_file(path)))
+
+		return cls(active, verify_keys)
+
+	def sign(self, claims: dict) -> str:
+		headers = {'kid': self.active.kid} if self.active.kid is not None else None
+		started = time.perf_counter()
+		try:
+			return jwt.encode(claims, self.active.key, algorithm=self.active.algorithm, headers=headers)
+		finally:
+			observe_since(JWT_DURATION, started, 'encode')
+
+	def verify(self, token: str) -> dict:
+		"""
+		Return: verified claims; raise JWTError for an unknown kid, a foreign algorithm,
+		a bad signature or expired claims
+		"""
+		started = time.perf_counter()
+		try:
+			return verify_token(token, self.get_key)
+		finally:
+			observe_since(JWT_DURATION, started, 'decode')
+
+	def get_key(self, kid: Optional[str]) -> Optional[SigningKey]:
+		return self.__keys.get(kid)
+
+	def jwks(self) -> dict:
+		"""
+		Return: JWK Set of the public keys (empty for HS*, shared secrets are never published)
+		"""
+		return {'keys': [key.public_jwk for key in self.__keys.values() if key.public_jwk is not None]}
+
+
+def verify_token(token: str, get_key: Callable[[Optional[str]], Optional[SigningKey]]) -> dict:
+	"""
+	Return: claims of `token` verified with the key `get_key` returns for its header `kid`;
+	the key also pins the accepted algorithm
+	"""
+	kid = jwt.get_unverified_header(token).get('kid')
+	key = get_key(kid)
+	if key is None:
+		raise JWTError(f"Unknown key id [{kid}]")
+
+	return jwt.decode(token, key.verify_key, algorithms=[key.algorithm])
+
+
+signing_backend = SigningBackend.from_settings()
@@ -0,0 +1,236 @@
+import math
+import time
+from threading import Lock
+from typing import Dict, List, Optional, Protocol, Tuple
+
+from .exception import LoginThrottledException
+from ..config import settings
+from ..metrics import metrics_registry
+
+
+class ThrottleBackend(Protocol):
+	"""
+	Storage of fixed-window failure counters; share one between workers to throttle across them
+	"""
+
+	def incr(self, key: str, window_id: int, ttl: int) -> Tuple[int, int]:
+		"""
+		Atomically count one attempt in `window_id`
+		Return: counts of the window before `window_id` and of `window_id`, this attempt included
+		"""
+		...
+
+	def decr(self, key: str, window_id: int, ttl: int) -> None:
+		"""
+		Give back an attempt counted by `incr`
+		"""
+		...
+
+	def reset(self, key: str, window_id: int) -> None:
+		"""
+		Drop the counts of `window_id` and of the window before it
+		"""
+		...
+
+
+class MemoryThrottleBackend:
+	"""
+	Counters of this process; stale keys are swept once per window
+	"""
+
+	def __init__(self):
+		self.__counters: Dict[str, Dict[int, int]] = {}
+		self.__swept_window = 0
+		self.__lock = Lock()
+
+	def incr(self, key: str, window_id: int, ttl: int) -> Tuple[int, int]:
+		with self.__lock:
+			if window_id != self.__swept_window:
+				self.__sweep(window_id)
+			windows = self.__counters.setdefault(key, {})
+			windows[window_id] = windows.get(window_id, 0) + 1
+			return windows.get(window_id - 1, 0), windows[window_id]
+
+	def decr(self, key: str, window_id: int, ttl: int) -> None:
+		with self.__lock:
+			windows = self.__counters.get(key)
+			if windows and windows.get(window_id, 0) > 0:
+				windows[window_id] -= 1
+
+	def reset(self, key: str, window_id: int) -> None:
+		with self.__lock:
+			self.__counters.pop(key, None)
+
+	def __sweep(self, window_id: int):
+		self.__swept_window = window_id
+		for key in list(self.__counters):
+			windows = {window: count for window, count in self.__counters[key].items() if window >= window_id - 1}
+			if windows:
+				self.__counters[key] = windows
+			else:
+				del self.__counters[key]
+
+
+class RedisThrottleBackend:
+	"""
+	Counters in Redis for multi-worker setups; takes any redis-py compatible client
+	(`redis.Redis.from_url(...)`), so redis is not a dependency of this package
+	"""
+
+	def __init__(self, client, prefix: str = 'login-throttle'):
+		self.client = client
+		self.prefix = prefix
+
+	def incr(self, key: str, window_id: int, ttl: int) -> Tuple[int, int]:
+		# MULTI/EXEC: the increment and the read of the previous window are one atomic step
+		pipeline = self.client.pipeline(transaction=True)
+		pipeline.incr(self.__key(key, window_id))
+		pipeline.expire(self.__key(key, window_id), ttl)
+		pipeline.get(self.__key(key, window_id - 1))
+		current, _, previous = pipeline.execute()
+		return int(previous or 0), int(current)
+
+	def decr(self, key: str, window_id: int, ttl: int) -> None:
+		pipeline = self.client.pipeline(transaction=True)
+		pipeline.decr(self.__key(key, window_id))
+		pipeline.expire(self.__key(key, window_id), ttl)
+		pipeline.execute()
+
+	def reset(self, key: str, window_id: int) -> None:
+		self.client.delete(self.__key(key, window_id - 1), self.__key(key, window_id))
+
+	def __key(self, key: str, window_id: int) -> str:
+		return f"{self.prefix}:{key}:{window_id}"
+
+
+class LoginAttempt:
+	"""
+	Failure slots of one login, reserved by `LoginThrottle.reserve` in every counter it is limited by.
+	The attempt counts as a failure until it is settled otherwise.
+	"""
+
+	__slots__ = ('email_key', 'ip_key', 'window_id', 'settled')
+
+	def __init__(self, email_key: Optional[str], ip_key: Optional[str], window_id: int):
+		self.email_key = email_key
+		self.ip_key = ip_key
+		self.window_id = window_id
+		self.settled = False
+
+	def keys(self) -> List[str]:
+		return [key for key in (self.email_key, self.ip_key) if key is not None]
+
+
+class LoginThrottle:
+	"""
+	Sliding-window limit of failed logins per email and per client IP. `reserve` counts the attempt
+	before the user is read or the password hashed: the counter is incremented first and the attempt
+	is rejected (and given back) when that puts the key over its limit, so of any number of concurrent
+	attempts at most the limit get through to bcrypt. A successful login gives its slot back.
+	The window count is estimated from two fixed windows (previous weighted by its remaining
+	overlap), which keeps two counters per key in any backend.
+	"""
+
+	def __init__(self, backend: ThrottleBackend, window_seconds: int, max_per_email: int, max_per_ip: int):
+		self.backend = backend
+		self.window_seconds = window_seconds
+		self.limits = {'email': max_per_email, 'ip': max_per_ip}
+		self.throttled = {'email': 0, 'ip': 0}
+		self.failures = 0
+
+	def reserve(self, email: Optional[str], client_ip: Optional[str]) -> LoginAttempt:
+		"""
+		Raise LoginThrottledException when the email or the IP is over its limit
+		Return: the reserved attempt; settle it with `record_failure`, `record_success` or `release`
+		"""
+		now = time.time()
+		window_id = int(now // self.window_seconds)
+		keys = dict(self.__keys(email, client_ip))
+		attempt = LoginAttempt(keys.get('email'), keys.get('ip'), window_id)
+
+		reserved = []
+		for scope, key in keys.items():
+			previous, current = self.backend.incr(key, window_id, self.__ttl())
+			reserved.append(key)
+			# counts without this attempt, as a check before it would have seen them
+			retry_after = self.__retry_after(previous, current - 1, self.limits[scope], now)
+			if retry_after is not None:
+				for reserved_key in reserved:
+					self.backend.decr(reserved_key, window_id, self.__ttl())
+				self.throttled[scope] += 1
+				raise LoginThrottledException(message=f'Too many failed login attempts for this {scope}',
+				                              retry_after=retry_after)
+		return attempt
+
+	def record_failure(self, attempt: LoginAttempt):
+		"""
+		Keep the reserved slots: the attempt failed
+		"""
+		attempt.settled = True
+		self.failures += 1
+
+	def record_success(self, attempt: LoginAttempt):
+		"""
+		Forget the failures of the email and give the IP slot back
+		"""
+		attempt.settled = True
+		if attempt.email_key is not None:
+			self.backend.reset(attempt.email_key, attempt.window_id)
+		if attempt.ip_key is not None:
+			self.backend.decr(attempt.ip_key, attempt.window_id, self.__ttl())
+
+	def release(self, attempt: Optional[LoginAttempt]):
+		"""
+		Give back the slots of an attempt that ended before the credentials were judged (hash queue
+		full, database error); no-op once the attempt is settled
+		"""
+		if attempt is None or attempt.settled:
+			return
+		attempt.settled = True
+		for key in attempt.keys():
+			self.backend.decr(key, attempt.window_id, self.__ttl())
+
+	def stats(self) -> dict:
+		return {
+			'failures': self.failures,
+			'throttled_email': self.throttled['email'],
+			'throttled_ip': self.throttled['ip'],
+		}
+
+	def __ttl(self) -> int:
+		return 2 * self.window_seconds
+
+	def __keys(self, email: Optional[str], client_ip: Optional[str]) -> List[Tuple[str, str]]:
+		keys = []
+		if email and self.limits['email'] > 0:
+			keys.append(('email', f"email:{email.lower()}"))
+		if client_ip and self.limits['ip'] > 0:
+			keys.append(('ip', f"ip:{client_ip}"))
+		return keys
+
+	def __retry_after(self, previous: int, current: int, limit: int, now: float) -> Optional[int]:
+		"""
+		Return: seconds until the estimated window count drops under `limit`, None if it already is
+		"""
+		window = self.window_seconds
+		elapsed = now - int(now // window) * window
+		if previous * (1 - elapsed / window) + current < limit:
+			return None
+
+		if current >= limit:
+			# previous window is irrelevant; wait until `current` has slid far enough out of the next one
+			wait = (window - elapsed) + window * (1 - limit / current)
+		else:
+			wait = window * (1 - (limit - current) / previous) - elapsed
+		return max(1, math.ceil(wait))
+
+
+login_throttle = LoginThrottle(
+	MemoryThrottleBackend(),
+	settings.LOGIN_THROTTLE_WINDOW_SECONDS,
+	settings.LOGIN_MAX_FAILURES_PER_EMAIL,
+	settings.LOGIN_MAX_FAILURES_PER_IP
+)
+
+metrics_registry.register_stats('login_throttle', login_throttle.stats,
+                                 counters=('failures', 'throttled_email', 'throttled_ip'))
@@ -12,10 +12,48 @@ class Settings(BaseSettings):
 	DB_HOST: str | None = os.getenv("DB_HOST")
 	DB_NAME: str | None = os.getenv("DB_NAME")
 	DATABASE_URL: str = os.getenv("DATABASE_URL")
+	ASYNC_DATABASE: bool = os.getenv("ASYNC_DATABASE", False)
+	ASYNC_DATABASE_URL: str | None = os.getenv("ASYNC_DATABASE_URL")
+	DB_POOL_SIZE: int = os.getenv("DB_POOL_SIZE", 5)
+	DB_MAX_OVERFLOW: int = os.getenv("DB_MAX_OVERFLOW", 10)
+	DB_POOL_TIMEOUT: int = os.getenv("DB_POOL_TIMEOUT", 30)
 
 	SECRET_KEY: str = os.getenv("SECRET_KEY")
 	ACCESS_TOKEN_EXPIRE_MINUTES: int = os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES")
 	ALGORITHM: str = os.getenv("ALGORITHM")
+	JWT_KEY_ID: str | None = os.getenv("JWT_KEY_ID")
+	JWT_PRIVATE_KEY_FILE: str | None = os.getenv("JWT_PRIVATE_KEY_FILE")
+	JWT_VERIFY_KEY_FILES: str | None = os.getenv("JWT_VERIFY_KEY_FILES")
+
+	HASH_WORKERS: int = os.getenv("HASH_WORKERS", 4)
+	HASH_QUEUE_SIZE: int = os.getenv("HASH_QUEUE_SIZE", 64)
+	BULK_INSERT_BATCH_SIZE: int = os.getenv("BULK_INSERT_BATCH_SIZE", 1000)
+	EXPORT_BATCH_SIZE: int = os.getenv("EXPORT_BATCH_SIZE", 1000)
+
+	TOKEN_CACHE_SIZE: int = os.getenv("TOKEN_CACHE_SIZE", 10000)
+	TOKEN_CACHE_TTL_SECONDS: int = os.getenv("TOKEN_CACHE_TTL_SECONDS", 300)
+
+	FAST_JSON: bool = os.getenv("FAST_JSON", False)
+
+	STATELESS_AUTH: bool = os.getenv("STATELESS_AUTH", False)
+	ROLE_CLAIMS_MAX_AGE_MINUTES: int = os.getenv("ROLE_CLAIMS_MAX_AGE_MINUTES", 15)
+
+	LOGIN_THROTTLE_WINDOW_SECONDS: int = os.getenv("LOGIN_THROTTLE_WINDOW_SECONDS", 300)
+	LOGIN_MAX_FAILURES_PER_EMAIL: int = os.getenv("LOGIN_MAX_FAILURES_PER_EMAIL", 5)
+	LOGIN_MAX_FAILURES_PER_IP: int = os.getenv("LOGIN_MAX_FAILURES_PER_IP", 50)
+
+	LOG_PRODUCTION: bool = os.getenv("LOG_PRODUCTION", False)
+	LOG_SAMPLE_RATES: str | None = os.getenv("LOG_SAMPLE_RATES")
+
+	METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", False)
+	METRICS_TOKEN: str | None = os.getenv("METRICS_TOKEN")
+
+	SQL_DEBUG_HEADERS: bool = os.getenv("SQL_DEBUG_HEADERS", False)
+	SLOW_QUERY_MS: int = os.getenv("SLOW_QUERY_MS", 200)
+	QUERY_BUDGET_STRICT: bool = os.getenv("QUERY_BUDGET_STRICT", False)
+
+	REVOCATION_CACHE_SIZE: int = os.getenv("REVOCATION_CACHE_SIZE", 100000)
+	REVOCATION_PRUNE_MINUTES: int = os.getenv("REVOCATION_PRUNE_MINUTES", 60)
 
 	def get_db_url(self) -> str:
 		"""
@@ -23,6 +61,34 @@ class Settings(BaseSettings):
 		"""
 		return self.DATABASE_URL
 
+	def get_engine_options(self) -> dict:
+		"""
+		Return: connection pool options for create_engine (SQLite keeps its default pool)
+		"""
+		if (self.DATABASE_URL or '').startswith('sqlite'):
+			return {}
+
+		return {
+			'pool_size': self.DB_POOL_SIZE,
+			'max_overflow': self.DB_MAX_OVERFLOW,
+			'pool_timeout': self.DB_POOL_TIMEOUT,
+		}
+
+	def get_async_db_url(self) -> str:
+		"""
+		Return: url for the async engine; derived from DATABASE_URL when ASYNC_DATABASE_URL is not set
+		"""
+		if self.ASYNC_DATABASE_URL:
+			return self.ASYNC_DATABASE_URL
+
+		drivers = {
+			'postgresql': 'postgresql+asyncpg',
+			'postgresql+psycopg2': 'postgresql+asyncpg',
+			'sqlite': 'sqlite+aiosqlite',
+		}
+		scheme, _, rest = (self.DATABASE_URL or '').partition('://')
+		return f"{drivers.get(scheme, scheme)}://{rest}"
+
 	class Config:
 		env_prefix: str = ""
 		case_sensitive: bool = False
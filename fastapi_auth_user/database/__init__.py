@@ -1,23 +1,47 @@
 __all__ = [
 	'DatabaseHelper',
 	'db_helper',
+	'AsyncDatabaseHelper',
+	'async_db_helper',
 	'Database',
+	'AsyncDatabase',
 	'ModelType',
     'BaseRepository',
+	'AsyncBaseRepository',
 	'RepositoryException',
-	'DataException'
+	'DataException',
+	'encode_cursor',
+	'decode_cursor',
+	'next_cursor',
+	'RoleRegistry',
+	'role_registry',
+	'QueryBudgetExceededException',
+	'QueryStatsMiddleware',
+	'query_budget',
+	'current_query_stats',
+	'query_stats_enabled'
 ]
 
 from .database import (
     DatabaseHelper,
 	db_helper, 
+	AsyncDatabaseHelper,
+	async_db_helper,
     Database, 
+	AsyncDatabase,
     ModelType, 
 )
 
 from .repository import (
-    BaseRepository
+    BaseRepository,
+	AsyncBaseRepository
 )
 
-from .exception import RepositoryException, DataException
+from .exception import RepositoryException, DataException, QueryBudgetExceededException
+
+from .pagination import encode_cursor, decode_cursor, next_cursor
+
+from .role_registry import RoleRegistry, role_registry
 	
+
+from .query_stats import QueryStatsMiddleware, query_budget, current_query_stats, query_stats_enabled
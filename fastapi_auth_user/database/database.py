@@ -1,20 +1,34 @@
 from ..config import settings
 from .exception import DataException
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, Engine
+from sqlalchemy.ext.asyncio import (
+	create_async_engine,
+	async_sessionmaker,
+	AsyncEngine,
+	AsyncSession
+)
 from sqlalchemy.orm import (
 	sessionmaker,
 	Session
 )
+from ..metrics.instrument import instrument_engine
+from .query_stats import instrument_query_stats, query_stats_enabled
 from ..models import Base
-from typing import TypeAlias
+from typing import AsyncIterator, Iterator, Optional, TypeAlias
 
 Database: TypeAlias = Session
+AsyncDatabase: TypeAlias = AsyncSession
 ModelType: TypeAlias = Base
 
 
 class DatabaseHelper:
-	def __init__(self, url: str):
-		self.__engine = create_engine(url)
+	def __init__(self, url: str, **engine_options):
+		self.__engine = create_engine(url, **engine_options)
+		instrument_engine(self.__engine)
+		if query_stats_enabled():
+			instrument_query_stats(self.__engine)
 		self.__session_factory = sessionmaker(
 			bind=self.__engine,
 			autoflush=False,
@@ -22,7 +36,20 @@ class DatabaseHelper:
 			expire_on_commit=False,
 		)
 
-	def session_dependency(self) -> Database:
+	@property
+	def engine(self) -> Engine:
+		return self.__engine
+
+	def session_dependency(self) -> Iterator[Database]:
+		"""
+		FastAPI dependency: one session per request, closed (and its connection
+		returned to the pool) when the request finishes
+		"""
+		with self.__session_factory() as session:
+			yield session
+
+	@contextmanager
+	def session(self) -> Iterator[Database]:
 		with self.__session_factory() as session:
 			yield session
 
@@ -37,6 +64,57 @@ class DatabaseHelper:
 			raise err
 
 
+class AsyncDatabaseHelper:
+	"""
+	Async counterpart of DatabaseHelper. The engine is created on first use,
+	so the async driver is only required when the async stack is enabled.
+	"""
+
+	def __init__(self, url: str, **engine_options):
+		self.__url = url
+		self.__engine_options = engine_options
+		self.__engine: Optional[AsyncEngine] = None
+		self.__session_factory: Optional[async_sessionmaker] = None
+
+	@property
+	def engine(self) -> AsyncEngine:
+		if self.__engine is None:
+			self.__engine = create_async_engine(self.__url, **self.__engine_options)
+			instrument_engine(self.__engine.sync_engine)
+			if query_stats_enabled():
+				instrument_query_stats(self.__engine.sync_engine)
+			self.__session_factory = async_sessionmaker(
+				bind=self.__engine,
+				autoflush=False,
+				expire_on_commit=False,
+			)
+		return self.__engine
+
+	@property
+	def session_factory(self) -> async_sessionmaker:
+		if self.__session_factory is None:
+			_ = self.engine
+		return self.__session_factory
+
+	async def session_dependency(self) -> AsyncIterator[AsyncDatabase]:
+		async with self.session_factory() as session:
+			yield session
+
+	async def create_all_tables(self):
+		async with self.engine.begin() as connection:
+			await connection.run_sync(Base.metadata.create_all)
+
+	async def dispose(self):
+		if self.__engine is not None:
+			await self.__engine.dispose()
+
+
 db_helper = DatabaseHelper(
-	settings.get_db_url()
+	settings.get_db_url(),
+	**settings.get_engine_options()
+)
+
+async_db_helper = AsyncDatabaseHelper(
+	settings.get_async_db_url(),
+	**settings.get_engine_options()
 )
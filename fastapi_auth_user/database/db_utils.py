@@ -1,5 +1,12 @@
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Sequence
+
+from sqlalchemy import Engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql.dml import Insert
 
 from .database import Database
+from .role_registry import role_registry
 from fastapi_auth_user.models import Role, RoleNameEnum
 
 
@@ -10,3 +17,60 @@ def create_role_initial(db: Database):
 			role = Role(name=role_name.value)
 			db.add(role)
 			db.commit()
+			role_registry.invalidate()
+
+
+def insert_ignore_conflicts(db: Database, table, index_elements: Sequence) -> Optional[Insert]:
+	"""
+	Return: INSERT ... ON CONFLICT (index_elements) DO NOTHING for PostgreSQL and SQLite,
+	None for dialects without it (caller has to filter conflicting rows itself)
+	"""
+	dialects = {
+		'postgresql': postgresql.insert,
+		'sqlite': sqlite.insert,
+	}
+	dialect_insert = dialects.get(db.get_bind().dialect.name)
+	if dialect_insert is None:
+		return None
+	return dialect_insert(table).on_conflict_do_nothing(index_elements=index_elements)
+
+
+class QueryCounter:
+	"""
+	Records every statement executed on `engine` while the counter is active:
+
+		with QueryCounter(db_helper.engine) as counter:
+			client.get("/api/")
+		counter.count, counter.statements
+	"""
+
+	def __init__(self, engine: Engine):
+		self.engine = engine
+		self.statements: List[str] = []
+
+	@property
+	def count(self) -> int:
+		return len(self.statements)
+
+	def __enter__(self) -> 'QueryCounter':
+		event.listen(self.engine, "before_cursor_execute", self.__record)
+		return self
+
+	def __exit__(self, *_):
+		event.remove(self.engine, "before_cursor_execute", self.__record)
+
+	def __record(self, conn, cursor, statement, parameters, context, executemany):
+		self.statements.append(statement)
+
+
+@contextmanager
+def assert_query_count(engine: Engine, expected: int) -> Iterator[QueryCounter]:
+	"""
+	Fails with AssertionError (listing the statements) unless exactly `expected` statements run inside the block
+	"""
+	with QueryCounter(engine) as counter:
+		yield counter
+
+	if counter.count != expected:
+		statements = "\n".join(f"  {number}. {statement}" for number, statement in enumerate(counter.statements, 1))
+		raise AssertionError(f"Expected {expected} queries, got {counter.count}:\n{statements}")
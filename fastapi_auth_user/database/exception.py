@@ -9,3 +9,9 @@ class DataException(Exception):
 	def __init__(self, message: str = 'Database error'):
 		self.message = message
 		super().__init__(self.message)
+
+
+class QueryBudgetExceededException(Exception):
+	def __init__(self, message: str = 'Query budget exceeded'):
+		self.message = message
+		super().__init__(self.message)
@@ -0,0 +1,29 @@
+import base64
+import binascii
+from typing import Optional, Sequence
+
+from fastapi import status
+
+from .exception import RepositoryException
+
+
+def encode_cursor(last_id: int) -> str:
+	return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+	try:
+		padding = '=' * (-len(cursor) % 4)
+		return int(base64.urlsafe_b64decode(cursor + padding).decode())
+	except (binascii.Error, UnicodeDecodeError, ValueError):
+		raise RepositoryException(status_code=status.HTTP_400_BAD_REQUEST,
+		                          message=f"Invalid cursor({cursor})")
+
+
+def next_cursor(objs: Sequence, limit: int) -> Optional[str]:
+	"""
+	Return: cursor pointing after the last row of a full page, None when there is nothing left to read
+	"""
+	if limit <= 0 or len(objs) < limit:
+		return None
+	return encode_cursor(objs[-1].id)
@@ -0,0 +1,159 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Depends
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .exception import QueryBudgetExceededException
+from ..config import settings
+from ..logger import FastApiAuthLogger, LogLevel
+from ..metrics.instrument import current_service_method
+
+QUERY_COUNT_HEADER = 'X-DB-Query-Count'
+QUERY_TIME_HEADER = 'X-DB-Time-Ms'
+SLOWEST_QUERY_HEADER = 'X-DB-Slowest-Ms'
+
+_logger = FastApiAuthLogger("sql", LogLevel.INFO)
+
+
+class QueryStats:
+	"""
+	Statements of one request: count, total and slowest execution time, and the budget
+	the endpoint declared with `query_budget`
+	"""
+
+	__slots__ = ('count', 'total_seconds', 'slowest_seconds', 'slowest_statement', 'budget')
+
+	def __init__(self):
+		self.count = 0
+		self.total_seconds = 0.0
+		self.slowest_seconds = 0.0
+		self.slowest_statement: Optional[str] = None
+		self.budget: Optional[int] = None
+
+	def record(self, statement: str, seconds: float):
+		self.count += 1
+		self.total_seconds += seconds
+		if seconds > self.slowest_seconds:
+			self.slowest_seconds = seconds
+			self.slowest_statement = statement
+
+	def over_budget(self) -> bool:
+		return self.budget is not None and self.count > self.budget
+
+
+# One mutable QueryStats per request: sync endpoints and dependencies run in copies of the
+# request context (threadpool), so they update the shared object instead of setting the variable
+_request_query_stats: ContextVar[Optional[QueryStats]] = ContextVar('request_query_stats', default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+	return _request_query_stats.get()
+
+
+def _short_statement(statement: str, limit: int = 500) -> str:
+	statement = ' '.join(statement.split())
+	return statement if len(statement) <= limit else statement[:limit] + '...'
+
+
+def query_stats_enabled() -> bool:
+	"""
+	Statement timing is only wired in when something reads it: debug headers, the slow query log
+	or strict budgets
+	"""
+	return bool(settings.SQL_DEBUG_HEADERS or settings.SLOW_QUERY_MS > 0 or settings.QUERY_BUDGET_STRICT)
+
+
+def instrument_query_stats(engine: Engine):
+	"""
+	Time every statement of `engine` (the sync engine of an AsyncEngine) into the request's
+	QueryStats and log the ones slower than SLOW_QUERY_MS
+	"""
+	if getattr(engine, '_query_stats_instrumented', False):
+		return
+
+	slow_seconds = settings.SLOW_QUERY_MS / 1000 if settings.SLOW_QUERY_MS > 0 else None
+
+	# The start time lives on the statement's execution context, not the connection: a statement that
+	# raises never reaches after_cursor_execute and would leave it behind on the pooled connection
+	@event.listens_for(engine, "before_cursor_execute")
+	def start_timer(conn, cursor, statement, parameters, context, executemany):
+		if context is not None:
+			context._query_started = time.perf_counter()
+
+	@event.listens_for(engine, "after_cursor_execute")
+	def stop_timer(conn, cursor, statement, parameters, context, executemany):
+		started: Optional[float] = getattr(context, '_query_started', None)
+		if started is None:
+			return
+
+		seconds = time.perf_counter() - started
+		stats = _request_query_stats.get()
+		if stats is not None:
+			stats.record(statement, seconds)
+		if slow_seconds is not None and seconds >= slow_seconds:
+			_logger.warning("Method[%s](slow query %.1f ms: %s): Warning", current_service_method(),
+			                seconds * 1000, _short_statement(statement))
+
+	engine._query_stats_instrumented = True
+
+
+def query_budget(max_queries: int):
+	"""
+	Route dependency declaring how many statements the endpoint may issue, counting a cold token
+	cache and the periodic revoked-token prune:
+	`@router.get("/", dependencies=[query_budget(2)])`
+	"""
+	async def declare_budget():
+		stats = _request_query_stats.get()
+		if stats is not None:
+			stats.budget = max_queries
+
+	return Depends(declare_budget)
+
+
+class QueryStatsMiddleware:
+	"""
+	Opens the per-request QueryStats. When the response starts it checks the declared budget
+	(warning, or QueryBudgetExceededException with QUERY_BUDGET_STRICT) and, with SQL_DEBUG_HEADERS,
+	adds the statement count, DB time and slowest statement time as response headers.
+	Statements of streamed bodies run after that and are not included.
+	"""
+
+	def __init__(self, app: ASGIApp):
+		self.app = app
+
+	async def __call__(self, scope: Scope, receive: Receive, send: Send):
+		if scope['type'] != 'http':
+			await self.app(scope, receive, send)
+			return
+
+		stats = QueryStats()
+
+		async def send_with_stats(message: Message):
+			if message['type'] == 'http.response.start':
+				if stats.over_budget():
+					self.__over_budget(scope, stats)
+				if settings.SQL_DEBUG_HEADERS:
+					headers = MutableHeaders(scope=message)
+					headers[QUERY_COUNT_HEADER] = str(stats.count)
+					headers[QUERY_TIME_HEADER] = f"{stats.total_seconds * 1000:.2f}"
+					headers[SLOWEST_QUERY_HEADER] = f"{stats.slowest_seconds * 1000:.2f}"
+			await send(message)
+
+		token = _request_query_stats.set(stats)
+		try:
+			await self.app(scope, receive, send_with_stats)
+		finally:
+			_request_query_stats.reset(token)
+
+	@staticmethod
+	def __over_budget(scope: Scope, stats: QueryStats):
+		message = (f"{scope['method']} {scope['path']} issued {stats.count} statements, budget {stats.budget}; "
+		           f"slowest: {_short_statement(stats.slowest_statement or '', 200)}")
+		if settings.QUERY_BUDGET_STRICT:
+			raise QueryBudgetExceededException(message)
+		_logger.warning("Method[%s](%s): Warning", QueryStatsMiddleware.__name__, message)
@@ -1,25 +1,59 @@
-from typing import List
+from typing import List, Optional, Sequence
 
 from fastapi import status
+from sqlalchemy import delete, select, update
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.interfaces import LoaderOption
 
-from .database import Database, ModelType
+from .database import Database, AsyncDatabase, ModelType
 from .exception import RepositoryException
 from ..models import User
 
 
+def _update_statement(model: ModelType, obj_id: int, values: dict, options: Sequence[LoaderOption]):
+	return (
+		update(model)
+		.where(model.id == obj_id)
+		.values(**values)
+		.returning(model)
+		.options(*options)
+		.execution_options(populate_existing=True)
+	)
+
+
+def _delete_statement(model: ModelType, obj_id: int):
+	return delete(model).where(model.id == obj_id).returning(model)
+
+
 class BaseRepository:
+	"""
+	Read methods take either loader `options` for entities, or `columns` to select only
+	those columns into lightweight rows (no identity map state, nothing else loaded)
+	"""
 
 	def __init__(self, db: Database, model: ModelType):
 		self.db = db
 		self.model: ModelType = model
 
+	def version_values(self) -> dict:
+		"""
+		Extra values set by every `update` (row version bumps); none by default
+		"""
+		return {}
+
+	def __query(self, options: Sequence[LoaderOption], columns: Sequence):
+		if columns:
+			return self.db.query(*columns)
+		return self.db.query(self.model).options(*options)
+
 	def get_by_id(
 			self,
-			obj_id: int
+			obj_id: int,
+			options: Sequence[LoaderOption] = (),
+			columns: Sequence = ()
 	) -> ModelType:
 		try:
-			obj = self.db.query(self.model).filter(self.model.id == obj_id).first()
+			obj = self.__query(options, columns).filter(self.model.id == obj_id).first()
 			if obj is None:
 				raise RepositoryException(status_code=status.HTTP_404_NOT_FOUND,
 				                          message=f"Record by this id({obj_id}) not found")
@@ -41,7 +75,9 @@ class BaseRepository:
 	def get_all(
 			self,
 			skip: int = 0,
-			limit: int = 100
+			limit: int = 100,
+			options: Sequence[LoaderOption] = (),
+			columns: Sequence = ()
 	) -> List[ModelType]:
 		try:
 
@@ -49,7 +85,7 @@ class BaseRepository:
 				raise RepositoryException(status_code=status.HTTP_406_NOT_ACCEPTABLE,
 				                          message=f"Incorrect skip({skip}) or limit({limit})")
 
-			objs = self.db.query(self.model).offset(skip).limit(limit).all()
+			objs = self.__query(options, columns).order_by(self.model.id).offset(skip).limit(limit).all()
 			if objs is None or not len(objs):
 				raise RepositoryException(status_code=status.HTTP_400_BAD_REQUEST, message=f"No records")
 			else:
@@ -65,6 +101,35 @@ class BaseRepository:
 			raise RepositoryException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
 			                          message=f"Detail: '{err.args[0]}'")
 
+	def get_page(
+			self,
+			after_id: Optional[int] = None,
+			limit: int = 100,
+			options: Sequence[LoaderOption] = (),
+			columns: Sequence = ()
+	) -> List[ModelType]:
+		"""
+		Keyset pagination: rows with id greater than `after_id`, read through the primary key index,
+		so the cost does not grow with the page depth
+		"""
+		try:
+			if limit < 0:
+				raise RepositoryException(status_code=status.HTTP_406_NOT_ACCEPTABLE,
+				                          message=f"Incorrect limit({limit})")
+
+			query = self.__query(options, columns)
+			if after_id is not None:
+				query = query.filter(self.model.id > after_id)
+
+			return query.order_by(self.model.id).limit(limit).all()
+		except RepositoryException as re:
+			self.db.rollback()
+			raise re
+		except Exception as err:
+			self.db.rollback()
+			raise RepositoryException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                          message=f"Detail: '{err.args[0]}'")
+
 	def create(
 			self,
 			obj_in: ModelType
@@ -96,20 +161,28 @@ class BaseRepository:
 	def update(
 			self,
 			obj_id: int,
-			obj_in: ModelType
+			obj_in: ModelType,
+			options: Sequence[LoaderOption] = ()
 	) -> ModelType:
+		"""
+		One UPDATE ... RETURNING; `options` (selectinload only) are for callers that need relationships
+		"""
 		try:
-			db_user: ModelType = self.get_by_id(obj_id)
-			if not db_user:
+			values = obj_in.dict(exclude_unset=True)
+			if not values:
+				return self.get_by_id(obj_id, options)
+
+			values.update(self.version_values())
+			db_obj: ModelType = self.db.scalar(_update_statement(self.model, obj_id, values, options))
+			if db_obj is None:
 				raise RepositoryException(status_code=status.HTTP_404_NOT_FOUND,
 				                          message=f"Update failed, record with id({obj_id}) not found")
 
-			for field_name, field_value in obj_in.dict(exclude_unset=True).items():
-				setattr(db_user, field_name, field_value)
-
 			self.db.commit()
-			self.db.refresh(db_user)
-			return db_user
+			return db_obj
+		except RepositoryException as re:
+			self.db.rollback()
+			raise re
 		except IntegrityError as _:
 			self.db.rollback()
 			raise RepositoryException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -123,14 +196,17 @@ class BaseRepository:
 			self,
 			obj_id: int
 	) -> ModelType:
+		"""
+		One DELETE ... RETURNING; rows referencing the record through a secondary table
+		have to be removed by the caller first
+		"""
 		try:
-			row_to_delete = self.get_by_id(obj_id)
+			row_to_delete = self.db.scalar(_delete_statement(self.model, obj_id))
 
-			if not row_to_delete:
+			if row_to_delete is None:
 				raise RepositoryException(status_code=status.HTTP_404_NOT_FOUND,
-				                          message="Delete failed, record with id({obj_id}) not found")
+				                          message=f"Delete failed, record with id({obj_id}) not found")
 
-			self.db.delete(row_to_delete)
 			self.db.commit()
 			return row_to_delete
 		except RepositoryException as re:
@@ -144,3 +220,196 @@ class BaseRepository:
 			self.db.rollback()
 			raise RepositoryException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
 			                          message=f"Delete failed due to an unknown error. {err.args[0]}")
+
+
+class AsyncBaseRepository:
+	"""
+	AsyncSession counterpart of BaseRepository with the same methods and errors.
+	`load_options` are applied to every SELECT, so relationships used after
+	the call are loaded eagerly instead of lazily (lazy loads cannot run under asyncio).
+	Reads with `columns` select plain rows and skip `load_options`.
+	"""
+
+	load_options: tuple = ()
+
+	def __init__(self, db: AsyncDatabase, model: ModelType):
+		self.db = db
+		self.model: ModelType = model
+
+	def version_values(self) -> dict:
+		"""
+		Extra values set by every `update` (row version bumps); none by default
+		"""
+		return {}
+
+	def __select(self, columns: Sequence):
+		if columns:
+			return select(*columns)
+		return select(self.model).options(*self.load_options)
+
+	async def __fetch(self, statement, columns: Sequence) -> List[ModelType]:
+		result = await self.db.execute(statement)
+		return result.all() if columns else result.scalars().all()
+
+	async def get_by_id(
+			self,
+			obj_id: int,
+			columns: Sequence = ()
+	) -> ModelType:
+		try:
+			objs = await self.__fetch(self.__select(columns).where(self.model.id == obj_id), columns)
+			obj = objs[0] if objs else None
+			if obj is None:
+				raise RepositoryException(status_code=status.HTTP_404_NOT_FOUND,
+				                          message=f"Record by this id({obj_id}) not found")
+			else:
+				return obj
+
+		except RepositoryException as re:
+			await self.db.rollback()
+			raise re
+		except IntegrityError as _:
+			await self.db.rollback()
+			raise RepositoryException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                          message=f"Operation failed | ORM")
+		except Exception as err:
+			await self.db.rollback()
+			raise RepositoryException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                          message=f"Detail: '{err.args[0]}'")
+
+	async def get_all(
+			self,
+			skip: int = 0,
+			limit: int = 100,
+			columns: Sequence = ()
+	) -> List[ModelType]:
+		try:
+
+			if skip < 0 or limit < 0:
+				raise RepositoryException(status_code=status.HTTP_406_NOT_ACCEPTABLE,
+				                          message=f"Incorrect skip({skip}) or limit({limit})")
+
+			objs = await self.__fetch(
+				self.__select(columns).order_by(self.model.id).offset(skip).limit(limit), columns
+			)
+			if objs is None or not len(objs):
+				raise RepositoryException(status_code=status.HTTP_400_BAD_REQUEST, message=f"No records")
+			else:
+				return objs
+		except RepositoryException as re:
+			await self.db.rollback()
+			raise re
+		except IntegrityError as _:
+			await self.db.rollback()
+			raise RepositoryException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                          message=f"Operation failed | ORM")
+		except Exception as err:
+			raise RepositoryException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                          message=f"Detail: '{err.args[0]}'")
+
+	async def get_page(
+			self,
+			after_id: Optional[int] = None,
+			limit: int = 100,
+			columns: Sequence = ()
+	) -> List[ModelType]:
+		try:
+			if limit < 0:
+				raise RepositoryException(status_code=status.HTTP_406_NOT_ACCEPTABLE,
+				                          message=f"Incorrect limit({limit})")
+
+			query = self.__select(columns)
+			if after_id is not None:
+				query = query.where(self.model.id > after_id)
+
+			return await self.__fetch(query.order_by(self.model.id).limit(limit), columns)
+		except RepositoryException as re:
+			await self.db.rollback()
+			raise re
+		except Exception as err:
+			await self.db.rollback()
+			raise RepositoryException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                          message=f"Detail: '{err.args[0]}'")
+
+	async def create(
+			self,
+			obj_in: ModelType
+	) -> ModelType:
+		try:
+			db_obj: User = self.model(**dict(obj_in))
+
+			if not db_obj:
+				raise RepositoryException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+				                          message='Create object error')
+
+			self.db.add(db_obj)
+			await self.db.commit()
+
+			return await self.get_by_id(db_obj.id)
+		except RepositoryException as re:
+			await self.db.rollback()
+			raise re
+		except IntegrityError as _:
+			await self.db.rollback()
+			raise RepositoryException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                          message="Operation failed | ORM")
+		except Exception as err:
+			await self.db.rollback()
+			raise RepositoryException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                          message=f"Detail: '{err.args[0]}'")
+
+	async def update(
+			self,
+			obj_id: int,
+			obj_in: ModelType,
+			options: Sequence[LoaderOption] = ()
+	) -> ModelType:
+		try:
+			values = obj_in.dict(exclude_unset=True)
+			if not values:
+				return await self.get_by_id(obj_id)
+
+			values.update(self.version_values())
+			db_obj: ModelType = await self.db.scalar(_update_statement(self.model, obj_id, values, options))
+			if db_obj is None:
+				raise RepositoryException(status_code=status.HTTP_404_NOT_FOUND,
+				                          message=f"Update failed, record with id({obj_id}) not found")
+
+			await self.db.commit()
+			return db_obj
+		except RepositoryException as re:
+			await self.db.rollback()
+			raise re
+		except IntegrityError as _:
+			await self.db.rollback()
+			raise RepositoryException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                          message="Update failed due to integrity constraint violation.")
+		except Exception as err:
+			await self.db.rollback()
+			raise RepositoryException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                          message=f"Update failed. {err.args[0]}")
+
+	async def delete(
+			self,
+			obj_id: int
+	) -> ModelType:
+		try:
+			row_to_delete = await self.db.scalar(_delete_statement(self.model, obj_id))
+
+			if row_to_delete is None:
+				raise RepositoryException(status_code=status.HTTP_404_NOT_FOUND,
+				                          message=f"Delete failed, record with id({obj_id}) not found")
+
+			await self.db.commit()
+			return row_to_delete
+		except RepositoryException as re:
+			await self.db.rollback()
+			raise re
+		except IntegrityError as _:
+			await self.db.rollback()
+			raise RepositoryException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                          message="Delete failed due to integrity constraint violation.")
+		except Exception as err:
+			await self.db.rollback()
+			raise RepositoryException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                          message=f"Delete failed due to an unknown error. {err.args[0]}")
@@ -0,0 +1,65 @@
+from threading import Lock
+from typing import Dict, Optional
+
+from fastapi import status
+from sqlalchemy import select
+
+from .database import Database, AsyncDatabase
+from .exception import RepositoryException
+from ..models import Role, RoleNameEnum
+
+
+class RoleRegistry:
+	"""
+	In-process map RoleNameEnum -> roles.id. Roles are a fixed set, so the table is read once
+	(at startup or on first use) and association rows are written by id without a lookup.
+	A role missing from the map triggers one reload; `invalidate` forces the next call to reload.
+	"""
+
+	def __init__(self):
+		self.__ids: Optional[Dict[RoleNameEnum, int]] = None
+		self.__lock = Lock()
+
+	@property
+	def loaded(self) -> bool:
+		return self.__ids is not None
+
+	def load(self, db: Database) -> Dict[RoleNameEnum, int]:
+		return self.__store(db.execute(select(Role.name, Role.id)).all())
+
+	async def load_async(self, db: AsyncDatabase) -> Dict[RoleNameEnum, int]:
+		return self.__store((await db.execute(select(Role.name, Role.id))).all())
+
+	def get_id(self, db: Database, role: RoleNameEnum) -> int:
+		ids = self.__ids
+		if ids is None or role not in ids:
+			ids = self.load(db)
+		return self.__lookup(ids, role)
+
+	async def get_id_async(self, db: AsyncDatabase, role: RoleNameEnum) -> int:
+		ids = self.__ids
+		if ids is None or role not in ids:
+			ids = await self.load_async(db)
+		return self.__lookup(ids, role)
+
+	def invalidate(self):
+		with self.__lock:
+			self.__ids = None
+
+	def __store(self, rows) -> Dict[RoleNameEnum, int]:
+		names = {role.value: role for role in RoleNameEnum}
+		ids = {names[name]: role_id for name, role_id in rows if name in names}
+		with self.__lock:
+			self.__ids = ids
+		return ids
+
+	@staticmethod
+	def __lookup(ids: Dict[RoleNameEnum, int], role: RoleNameEnum) -> int:
+		role_id = ids.get(role)
+		if role_id is None:
+			raise RepositoryException(status_code=status.HTTP_404_NOT_FOUND,
+			                          message=f'Role [{role.value}] not created')
+		return role_id
+
+
+role_registry = RoleRegistry()
@@ -0,0 +1,131 @@
+"""
+Fill users, roles and user_role_association with synthetic users for load testing:
+
+	poetry run seed --users 1000000 --roles User=1,Moderator=0.05,Admin=0.001
+	python -m fastapi_auth_user.database.seed --users 100000 --database-url sqlite:///load.db --create-tables
+
+Users go in with multi-row INSERTs of `--batch-size` rows, one transaction per batch. Every user
+gets one of `--distinct-hashes` bcrypt hashes of `--password`, computed once up front, so the
+load is bound by the database and not by bcrypt. Emails are `{prefix}{n}@{domain}`; existing
+ones are skipped, so an interrupted run can simply be repeated.
+"""
+import argparse
+import random
+import time
+from itertools import cycle
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from .database import Database
+from .db_utils import create_role_initial, insert_ignore_conflicts
+from .role_registry import RoleRegistry
+from ..auth.hashing import PasswordHasher
+from ..config import settings
+from ..models import Base, RoleNameEnum, User
+from ..models.models import user_role_association
+
+DEFAULT_ROLES = 'User=1,Moderator=0.05,Admin=0.001'
+
+
+def parse_role_distribution(value: str) -> Dict[RoleNameEnum, float]:
+	"""
+	`value`: "User=1,Moderator=0.05" (role name = fraction of users that have the role)
+	"""
+	names = {role.value.lower(): role for role in RoleNameEnum}
+	distribution = {}
+	for entry in filter(None, value.split(',')):
+		name, _, fraction = entry.partition('=')
+		role = names.get(name.strip().lower())
+		if role is None:
+			raise ValueError(f"Unknown role [{name}] (roles: {', '.join(role.value for role in RoleNameEnum)})")
+		distribution[role] = float(fraction)
+	if not distribution:
+		raise ValueError("The role distribution is empty")
+	return distribution
+
+
+def seed_users(db: Database, count: int, distribution: Dict[RoleNameEnum, float], password_hashes: List[str],
+               batch_size: int = 10000, start: int = 0, prefix: str = 'load', domain: str = 'example.com',
+               rng: Optional[random.Random] = None,
+               progress: Optional[Callable[[int, int], None]] = None) -> int:
+	"""
+	Insert users `start`..`start + count - 1`. Each role of `distribution` is drawn independently;
+	a user that draws none gets the first role listed.
+	Return: number of users created (existing emails are skipped)
+	"""
+	rng = rng or random.Random()
+	role_ids = RoleRegistry().load(db)
+	fallback_role = role_ids[next(iter(distribution))]
+	weighted_roles = [(role_ids[role], fraction) for role, fraction in distribution.items()]
+	hashes = cycle(password_hashes)
+
+	statement = insert_ignore_conflicts(db, User, [User.email])
+	if statement is None:
+		statement = insert(User)
+	statement = statement.returning(User.id, User.email)
+
+	created = 0
+	for batch_start in range(start, start + count, batch_size):
+		numbers = range(batch_start, min(batch_start + batch_size, start + count))
+		rows = [{'username': f"{prefix}{number}", 'email': f"{prefix}{number}@{domain}", 'password': next(hashes),
+		         'token_generation': 0} for number in numbers]
+		user_ids = {row.email: row.id for row in db.execute(statement, rows)}
+
+		links = []
+		for user_id in user_ids.values():
+			roles = [role_id for role_id, fraction in weighted_roles if rng.random() < fraction]
+			links.extend({'user_id': user_id, 'role_id': role_id} for role_id in roles or [fallback_role])
+		if links:
+			db.execute(insert(user_role_association), links)
+		db.commit()
+
+		created += len(user_ids)
+		if progress is not None:
+			progress(numbers.stop - start, created)
+	return created
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--users", type=int, required=True, help="users to insert")
+	parser.add_argument("--roles", default=DEFAULT_ROLES, help=f"role distribution (default {DEFAULT_ROLES})")
+	parser.add_argument("--batch-size", type=int, default=10000, help="users per INSERT and transaction")
+	parser.add_argument("--start", type=int, default=0, help="number of the first generated user")
+	parser.add_argument("--prefix", default="load", help="username and email prefix")
+	parser.add_argument("--domain", default="example.com", help="email domain")
+	parser.add_argument("--password", default="Aa1!password", help="password of every user")
+	parser.add_argument("--distinct-hashes", type=int, default=1, help="bcrypt hashes to compute and rotate")
+	parser.add_argument("--seed", type=int, help="random seed of the role draw (repeatable datasets)")
+	parser.add_argument("--database-url", help="default: DATABASE_URL")
+	parser.add_argument("--create-tables", action="store_true", help="create missing tables and roles first")
+	args = parser.parse_args()
+
+	distribution = parse_role_distribution(args.roles)
+	engine = create_engine(args.database_url or settings.get_db_url())
+	if args.create_tables:
+		Base.metadata.create_all(bind=engine)
+	with Session(engine) as db:
+		create_role_initial(db)
+
+	hasher = PasswordHasher(max_workers=settings.HASH_WORKERS, max_queue_size=settings.HASH_QUEUE_SIZE)
+	try:
+		password_hashes = hasher.hash_many([args.password] * max(args.distinct_hashes, 1))
+	finally:
+		hasher.shutdown()
+
+	started = time.perf_counter()
+
+	def report(done: int, created: int):
+		elapsed = time.perf_counter() - started
+		print(f"{done}/{args.users} users ({created} created), {done / elapsed:,.0f} users/s", flush=True)
+
+	with Session(engine) as db:
+		created = seed_users(db, args.users, distribution, password_hashes, max(args.batch_size, 1), args.start,
+		                     args.prefix, args.domain, random.Random(args.seed), report)
+	print(f"Created {created} users in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+	main()
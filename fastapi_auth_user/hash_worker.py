@@ -0,0 +1,21 @@
+"""
+bcrypt jobs of the hash worker processes. Spawned workers import this module to unpickle the jobs,
+so it only depends on passlib: nothing here may pull in the app, the database or the settings.
+"""
+from typing import List
+
+from passlib.context import CryptContext
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def hash_password(password: str) -> str:
+	return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+	return pwd_context.verify(plain_password, hashed_password)
+
+
+def hash_batch(passwords: List[str]) -> List[str]:
+	return [pwd_context.hash(password) for password in passwords]
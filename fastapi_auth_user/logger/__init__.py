@@ -1,2 +1,3 @@
-from .logger import FastApiAuthLogger
+from .logger import FastApiAuthLogger, stop_log_listener
+from .context import LogContextMiddleware, set_log_user
 from .types import LogLevel
\ No newline at end of file
@@ -0,0 +1,52 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# One mutable dict per request: sync endpoints and dependencies run in copies of the request
+# context (threadpool), so they update the shared dict instead of setting the variable
+_request_log_context: ContextVar[Optional[dict]] = ContextVar('request_log_context', default=None)
+
+
+def set_log_user(user_id: Optional[int]):
+	"""
+	Attach the caller's user id to every log line of the current request
+	"""
+	context = _request_log_context.get()
+	if context is not None:
+		context['user_id'] = user_id
+
+
+def log_context_fields() -> dict:
+	"""
+	Return: user_id and duration_ms (since the request started) of the current request, if any
+	"""
+	context = _request_log_context.get()
+	if context is None:
+		return {}
+
+	return {
+		'user_id': context['user_id'],
+		'duration_ms': round((time.perf_counter() - context['started']) * 1000, 3),
+	}
+
+
+class LogContextMiddleware:
+	"""
+	Opens the per-request log context (start time, user id) read by the JSON log formatter
+	"""
+
+	def __init__(self, app: ASGIApp):
+		self.app = app
+
+	async def __call__(self, scope: Scope, receive: Receive, send: Send):
+		if scope['type'] != 'http':
+			await self.app(scope, receive, send)
+			return
+
+		token = _request_log_context.set({'started': time.perf_counter(), 'user_id': None})
+		try:
+			await self.app(scope, receive, send)
+		finally:
+			_request_log_context.reset(token)
@@ -1,9 +1,21 @@
+import atexit
+import copy
+import json
 import logging
-from typing import NoReturn, List
+import random
+import re
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Dict, NoReturn, List, Optional
 
 from colorama import Style, Fore
 
+from .context import log_context_fields
 from .types import Colors, LogLevel
+from ..config import settings
+
+METHOD_MESSAGE = re.compile(r'^Method\[(?P<method>[^\]]+)\](?:\((?P<detail>.*)\))?: (?P<outcome>\w+)$', re.DOTALL)
 
 
 class ColoredFormatter(logging.Formatter):
@@ -31,6 +43,123 @@ class ColoredFormatter(logging.Formatter):
 			log_message = ' '.join(elem for elem in data_message[:-1]) + color + ' ' + message_type
 			return log_message
 
+		return ' '.join(data_message)
+
+
+class JsonFormatter(logging.Formatter):
+	"""
+	One JSON object per line with fixed fields: time, level, logger, method, outcome, detail,
+	user_id and duration_ms (from the request log context), plus the traceback of exceptions
+	"""
+
+	def format(self, record: logging.LogRecord) -> str:
+		message = record.getMessage()
+		match = METHOD_MESSAGE.match(message)
+		entry = {
+			'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+			'level': record.levelname,
+			'logger': record.name,
+			'method': match.group('method') if match else None,
+			'outcome': match.group('outcome') if match else None,
+			'detail': match.group('detail') if match else message,
+			'user_id': getattr(record, 'user_id', None),
+			'duration_ms': getattr(record, 'duration_ms', None),
+		}
+		if record.exc_info:
+			entry['exc'] = self.formatException(record.exc_info)
+		elif record.exc_text:
+			entry['exc'] = record.exc_text
+		return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+	"""
+	Copies the request log context onto the record on the calling thread, before it is queued
+	"""
+
+	def filter(self, record: logging.LogRecord) -> bool:
+		for name, value in log_context_fields().items():
+			setattr(record, name, value)
+		return True
+
+
+class SuccessSampler(logging.Filter):
+	"""
+	Keeps a `rate` fraction of the per-call "Success" lines of each level; other lines always pass
+	"""
+
+	def __init__(self, rates: Dict[int, float]):
+		super().__init__()
+		self.rates = rates
+
+	@classmethod
+	def from_setting(cls, value: Optional[str]) -> 'SuccessSampler':
+		"""
+		`value`: "INFO=0.1,DEBUG=0" (level name = kept fraction)
+		"""
+		rates = {}
+		for entry in filter(None, (value or '').split(',')):
+			level, _, rate = entry.partition('=')
+			rates[LogLevel[level.strip().upper()].value] = float(rate)
+		return cls(rates)
+
+	def filter(self, record: logging.LogRecord) -> bool:
+		rate = self.rates.get(record.levelno)
+		if rate is None or not str(record.msg).endswith('Success'):
+			return True
+		return random.random() < rate
+
+
+class DeferredQueueHandler(QueueHandler):
+	"""
+	QueueHandler that merges the %-args into the message on the calling thread, so arguments
+	mutated after the call cannot change the line, and leaves the JSON encoding and the write
+	to the listener thread
+	"""
+
+	def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+		record = copy.copy(record)
+		record.msg = record.getMessage()
+		record.args = None
+		if record.exc_info:
+			record.exc_text = _exception_formatter.formatException(record.exc_info)
+			record.exc_info = None
+		return record
+
+
+_exception_formatter = logging.Formatter()
+_queue_handler: Optional[DeferredQueueHandler] = None
+_queue_listener: Optional[QueueListener] = None
+
+
+def production_handler() -> DeferredQueueHandler:
+	"""
+	Return: the shared handler of production mode; its listener thread writes JSON lines to stderr
+	"""
+	global _queue_handler, _queue_listener
+	if _queue_handler is None:
+		queue = SimpleQueue()
+		stream_handler = logging.StreamHandler()
+		stream_handler.setFormatter(JsonFormatter())
+
+		_queue_handler = DeferredQueueHandler(queue)
+		_queue_handler.addFilter(SuccessSampler.from_setting(settings.LOG_SAMPLE_RATES))
+		_queue_handler.addFilter(ContextFilter())
+		_queue_listener = QueueListener(queue, stream_handler, respect_handler_level=True)
+		_queue_listener.start()
+		atexit.register(stop_log_listener)
+	return _queue_handler
+
+
+def stop_log_listener():
+	"""
+	Flush queued records and stop the listener thread (application shutdown)
+	"""
+	global _queue_listener
+	if _queue_listener is not None:
+		_queue_listener.stop()
+		_queue_listener = None
+
 
 class SingletonMeta(type):
 	_instances = {}
@@ -41,11 +170,38 @@ class SingletonMeta(type):
 		return cls._instances[cls]
 
 
-class FastApiAuthLogger(metaclass=SingletonMeta):
+class NamedSingletonMeta(type):
+	"""
+	Like SingletonMeta, but one instance per class and name (the first argument)
+	"""
+	_instances = {}
+
+	def __call__(cls, *args, **kwargs):
+		key = (cls, args[0] if args else kwargs.get('logger_name'))
+		if key not in cls._instances:
+			cls._instances[key] = super(NamedSingletonMeta, cls).__call__(*args, **kwargs)
+		return cls._instances[key]
+
+
+class FastApiAuthLogger(metaclass=NamedSingletonMeta):
+	"""
+	One instance per logger name, not one per process: FastApiAuthLogger("sql") and
+	FastApiAuthLogger("auth service") are separate loggers, and repeated calls with a name
+	return its first instance (the level of later calls is ignored).
+	Messages take lazy %-style arguments:
+	`logger.info("Method[%s]: Success", name)` is only formatted if the line is emitted.
+	With LOG_PRODUCTION records go through a queue to a JSON writer thread.
+	"""
+
 	def __init__(self, logger_name: str, level: LogLevel = logging.INFO):
 		self.logger = logging.getLogger(logger_name.upper())
 		self.logger.setLevel(level.value)
 
+		if settings.LOG_PRODUCTION:
+			self.logger.addHandler(production_handler())
+			self.logger.propagate = False
+			return
+
 		formatter = ColoredFormatter(f'%(levelname)s{Style.RESET_ALL}:\t' +
 		                             f'{Fore.LIGHTWHITE_EX}{Style.BRIGHT}%(asctime)s\t' +
 		                             f'{Fore.RED + Fore.YELLOW}%(name)s\t' +
@@ -57,17 +213,17 @@ class FastApiAuthLogger(metaclass=SingletonMeta):
 
 		self.logger.addHandler(handler)
 
-	def info(self, message: str) -> NoReturn:
-		self.logger.info(message)
+	def info(self, message: str, *args) -> NoReturn:
+		self.logger.info(message, *args)
 
-	def debug(self, message: str) -> NoReturn:
-		self.logger.debug(message)
+	def debug(self, message: str, *args) -> NoReturn:
+		self.logger.debug(message, *args)
 
-	def warning(self, message: str) -> NoReturn:
-		self.logger.warning(message)
+	def warning(self, message: str, *args) -> NoReturn:
+		self.logger.warning(message, *args)
 
-	def error(self, message: str) -> NoReturn:
-		self.logger.error(message)
+	def error(self, message: str, *args) -> NoReturn:
+		self.logger.error(message, *args)
 
-	def critical(self, message: str) -> NoReturn:
-		self.logger.critical(message)
+	def critical(self, message: str, *args) -> NoReturn:
+		self.logger.critical(message, *args)
@@ -0,0 +1,5 @@
+from .registry import MetricsRegistry, Counter, Gauge, Histogram, metrics_registry
+from .instrument import instrument_methods, instrument_engine, observe_since, observe_each, \
+	current_service_method
+from .middleware import MetricsMiddleware
+from .router import metrics_router
@@ -0,0 +1,138 @@
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Callable
+
+from sqlalchemy import Engine, QueuePool, event
+
+from .registry import Histogram, metrics_registry
+from ..config import settings
+
+NO_SERVICE_METHOD = 'none'
+
+# Outermost service method of the current call chain; subsystem timings and queries are
+# attributed to it (UserService.create_user, not the AuthenticationService helper it calls)
+_service_method: ContextVar[str] = ContextVar('service_method', default=NO_SERVICE_METHOD)
+
+HTTP_REQUEST_DURATION = metrics_registry.histogram(
+	'http_request_duration_seconds', 'Request latency by route template', ('http_method', 'route', 'status'))
+HTTP_REQUESTS_IN_FLIGHT = metrics_registry.gauge(
+	'http_requests_in_flight', 'Requests being served', ('http_method',))
+SERVICE_METHOD_DURATION = metrics_registry.histogram(
+	'service_method_duration_seconds', 'UserService / AuthenticationService call latency', ('service_method',))
+PASSWORD_HASH_DURATION = metrics_registry.histogram(
+	'password_hash_duration_seconds', 'bcrypt hash / verify latency, pool queueing included',
+	('operation', 'service_method'))
+JWT_DURATION = metrics_registry.histogram(
+	'jwt_duration_seconds', 'JWT encode / decode latency', ('operation', 'service_method'))
+DB_CONNECTION_HELD = metrics_registry.histogram(
+	'db_connection_held_seconds', 'Time a pooled connection is checked out', ('service_method',))
+DB_QUERIES = metrics_registry.counter(
+	'db_queries_total', 'SQL statements executed', ('service_method',))
+
+
+def current_service_method() -> str:
+	return _service_method.get()
+
+
+def observe_since(histogram: Histogram, started: float, *labels: str):
+	"""
+	Record `perf_counter() - started` under `labels` and the current service method
+	"""
+	histogram.observe(time.perf_counter() - started, *labels, _service_method.get())
+
+
+def observe_each(histogram: Histogram, seconds: float, count: int, *labels: str):
+	"""
+	Record `count` operations that took `seconds` together as `count` observations of their mean
+	"""
+	service_method = _service_method.get()
+	for _ in range(count):
+		histogram.observe(seconds / count, *labels, service_method)
+
+
+def _timed_method(name: str, method: Callable) -> Callable:
+	if inspect.iscoroutinefunction(method):
+		@functools.wraps(method)
+		async def async_wrapper(*args, **kwargs):
+			if _service_method.get() != NO_SERVICE_METHOD:
+				return await method(*args, **kwargs)
+
+			token = _service_method.set(name)
+			started = time.perf_counter()
+			try:
+				return await method(*args, **kwargs)
+			finally:
+				SERVICE_METHOD_DURATION.observe(time.perf_counter() - started, name)
+				_service_method.reset(token)
+
+		return async_wrapper
+
+	@functools.wraps(method)
+	def wrapper(*args, **kwargs):
+		if _service_method.get() != NO_SERVICE_METHOD:
+			return method(*args, **kwargs)
+
+		token = _service_method.set(name)
+		started = time.perf_counter()
+		try:
+			return method(*args, **kwargs)
+		finally:
+			SERVICE_METHOD_DURATION.observe(time.perf_counter() - started, name)
+			_service_method.reset(token)
+
+	return wrapper
+
+
+def instrument_methods(cls: type) -> type:
+	"""
+	Class decorator: time the public methods `cls` defines and label work done inside them with
+	"Class.method". Generator methods (streamed exports) are resumed from other contexts and
+	are left as is. No-op unless METRICS_ENABLED.
+	"""
+	if not settings.METRICS_ENABLED:
+		return cls
+
+	for name, attribute in list(vars(cls).items()):
+		if name.startswith('_') or not inspect.isfunction(attribute):
+			continue
+		if inspect.isgeneratorfunction(attribute) or inspect.isasyncgenfunction(attribute):
+			continue
+		setattr(cls, name, _timed_method(f"{cls.__name__}.{name}", attribute))
+	return cls
+
+
+def instrument_engine(engine: Engine):
+	"""
+	Count statements of `engine` (the sync engine of an AsyncEngine) and time how long pooled connections
+	are held, from the pool's checkout to checkin events, under the service method that took them.
+	A QueuePool also exposes its size and checked out connections (above size when it overflows)
+	at scrape time.
+	No-op unless METRICS_ENABLED.
+	"""
+	if not settings.METRICS_ENABLED or getattr(engine, '_metrics_instrumented', False):
+		return
+
+	@event.listens_for(engine, "before_cursor_execute")
+	def count_query(conn, cursor, statement, parameters, context, executemany):
+		DB_QUERIES.inc(_service_method.get())
+
+	@event.listens_for(engine, "checkout")
+	def checked_out(dbapi_connection, connection_record, connection_proxy):
+		connection_record.info['checked_out'] = (time.perf_counter(), _service_method.get())
+
+	@event.listens_for(engine, "checkin")
+	def checked_in(dbapi_connection, connection_record):
+		checkout = connection_record.info.pop('checked_out', None)
+		if checkout is not None:
+			started, service_method = checkout
+			DB_CONNECTION_HELD.observe(time.perf_counter() - started, service_method)
+
+	pool = engine.pool
+	if isinstance(pool, QueuePool):
+		metrics_registry.register_stats(
+			'db_async_pool' if engine.dialect.is_async else 'db_pool',
+			lambda: {'size': pool.size(), 'checked_out': pool.checkedout()}
+		)
+	engine._metrics_instrumented = True
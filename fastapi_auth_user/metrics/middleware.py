@@ -0,0 +1,53 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .instrument import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT
+
+UNMATCHED_ROUTE = 'unmatched'
+
+
+def route_label(scope: Scope) -> str:
+	"""
+	Return: the path template of the matched route ("/api/{user_id}"), never the raw path, so
+	the label stays bounded; requests no route matched (404s, scanners) share one label
+	"""
+	route = scope.get('route')
+	if route is not None:
+		return route.path_format
+	if 'endpoint' in scope:
+		# mounted app (static files): the mount path
+		return scope.get('root_path') or UNMATCHED_ROUTE
+	return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+	"""
+	Times every HTTP request by method, route template and status, and counts requests in flight
+	"""
+
+	def __init__(self, app: ASGIApp):
+		self.app = app
+
+	async def __call__(self, scope: Scope, receive: Receive, send: Send):
+		if scope['type'] != 'http':
+			await self.app(scope, receive, send)
+			return
+
+		method = scope['method']
+		status_code = 500
+
+		async def send_status(message: Message):
+			nonlocal status_code
+			if message['type'] == 'http.response.start':
+				status_code = message['status']
+			await send(message)
+
+		in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method)
+		in_flight.inc()
+		started = time.perf_counter()
+		try:
+			await self.app(scope, receive, send_status)
+		finally:
+			in_flight.dec()
+			HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, method, route_label(scope), str(status_code))
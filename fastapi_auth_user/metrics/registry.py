@@ -0,0 +1,214 @@
+import math
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# seconds; covers a cached token lookup (~10us) up to a bcrypt run under load
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+	0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _escape(value: str) -> str:
+	return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+	if not names:
+		return ''
+	return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _format_value(value: float) -> str:
+	if value == math.inf:
+		return '+Inf'
+	if isinstance(value, float) and value.is_integer():
+		return str(int(value))
+	return repr(value)
+
+
+class Metric(ABC):
+	"""
+	A named family of samples; each distinct tuple of label values gets its own child, created on
+	first use and cached, so the hot path is a dict lookup plus a locked increment
+	"""
+
+	type_name: str = ''
+
+	def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+		self.name = name
+		self.documentation = documentation
+		self.label_names = tuple(label_names)
+		self._children: Dict[LabelValues, object] = {}
+
+	def labels(self, *values: str):
+		child = self._children.get(values)
+		if child is None:
+			if len(values) != len(self.label_names):
+				raise ValueError(f"{self.name} expects labels {self.label_names}, got {values}")
+			child = self._children.setdefault(values, self._new_child())
+		return child
+
+	@abstractmethod
+	def _new_child(self):
+		pass
+
+	@abstractmethod
+	def samples(self) -> Iterable[Tuple[str, str, float]]:
+		"""
+		Return: (name suffix, formatted labels, value) of every child
+		"""
+
+	def render(self) -> str:
+		lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+		lines.extend(f"{self.name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in self.samples())
+		return '\n'.join(lines)
+
+
+class _Value:
+	__slots__ = ('value', 'lock')
+
+	def __init__(self):
+		self.value = 0.0
+		self.lock = Lock()
+
+	def inc(self, amount: float = 1):
+		with self.lock:
+			self.value += amount
+
+	def dec(self, amount: float = 1):
+		with self.lock:
+			self.value -= amount
+
+	def set(self, value: float):
+		self.value = value
+
+
+class Counter(Metric):
+	type_name = 'counter'
+
+	def _new_child(self) -> _Value:
+		return _Value()
+
+	def inc(self, *values: str, amount: float = 1):
+		self.labels(*values).inc(amount)
+
+	def samples(self):
+		for values, child in list(self._children.items()):
+			yield '', _format_labels(self.label_names, values), child.value
+
+
+class Gauge(Counter):
+	type_name = 'gauge'
+
+	def dec(self, *values: str, amount: float = 1):
+		self.labels(*values).dec(amount)
+
+
+class _Buckets:
+	__slots__ = ('counts', 'sum', 'lock')
+
+	def __init__(self, size: int):
+		self.counts = [0] * size
+		self.sum = 0.0
+		self.lock = Lock()
+
+
+class Histogram(Metric):
+	"""
+	Fixed-bucket histogram; `observe` finds the bucket by bisection and counts it once, the
+	cumulative Prometheus buckets are only built when the endpoint is scraped
+	"""
+
+	type_name = 'histogram'
+
+	def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+	             buckets: Sequence[float] = DEFAULT_BUCKETS):
+		super().__init__(name, documentation, label_names)
+		self.buckets = tuple(sorted(buckets))
+
+	def _new_child(self) -> _Buckets:
+		return _Buckets(len(self.buckets) + 1)
+
+	def observe(self, value: float, *values: str):
+		child: _Buckets = self.labels(*values)
+		index = bisect_left(self.buckets, value)
+		with child.lock:
+			child.counts[index] += 1
+			child.sum += value
+
+	def samples(self):
+		bucket_names = self.label_names + ('le',)
+		for values, child in list(self._children.items()):
+			with child.lock:
+				counts, total = list(child.counts), child.sum
+
+			cumulative = 0
+			for bound, count in zip(self.buckets + (math.inf,), counts):
+				cumulative += count
+				yield '_bucket', _format_labels(bucket_names, values + (_format_value(bound),)), cumulative
+			labels = _format_labels(self.label_names, values)
+			yield '_sum', labels, total
+			yield '_count', labels, cumulative
+
+
+class StatsCollector:
+	"""
+	Exposes the `stats()` dict of a subsystem (token cache, login throttle, ...) at scrape time,
+	one sample per key; keys listed in `counters` only ever grow
+	"""
+
+	def __init__(self, prefix: str, stats: Callable[[], Dict[str, float]], counters: Sequence[str] = ()):
+		self.prefix = prefix
+		self.stats = stats
+		self.counters = set(counters)
+
+	def render(self) -> str:
+		lines = []
+		for key, value in self.stats().items():
+			name = f"{self.prefix}_{key}" + ('_total' if key in self.counters else '')
+			lines.append(f"# TYPE {name} {'counter' if key in self.counters else 'gauge'}")
+			lines.append(f"{name} {_format_value(value)}")
+		return '\n'.join(lines)
+
+
+class MetricsRegistry:
+	def __init__(self):
+		self.__metrics: Dict[str, Metric] = {}
+		self.__collectors: List[StatsCollector] = []
+
+	def register(self, metric: Metric) -> Metric:
+		if metric.name in self.__metrics:
+			raise ValueError(f"Metric {metric.name} is already registered")
+		self.__metrics[metric.name] = metric
+		return metric
+
+	def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+		return self.register(Counter(name, documentation, label_names))
+
+	def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+		return self.register(Gauge(name, documentation, label_names))
+
+	def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+	              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+		return self.register(Histogram(name, documentation, label_names, buckets))
+
+	def register_stats(self, prefix: str, stats: Callable[[], Dict[str, float]], counters: Sequence[str] = ()):
+		self.__collectors.append(StatsCollector(prefix, stats, counters))
+
+	def get(self, name: str) -> Optional[Metric]:
+		return self.__metrics.get(name)
+
+	def render(self) -> str:
+		"""
+		Return: every metric in the Prometheus text exposition format (version 0.0.4)
+		"""
+		parts = [metric.render() for metric in self.__metrics.values()]
+		parts.extend(collector.render() for collector in self.__collectors)
+		return '\n'.join(part for part in parts if part) + '\n'
+
+
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,37 @@
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from .registry import metrics_registry
+from ..config import settings
+
+# PlainTextResponse appends the charset
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+metrics_router = APIRouter(tags=['metrics'])
+
+scrape_bearer = HTTPBearer(auto_error=False)
+
+
+def check_scrape_token(credentials: HTTPAuthorizationCredentials | None = Depends(scrape_bearer)):
+	"""
+	With METRICS_TOKEN set, scrapes have to send it as a bearer token
+	"""
+	if not settings.METRICS_TOKEN:
+		return
+
+	if credentials is None or not hmac.compare_digest(credentials.credentials.encode(),
+	                                                   settings.METRICS_TOKEN.encode()):
+		raise HTTPException(
+			status_code=status.HTTP_401_UNAUTHORIZED,
+			detail="Invalid metrics token",
+			headers={"WWW-Authenticate": "Bearer"},
+		)
+
+
+@metrics_router.get('/metrics', response_class=PlainTextResponse, include_in_schema=False,
+                    dependencies=[Depends(check_scrape_token)])
+def metrics():
+	return PlainTextResponse(metrics_registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
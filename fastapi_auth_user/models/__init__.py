@@ -1,2 +1,2 @@
-from .models import Base, User, Role
+from .models import Base, User, Role, RevokedToken
 from .enums import RoleNameEnum
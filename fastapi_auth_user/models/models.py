@@ -1,5 +1,8 @@
+from datetime import datetime
+
 from sqlalchemy import (
 	Column,
+	DateTime,
 	Integer,
 	String,
 	ForeignKey,
@@ -7,7 +10,7 @@ from sqlalchemy import (
 	DefaultClause
 )
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
 Base = declarative_base()
 
@@ -26,7 +29,13 @@ class User(Base):
 	id = Column(Integer, primary_key=True, index=True)
 	username = Column(String, index=True)
 	email = Column(String, unique=True, index=True)
-	password = Column(String)
+	# Loaded only on access or with undefer(User.password), so hashes stay out of listings
+	password = deferred(Column(String))
+	# Bumped by logout-all; refresh tokens issued for an older generation are rejected
+	token_generation = Column(Integer, nullable=False, default=0, server_default=DefaultClause('0'))
+	# Bumped with updated_at by every write of the user or its roles; the ETag of user resources
+	version = Column(Integer, nullable=False, default=1, server_default=DefaultClause('1'))
+	updated_at = Column(DateTime, default=datetime.utcnow)
 
 	# Define a many-to-many relationship between users and roles
 	roles = relationship("Role", secondary=user_role_association, back_populates="users")
@@ -40,3 +49,12 @@ class Role(Base):
 
 	# Define a back-reference to access users associated with this role
 	users = relationship("User", secondary=user_role_association, back_populates="roles")
+
+
+class RevokedToken(Base):
+	__tablename__ = "revoked_tokens"
+
+	# Refresh token id (jti); rows are pruned once the token would have expired anyway
+	jti = Column(String, primary_key=True)
+	user_id = Column(Integer, index=True, nullable=False)
+	expires_at = Column(DateTime, index=True, nullable=False)
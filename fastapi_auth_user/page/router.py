@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Request, Depends, status
 from starlette.responses import HTMLResponse
 
-from .service import template_service, templates_name, RequestContext
+from .service import TemplateService, templates_name, RequestContext
 from ..auth.user_forms import AuthUserDataForm
+from ..database import db_helper, Database
 
 page_router = APIRouter(
 	tags=["Pages"],
@@ -11,16 +12,24 @@ page_router = APIRouter(
 )
 
 
+def get_template_service(db: Database = Depends(db_helper.session_dependency)) -> TemplateService:
+	return TemplateService(db)
+
+
 @page_router.get("/", response_class=HTMLResponse)
-async def auth_page(request: Request):
+async def auth_page(
+		request: Request,
+		template_service: TemplateService = Depends(get_template_service)
+):
 	return template_service.generate_template(templates_name.get('auth_panel'),
 	                                          RequestContext(request=request))
 
 
 @page_router.post('/user-page', response_class=HTMLResponse)
-async def user_page(
+def user_page(
 		request: Request,
 		data_form: AuthUserDataForm = Depends(AuthUserDataForm.as_form),
+		template_service: TemplateService = Depends(get_template_service)
 ):
 	return template_service.generate_user_page_template(templates_name.get('user_panel'),
 	                                                    dict(request=request, data=data_form))
@@ -5,12 +5,15 @@ from fastapi import HTTPException
 from starlette.templating import Jinja2Templates, _TemplateResponse
 
 from .context import RequestContext, ErrorContext, DataContext, TokenUserContext
-from ..auth.permissions import auth_service
-from ..database import Database, db_helper
+from ..auth.service import AuthenticationService
+from ..database import Database
 from ..models import User, RoleNameEnum
-from ..users import user_service
+from ..users.repository import load_user_roles, load_users_roles
+from ..users.service import UserService
 from ..users.schema import Tokens
 
+templates = Jinja2Templates(directory=path.join(path.dirname(path.dirname(path.realpath(__file__))), "templates"))
+
 templates_name = {
 	'auth_panel': 'auth_panel.html',
 	'user_panel': 'user_panel.html',
@@ -24,8 +27,7 @@ class TemplateService:
 			self, db: Database
 	):
 		self.db = db
-		self.templates = Jinja2Templates(
-			directory="\\".join(path.dirname(path.realpath(__file__)).split("\\")[:-1]) + "\\templates")
+		self.templates = templates
 
 	def generate_template(
 			self, file_name: Optional[str], context: Union[RequestContext, TokenUserContext]
@@ -51,10 +53,15 @@ class TemplateService:
 					dict(request=context.get('request'), error=ValueError('Template is None'))
 				)
 
-			tokens: Tokens = auth_service.get_tokens(context.get('data'))
-			user: User = auth_service.get_user_by_token(tokens.access_token.token)
+			auth_service = AuthenticationService(self.db)
+			user_service = UserService(self.db)
+			request = context.get('request')
+			client_ip = request.client.host if request is not None and request.client is not None else None
+			tokens: Tokens = auth_service.get_tokens(context.get('data'), client_ip)
+			user: User = auth_service.get_user_by_token(tokens.access_token.token, (load_user_roles,))
 
-			users = user_service.get_all_users() if user_service.has_role(user, RoleNameEnum.ADMIN) else []
+			users = user_service.get_all_users(options=(load_users_roles,)) \
+				if user_service.has_role(user, RoleNameEnum.ADMIN) else []
 
 			return self.generate_template(file_name, context=dict(
 				request=context.get('request'),
@@ -79,5 +86,3 @@ class TemplateService:
 	) -> _TemplateResponse:
 		return self.templates.TemplateResponse(templates_name.get('error_panel'), context=context)
 
-
-template_service = TemplateService(next(db_helper.session_dependency()))
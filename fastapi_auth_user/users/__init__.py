@@ -1,2 +1,2 @@
-from .router import user_router, user_service
-from .service import UserService
+from .router import user_router, get_user_service
+from .service import UserService, AsyncUserService
@@ -0,0 +1,179 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from .schema import (
+	UserCreate,
+	UserTokenResponse,
+	LiteUser,
+	UserUpdate, UserRoles,
+	BulkUsersResponse,
+	BulkRoleRequest,
+	BulkRoleResponse,
+	ExportFormat
+)
+from .conditional import NOT_MODIFIED_RESPONSES, is_conditional, not_modified_response, set_validators
+from .encoders import encoded_response, lite_user_encoder, user_roles_encoder
+from .service import AsyncUserService
+from .router import (
+	permissions_admin_moderator,
+	permissions_user,
+	read_bulk_records,
+	export_response,
+	BULK_REQUEST_BODY,
+	NEXT_CURSOR_HEADER
+)
+from ..database import async_db_helper, AsyncDatabase, next_cursor, query_budget
+from ..models import RoleNameEnum
+
+async_user_router = APIRouter(
+	prefix='/api',
+	tags=["Users"],
+	dependencies=[],
+	responses={status.HTTP_404_NOT_FOUND: {"description": "Not found"}},
+)
+
+
+def get_user_service(db: AsyncDatabase = Depends(async_db_helper.session_dependency)) -> AsyncUserService:
+	return AsyncUserService(db)
+
+
+@async_user_router.get("/", response_model=List[LiteUser], dependencies=[query_budget(3)])
+async def get_users(
+		response: Response,
+		skip: int = 0,
+		limit: int = 10,
+		after: Optional[str] = None,
+		access: bool = Depends(permissions_user.get_async_permissions),
+		user_service: AsyncUserService = Depends(get_user_service)
+):
+	if after is None:
+		users = await user_service.get_all_users(skip, limit)
+	else:
+		users = await user_service.get_users_after(after, limit)
+
+	cursor = next_cursor(users, limit)
+	if cursor is not None:
+		response.headers[NEXT_CURSOR_HEADER] = cursor
+	return encoded_response(users, lite_user_encoder.encode_many, response=response)
+
+
+@async_user_router.post("/users/bulk", response_model=BulkUsersResponse, openapi_extra=BULK_REQUEST_BODY)
+async def bulk_create_users(
+		records: List[dict] = Depends(read_bulk_records),
+		access: bool = Depends(permissions_admin_moderator.get_async_permissions),
+		user_service: AsyncUserService = Depends(get_user_service)
+):
+	return await user_service.bulk_create(records)
+
+
+@async_user_router.get("/users/export", response_class=StreamingResponse)
+async def export_users(
+		export_format: ExportFormat = Query(ExportFormat.NDJSON, alias='format'),
+		access: bool = Depends(permissions_admin_moderator.get_async_permissions),
+		user_service: AsyncUserService = Depends(get_user_service)
+):
+	return export_response(user_service.export_users(export_format), export_format)
+
+
+@async_user_router.get("/{user_id}", response_model=LiteUser, responses=NOT_MODIFIED_RESPONSES,
+                       dependencies=[query_budget(4)])
+async def get_user(
+		request: Request,
+		response: Response,
+		user_id: int = 1,
+		access: bool = Depends(permissions_user.get_async_permissions),
+		user_service: AsyncUserService = Depends(get_user_service)
+):
+	if is_conditional(request):
+		not_modified = not_modified_response(request, await user_service.get_version(user_id))
+		if not_modified is not None:
+			return not_modified
+
+	user = await user_service.get_by_id(user_id)
+	return encoded_response(user, lite_user_encoder.encode, response=set_validators(response, user))
+
+
+@async_user_router.post("/", response_model=UserTokenResponse, status_code=201, dependencies=[query_budget(6)])
+async def create_user(
+		user: UserCreate,
+		access: bool = Depends(permissions_admin_moderator.get_async_permissions),
+		user_service: AsyncUserService = Depends(get_user_service)
+):
+	return await user_service.create(user)
+
+
+@async_user_router.patch("/{user_id}", response_model=UserTokenResponse, dependencies=[query_budget(4)])
+async def update_user(
+		user_id: int,
+		user: UserUpdate,
+		access: bool = Depends(permissions_admin_moderator.get_async_permissions),
+		user_service: AsyncUserService = Depends(get_user_service)
+):
+	return await user_service.update(user_id, user)
+
+
+@async_user_router.delete("/{user_id}", response_model=LiteUser, dependencies=[query_budget(4)])
+async def delete_user(
+		user_id: int,
+		access: bool = Depends(permissions_admin_moderator.get_async_permissions),
+		user_service: AsyncUserService = Depends(get_user_service)
+):
+	return await user_service.delete(user_id)
+
+
+@async_user_router.post("/user/role/bulk", response_model=BulkRoleResponse)
+async def bulk_add_user_role(
+		request: BulkRoleRequest,
+		access: bool = Depends(permissions_admin_moderator.get_async_permissions),
+		user_service: AsyncUserService = Depends(get_user_service)
+):
+	return await user_service.bulk_add_role(request)
+
+
+@async_user_router.delete("/user/role/bulk", response_model=BulkRoleResponse)
+async def bulk_delete_user_role(
+		request: BulkRoleRequest,
+		access: bool = Depends(permissions_admin_moderator.get_async_permissions),
+		user_service: AsyncUserService = Depends(get_user_service)
+):
+	return await user_service.bulk_delete_role(request)
+
+
+@async_user_router.get("/user/role/{user_id}", response_model=UserRoles, responses=NOT_MODIFIED_RESPONSES,
+                       dependencies=[query_budget(5)])
+async def get_user_roles(
+		request: Request,
+		response: Response,
+		user_id: int,
+		access: bool = Depends(permissions_admin_moderator.get_async_permissions),
+		user_service: AsyncUserService = Depends(get_user_service)
+):
+	if is_conditional(request):
+		not_modified = not_modified_response(request, await user_service.get_version(user_id))
+		if not_modified is not None:
+			return not_modified
+
+	user = await user_service.get_user_roles(user_id)
+	return encoded_response(user, user_roles_encoder.encode, response=set_validators(response, user))
+
+
+@async_user_router.post("/user/role/{user_id}", response_model=UserRoles, dependencies=[query_budget(8)])
+async def add_user_role(
+		user_id: int,
+		role: RoleNameEnum,
+		access: bool = Depends(permissions_admin_moderator.get_async_permissions),
+		user_service: AsyncUserService = Depends(get_user_service)
+):
+	return encoded_response(await user_service.add_role_for_user(user_id, role), user_roles_encoder.encode)
+
+
+@async_user_router.delete("/user/role/{user_id}", response_model=UserRoles, dependencies=[query_budget(8)])
+async def delete_user_role(
+		user_id: int,
+		role: RoleNameEnum,
+		access: bool = Depends(permissions_admin_moderator.get_async_permissions),
+		user_service: AsyncUserService = Depends(get_user_service)
+):
+	return encoded_response(await user_service.delete_user_role(user_id, role), user_roles_encoder.encode)
@@ -0,0 +1,82 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+
+# Clients may keep user resources but have to revalidate them; shared caches must not store them
+CACHE_CONTROL = 'private, no-cache'
+
+NOT_MODIFIED_RESPONSES = {
+	status.HTTP_304_NOT_MODIFIED: {"description": "Not modified: If-None-Match / If-Modified-Since matched"},
+}
+
+
+def entity_tag(user: Any) -> str:
+	"""
+	Weak ETag of a user resource; `user` is anything with id and version (entity or column row)
+	"""
+	return f'W/"{user.id}-{user.version}"'
+
+
+def last_modified(user: Any) -> Optional[str]:
+	if user.updated_at is None:
+		return None
+	return format_datetime(user.updated_at.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def is_conditional(request: Request) -> bool:
+	return 'if-none-match' in request.headers or 'if-modified-since' in request.headers
+
+
+def _tag_matches(if_none_match: str, tag: str) -> bool:
+	opaque_tag = tag.removeprefix('W/')
+	for candidate in if_none_match.split(','):
+		candidate = candidate.strip()
+		if candidate == '*' or candidate.removeprefix('W/') == opaque_tag:
+			return True
+	return False
+
+
+def _unmodified_since(if_modified_since: str, updated_at: Optional[datetime]) -> bool:
+	if updated_at is None:
+		return False
+	try:
+		since = parsedate_to_datetime(if_modified_since)
+	except (TypeError, ValueError):
+		return False
+
+	if since.tzinfo is None:
+		since = since.replace(tzinfo=timezone.utc)
+	return updated_at.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+
+def is_not_modified(request: Request, user: Any) -> bool:
+	"""
+	If-None-Match (weak comparison) decides when present, otherwise If-Modified-Since
+	"""
+	if_none_match = request.headers.get('if-none-match')
+	if if_none_match is not None:
+		return _tag_matches(if_none_match, entity_tag(user))
+
+	if_modified_since = request.headers.get('if-modified-since')
+	return if_modified_since is not None and _unmodified_since(if_modified_since, user.updated_at)
+
+
+def set_validators(response: Response, user: Any) -> Response:
+	response.headers['ETag'] = entity_tag(user)
+	modified = last_modified(user)
+	if modified is not None:
+		response.headers['Last-Modified'] = modified
+	response.headers['Cache-Control'] = CACHE_CONTROL
+	return response
+
+
+def not_modified_response(request: Request, user: Any) -> Optional[Response]:
+	"""
+	`user`: version row of `get_version`, None for a missing user
+	Return: an empty 304 with the validators when the client's copy is current, else None
+	"""
+	if user is None or not is_not_modified(request, user):
+		return None
+	return set_validators(Response(status_code=status.HTTP_304_NOT_MODIFIED), user)
@@ -0,0 +1,81 @@
+from typing import Any, Callable, Iterable, List, Optional, Tuple, Type
+
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON
+
+from .schema import LiteUser, UserRoles, TokenData
+from ..config import settings
+
+try:
+	import orjson
+except ImportError:  # pip install fastapi-auth-user[fast-json]
+	orjson = None
+
+
+def fast_json_enabled() -> bool:
+	return bool(settings.FAST_JSON) and orjson is not None
+
+
+def default_response_class() -> Type[JSONResponse]:
+	"""
+	Return: ORJSONResponse with FAST_JSON (and orjson installed), else the stdlib JSONResponse
+	"""
+	return ORJSONResponse if fast_json_enabled() else JSONResponse
+
+
+class SchemaEncoder:
+	"""
+	Encoder compiled once per schema: reads the schema fields straight from trusted objects
+	(ORM entities, column rows or already validated models) into dicts, without validation.
+	Nested models and lists of models get their own compiled encoders.
+	"""
+
+	def __init__(self, schema: Type[BaseModel]):
+		self.schema = schema
+		self.__fields: Tuple[Tuple[str, Optional[Callable[[Any], Any]]], ...] = tuple(
+			(name, self.__nested(field)) for name, field in schema.__fields__.items()
+		)
+
+	def encode(self, obj: Any) -> dict:
+		return {name: getattr(obj, name) if nested is None else nested(getattr(obj, name))
+		        for name, nested in self.__fields}
+
+	def encode_many(self, objs: Iterable[Any]) -> List[dict]:
+		return [self.encode(obj) for obj in objs]
+
+	@staticmethod
+	def __nested(field) -> Optional[Callable[[Any], Any]]:
+		if not (isinstance(field.type_, type) and issubclass(field.type_, BaseModel)):
+			return None
+
+		encoder = SchemaEncoder(field.type_)
+		if field.shape == SHAPE_SINGLETON:
+			return lambda value: None if value is None else encoder.encode(value)
+		if field.shape == SHAPE_LIST:
+			return encoder.encode_many
+		raise TypeError(f"Unsupported field shape of {field.name} in {field.type_.__name__}")
+
+
+lite_user_encoder = SchemaEncoder(LiteUser)
+user_roles_encoder = SchemaEncoder(UserRoles)
+token_data_encoder = SchemaEncoder(TokenData)
+
+
+def encoded_response(
+		content: Any,
+		encode: Callable[[Any], Any],
+		status_code: int = 200,
+		response: Optional[Response] = None
+) -> Any:
+	"""
+	Return: `content` as is (FastAPI validates it against response_model), or with FAST_JSON
+	an ORJSONResponse of `encode(content)` that skips the response_model round trip.
+	Headers already set on the injected `response` are carried over.
+	"""
+	if not fast_json_enabled():
+		return content
+
+	headers = dict(response.headers) if response is not None else None
+	return ORJSONResponse(encode(content), status_code=status_code, headers=headers)
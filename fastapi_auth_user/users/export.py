@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, NamedTuple
+
+from .schema import ExportFormat
+
+EXPORT_MEDIA_TYPES = {
+	ExportFormat.NDJSON: 'application/x-ndjson',
+	ExportFormat.CSV: 'text/csv',
+}
+
+CSV_COLUMNS = ('id', 'username', 'email', 'roles')
+CSV_ROLE_SEPARATOR = ';'
+
+
+class ExportRow(NamedTuple):
+	id: int
+	username: str
+	email: str
+	roles: List[str]
+
+
+class ExportEncoder:
+	"""
+	Turns batches of ExportRow into text chunks of one export format
+	"""
+
+	def __init__(self, export_format: ExportFormat):
+		self.export_format = export_format
+
+	def header(self) -> str:
+		if self.export_format == ExportFormat.CSV:
+			return self.__csv([CSV_COLUMNS])
+		return ''
+
+	def encode(self, rows: List[ExportRow]) -> str:
+		if self.export_format == ExportFormat.CSV:
+			return self.__csv((row.id, row.username, row.email, CSV_ROLE_SEPARATOR.join(row.roles)) for row in rows)
+		return ''.join(json.dumps(row._asdict()) + '\n' for row in rows)
+
+	@staticmethod
+	def __csv(rows: Iterable) -> str:
+		buffer = io.StringIO()
+		csv.writer(buffer, lineterminator='\n').writerows(rows)
+		return buffer.getvalue()
+
+
+def export_chunks(rows: Iterable[ExportRow], export_format: ExportFormat, chunk_size: int) -> Iterator[str]:
+	"""
+	Stream `rows` as text chunks of `chunk_size` rows; the header and the first row are sent
+	at once so the client gets its first byte before the first full batch is read
+	"""
+	encoder = ExportEncoder(export_format)
+	header = encoder.header()
+	if header:
+		yield header
+
+	chunk: List[ExportRow] = []
+	first = True
+	for row in rows:
+		chunk.append(row)
+		if first or len(chunk) >= chunk_size:
+			yield encoder.encode(chunk)
+			chunk, first = [], False
+
+	if chunk:
+		yield encoder.encode(chunk)
+
+
+async def export_chunks_async(
+		rows: AsyncIterable[ExportRow],
+		export_format: ExportFormat,
+		chunk_size: int
+) -> AsyncIterator[str]:
+	encoder = ExportEncoder(export_format)
+	header = encoder.header()
+	if header:
+		yield header
+
+	chunk: List[ExportRow] = []
+	first = True
+	async for row in rows:
+		chunk.append(row)
+		if first or len(chunk) >= chunk_size:
+			yield encoder.encode(chunk)
+			chunk, first = [], False
+
+	if chunk:
+		yield encoder.encode(chunk)
@@ -1,59 +1,222 @@
-from typing import List, Optional
+from datetime import datetime
+from itertools import groupby
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence
 
 from fastapi import status
+from sqlalchemy import Row, and_, delete, exists, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased, joinedload, selectinload, undefer
+from sqlalchemy.orm.interfaces import LoaderOption
 
+from .export import ExportRow
 from .schema import LiteUser, UserCreate, UserUpdate
-from ..database import BaseRepository, Database, RepositoryException
+from ..database import (
+	BaseRepository,
+	AsyncBaseRepository,
+	Database,
+	AsyncDatabase,
+	RepositoryException,
+	role_registry
+)
+from ..database.db_utils import insert_ignore_conflicts
 from ..models import User, RoleNameEnum, Role
+from ..models.models import user_role_association
+
+# Loading strategies for User.roles: one user -> JOIN in the same query,
+# many users -> one extra "WHERE user_id IN (...)" query for the whole page
+load_user_roles: LoaderOption = joinedload(User.roles)
+load_users_roles: LoaderOption = selectinload(User.roles)
+# User.password is deferred; only credential checks load it
+load_user_password: LoaderOption = undefer(User.password)
+
+# Columns of LiteUser: read methods given these return plain rows instead of User entities
+lite_user_columns = (User.id, User.username, User.email)
+# Validators of a user resource (ETag / Last-Modified); also selected alone for conditional GETs
+user_version_columns = (User.id, User.version, User.updated_at)
+versioned_lite_user_columns = lite_user_columns + user_version_columns[1:]
+
+
+def _version_values() -> dict:
+	return {'version': User.version + 1, 'updated_at': datetime.utcnow()}
+
+
+def _touch_user_statement(user_id: int):
+	"""
+	Bump the version of a user whose roles changed, refreshing the loaded entity
+	"""
+	return (
+		update(User)
+		.where(User.id == user_id)
+		.values(**_version_values())
+		.returning(User)
+		.execution_options(populate_existing=True)
+	)
+
+
+def _touch_users_statement(user_ids: List[int]):
+	return update(User).where(User.id.in_(user_ids)).values(**_version_values())
+
+
+def _users_with_roles_statement(batch_size: int):
+	"""
+	One row per (user, role) ordered by user id, fetched `batch_size` rows at a time
+	through a server-side cursor where the driver has one
+	"""
+	return (
+		select(User.id, User.username, User.email, Role.name.label('role'))
+		.outerjoin(user_role_association, user_role_association.c.user_id == User.id)
+		.outerjoin(Role, Role.id == user_role_association.c.role_id)
+		.order_by(User.id)
+		.execution_options(yield_per=batch_size)
+	)
+
+
+def _export_row(rows: List) -> ExportRow:
+	user = rows[0]
+	return ExportRow(user.id, user.username, user.email, [row.role for row in rows if row.role is not None])
+
+
+def _insert_user_statement(db, values: dict):
+	"""
+	INSERT ... ON CONFLICT (email) DO NOTHING RETURNING the user; on dialects without
+	ON CONFLICT a plain INSERT, where the unique email index raises IntegrityError instead
+	"""
+	statement = insert_ignore_conflicts(db, User, [User.email])
+	if statement is None:
+		statement = insert(User)
+	return statement.values(**values).returning(User)
+
+
+def _email_conflict() -> RepositoryException:
+	return RepositoryException(status_code=status.HTTP_409_CONFLICT, message='Already exist with this email')
+
+
+def _has_role_id(user: User, role_id: int) -> bool:
+	return any(user_role.id == role_id for user_role in user.roles)
+
+
+def _unlink_role_statement(user_id: int, role_id: int):
+	return delete(user_role_association).where(
+		user_role_association.c.user_id == user_id,
+		user_role_association.c.role_id == role_id,
+	)
+
+
+def _unlink_user_statement(user_id: int):
+	return delete(user_role_association).where(user_role_association.c.user_id == user_id)
+
+
+def _add_role_statement(user_ids: List[int], role_id: int):
+	"""
+	INSERT ... SELECT the link for every existing user in `user_ids` that lacks the role
+	"""
+	has_role = exists().where(
+		user_role_association.c.user_id == User.id,
+		user_role_association.c.role_id == role_id,
+	)
+	users_without_role = select(User.id, literal(role_id)).where(User.id.in_(user_ids), ~has_role)
+	return (
+		insert(user_role_association)
+		.from_select(['user_id', 'role_id'], users_without_role)
+		.returning(user_role_association.c.user_id)
+	)
+
+
+def _delete_role_statement(user_ids: List[int], role_id: int):
+	"""
+	DELETE the link for every user in `user_ids` that keeps at least one other role
+	"""
+	other_role = aliased(user_role_association)
+	has_other_role = exists().where(
+		other_role.c.user_id == user_role_association.c.user_id,
+		other_role.c.role_id != role_id,
+	)
+	return (
+		delete(user_role_association)
+		.where(and_(
+			user_role_association.c.role_id == role_id,
+			user_role_association.c.user_id.in_(user_ids),
+			has_other_role,
+		))
+		.returning(user_role_association.c.user_id)
+	)
 
 
 class UserRepository(BaseRepository):
 	def __init__(self, db: Database):
 		super().__init__(db, User)
 
-	def get_all(self, skip: int = 0, limit: int = 100) -> List[LiteUser]:
-		return super().get_all(skip, limit)
+	def get_all(
+			self,
+			skip: int = 0,
+			limit: int = 100,
+			options: Sequence[LoaderOption] = (),
+			columns: Sequence = ()
+	) -> List[LiteUser]:
+		return super().get_all(skip, limit, options, columns)
 
 	def create(self, obj_in: UserCreate) -> User:
-		db_obj: User = User(**dict(obj_in))
-		role_obj = self.get_role(RoleNameEnum.USER)
+		"""
+		One INSERT guarded by the unique email index plus the role link; a taken email raises 409
+		"""
+		role_id = self.get_role_id(RoleNameEnum.USER)
+		try:
+			user: User = self.db.scalar(_insert_user_statement(self.db, dict(obj_in)))
+		except IntegrityError:
+			self.db.rollback()
+			raise _email_conflict()
+
+		if user is None:
+			self.db.rollback()
+			raise _email_conflict()
 
-		db_obj.roles.append(role_obj)
-		self.db.add(db_obj)
+		self.db.execute(insert(user_role_association).values(user_id=user.id, role_id=role_id))
 		self.db.commit()
-		self.db.refresh(db_obj)
-		return db_obj
+		return user
+
+	def get_by_id(self, user_id: int, options: Sequence[LoaderOption] = (), columns: Sequence = ()) -> User:
+		return super().get_by_id(user_id, options, columns)
+
+	def update(self, obj_id: int, obj_in: UserUpdate, options: Sequence[LoaderOption] = ()) -> User:
+		return super().update(obj_id, obj_in, options)
+
+	def version_values(self) -> dict:
+		return _version_values()
 
-	def get_by_id(self, user_id: int) -> User:
-		return super().get_by_id(user_id)
+	def get_version(self, user_id: int) -> Optional[Row]:
+		"""
+		Return: id, version and updated_at of the user (primary key lookup, no entity), None if missing
+		"""
+		return self.db.execute(select(*user_version_columns).where(User.id == user_id)).first()
 
-	def update(self, obj_id: int, obj_in: UserUpdate) -> User:
-		return super().update(obj_id, obj_in)
+	def get_version_by_email(self, email: Optional[str]) -> Optional[Row]:
+		return self.db.execute(select(*user_version_columns).where(User.email == email)).first()
 
 	def delete(self, user_id: int) -> User:
+		self.db.execute(_unlink_user_statement(user_id))
 		return super().delete(user_id)
 
 	def add_role(self, user_id: int, role: RoleNameEnum) -> User:
-		role_obj = self.get_role(role)
-		user: User = self.get_by_id(user_id)
+		role_id = self.get_role_id(role)
+		user: User = self.get_by_id(user_id, (load_user_roles,))
 
 		if not user:
 			raise RepositoryException(status_code=status.HTTP_404_NOT_FOUND,
 			                          message='Not found user with this id')
 
-		if role_obj in user.roles:
+		if _has_role_id(user, role_id):
 			raise RepositoryException(status_code=status.HTTP_409_CONFLICT,
 			                          message='User has this role')
 
-		user.roles.append(role_obj)
-		self.db.add(user)
+		self.db.execute(insert(user_role_association).values(user_id=user_id, role_id=role_id))
+		self.db.scalar(_touch_user_statement(user_id))
 		self.db.commit()
-		self.db.refresh(user)
+		self.db.refresh(user, ['roles'])
 		return user
 
 	def delete_role(self, user_id: int, role: RoleNameEnum) -> User:
-		role_obj = self.get_role(role)
-		user: User = self.get_by_id(user_id)
+		role_id = self.get_role_id(role)
+		user: User = self.get_by_id(user_id, (load_user_roles,))
 		if not user:
 			raise RepositoryException(status_code=status.HTTP_409_CONFLICT,
 			                          message='Not found user with this id')
@@ -62,25 +225,43 @@ class UserRepository(BaseRepository):
 			raise RepositoryException(status_code=status.HTTP_404_NOT_FOUND,
 			                          message='User need have one role')
 
-		if role_obj not in user.roles:
+		if not _has_role_id(user, role_id):
 			raise RepositoryException(status_code=status.HTTP_404_NOT_FOUND,
 			                          message='User hasnt this role')
 
-		user.roles.remove(role_obj)
-		self.db.add(user)
+		self.db.execute(_unlink_role_statement(user_id, role_id))
+		self.db.scalar(_touch_user_statement(user_id))
 		self.db.commit()
-		self.db.refresh(user)
+		self.db.refresh(user, ['roles'])
 		return user
 
-	def get_role(self, role):
-		role_obj = self.db.query(Role).filter(Role.name == role.value).first()
-		if not role_obj:
-			raise RepositoryException(status_code=status.HTTP_404_NOT_FOUND,
-			                          message=f'Role [{role.value}] not created')
+	def bulk_add_role(self, user_ids: List[int], role: RoleNameEnum) -> List[int]:
+		"""
+		Return: ids of the users that got the role
+		"""
+		changed = set(self.db.scalars(_add_role_statement(user_ids, self.get_role_id(role))))
+		if changed:
+			self.db.execute(_touch_users_statement(list(changed)))
+		self.db.commit()
+		return sorted(changed)
+
+	def bulk_delete_role(self, user_ids: List[int], role: RoleNameEnum) -> List[int]:
+		"""
+		Return: ids of the users that lost the role; users left without any role are skipped
+		"""
+		changed = set(self.db.scalars(_delete_role_statement(user_ids, self.get_role_id(role))))
+		if changed:
+			self.db.execute(_touch_users_statement(list(changed)))
+		self.db.commit()
+		return sorted(changed)
+
+	def get_role_id(self, role: RoleNameEnum) -> int:
+		return role_registry.get_id(self.db, role)
 
-		return role_obj
+	def get_role(self, role: RoleNameEnum) -> Role:
+		return self.db.get(Role, self.get_role_id(role))
 
-	def get_user_by_email(self, email: Optional[str] = None) -> User:
+	def get_user_by_email(self, email: Optional[str] = None, options: Sequence[LoaderOption] = ()) -> User:
 
 		if email is None:
 			raise RepositoryException(
@@ -88,14 +269,44 @@ class UserRepository(BaseRepository):
 				message=f'Wrong email!'
 			)
 
-		user: User = self.db.query(User).filter(User.email == email).first()
+		user: User = self.db.query(User).options(*options).filter(User.email == email).first()
 
 		return user
 
+	def bulk_create(self, users: List[dict], role: RoleNameEnum) -> Dict[str, int]:
+		"""
+		Insert users and their role links with multi-row INSERTs in one transaction.
+		Return: email -> id of the created users; emails that already exist are skipped
+		"""
+		role_id = self.get_role_id(role)
+		statement = insert_ignore_conflicts(self.db, User, [User.email])
+		if statement is None:
+			existing = set(self.db.scalars(select(User.email).where(User.email.in_([user['email'] for user in users]))))
+			users = [user for user in users if user['email'] not in existing]
+			statement = insert(User)
+
+		created: Dict[str, int] = {}
+		if users:
+			created = {row.email: row.id for row in self.db.execute(statement.returning(User.id, User.email), users)}
+		if created:
+			self.db.execute(insert(user_role_association),
+			                [{'user_id': user_id, 'role_id': role_id} for user_id in created.values()])
+		self.db.commit()
+		return created
+
+	def iter_users_with_roles(self, batch_size: int = 1000) -> Iterator[ExportRow]:
+		"""
+		Stream every user with role names; memory is bound by `batch_size`, not by the table size
+		"""
+		result = self.db.execute(_users_with_roles_statement(batch_size))
+		for _, rows in groupby(result, key=lambda row: row.id):
+			yield _export_row(list(rows))
+
 	def create_user_with_role(self, user: User, role: RoleNameEnum) -> User:
-		role_obj = self.get_role(role)
-		user.roles.append(role_obj)
+		role_id = self.get_role_id(role)
 		self.db.add(user)
+		self.db.flush()
+		self.db.execute(insert(user_role_association).values(user_id=user.id, role_id=role_id))
 		self.db.commit()
 		self.db.refresh(user)
 		return user
@@ -103,6 +314,176 @@ class UserRepository(BaseRepository):
 	def set_password(self, user_id: int, new_password: str) -> User:
 		user = self.get_by_id(user_id)
 		user.password = new_password
+		user.version = User.version + 1
+		user.updated_at = datetime.utcnow()
 		self.db.commit()
 		self.db.refresh(user)
 		return user
+
+
+class AsyncUserRepository(AsyncBaseRepository):
+	load_options = (load_users_roles,)
+
+	def __init__(self, db: AsyncDatabase):
+		super().__init__(db, User)
+
+	async def get_all(self, skip: int = 0, limit: int = 100, columns: Sequence = ()) -> List[LiteUser]:
+		return await super().get_all(skip, limit, columns)
+
+	async def create(self, obj_in: UserCreate) -> User:
+		role_id = await self.get_role_id(RoleNameEnum.USER)
+		try:
+			user: User = await self.db.scalar(_insert_user_statement(self.db, dict(obj_in)))
+		except IntegrityError:
+			await self.db.rollback()
+			raise _email_conflict()
+
+		if user is None:
+			await self.db.rollback()
+			raise _email_conflict()
+
+		await self.db.execute(insert(user_role_association).values(user_id=user.id, role_id=role_id))
+		await self.db.commit()
+		await self.db.refresh(user, ['roles'])
+		return user
+
+	async def get_by_id(self, user_id: int, columns: Sequence = ()) -> User:
+		return await super().get_by_id(user_id, columns)
+
+	async def update(self, obj_id: int, obj_in: UserUpdate, options: Sequence[LoaderOption] = ()) -> User:
+		return await super().update(obj_id, obj_in, options)
+
+	def version_values(self) -> dict:
+		return _version_values()
+
+	async def get_version(self, user_id: int) -> Optional[Row]:
+		return (await self.db.execute(select(*user_version_columns).where(User.id == user_id))).first()
+
+	async def get_version_by_email(self, email: Optional[str]) -> Optional[Row]:
+		return (await self.db.execute(select(*user_version_columns).where(User.email == email))).first()
+
+	async def delete(self, user_id: int) -> User:
+		await self.db.execute(_unlink_user_statement(user_id))
+		return await super().delete(user_id)
+
+	async def add_role(self, user_id: int, role: RoleNameEnum) -> User:
+		role_id = await self.get_role_id(role)
+		user: User = await self.get_by_id(user_id)
+
+		if not user:
+			raise RepositoryException(status_code=status.HTTP_404_NOT_FOUND,
+			                          message='Not found user with this id')
+
+		if _has_role_id(user, role_id):
+			raise RepositoryException(status_code=status.HTTP_409_CONFLICT,
+			                          message='User has this role')
+
+		await self.db.execute(insert(user_role_association).values(user_id=user_id, role_id=role_id))
+		await self.db.scalar(_touch_user_statement(user_id))
+		await self.db.commit()
+		await self.db.refresh(user, ['roles'])
+		return user
+
+	async def delete_role(self, user_id: int, role: RoleNameEnum) -> User:
+		role_id = await self.get_role_id(role)
+		user: User = await self.get_by_id(user_id)
+		if not user:
+			raise RepositoryException(status_code=status.HTTP_409_CONFLICT,
+			                          message='Not found user with this id')
+
+		if len(user.roles) == 1:
+			raise RepositoryException(status_code=status.HTTP_404_NOT_FOUND,
+			                          message='User need have one role')
+
+		if not _has_role_id(user, role_id):
+			raise RepositoryException(status_code=status.HTTP_404_NOT_FOUND,
+			                          message='User hasnt this role')
+
+		await self.db.execute(_unlink_role_statement(user_id, role_id))
+		await self.db.scalar(_touch_user_statement(user_id))
+		await self.db.commit()
+		await self.db.refresh(user, ['roles'])
+		return user
+
+	async def bulk_add_role(self, user_ids: List[int], role: RoleNameEnum) -> List[int]:
+		changed = set(await self.db.scalars(_add_role_statement(user_ids, await self.get_role_id(role))))
+		if changed:
+			await self.db.execute(_touch_users_statement(list(changed)))
+		await self.db.commit()
+		return sorted(changed)
+
+	async def bulk_delete_role(self, user_ids: List[int], role: RoleNameEnum) -> List[int]:
+		changed = set(await self.db.scalars(_delete_role_statement(user_ids, await self.get_role_id(role))))
+		if changed:
+			await self.db.execute(_touch_users_statement(list(changed)))
+		await self.db.commit()
+		return sorted(changed)
+
+	async def get_role_id(self, role: RoleNameEnum) -> int:
+		return await role_registry.get_id_async(self.db, role)
+
+	async def get_role(self, role: RoleNameEnum) -> Role:
+		return await self.db.get(Role, await self.get_role_id(role))
+
+	async def get_user_by_email(self, email: Optional[str] = None, options: Sequence[LoaderOption] = ()) -> User:
+
+		if email is None:
+			raise RepositoryException(
+				status_code=status.HTTP_404_NOT_FOUND,
+				message=f'Wrong email!'
+			)
+
+		user: User = await self.db.scalar(
+			select(User).options(*self.load_options, *options).where(User.email == email)
+		)
+
+		return user
+
+	async def bulk_create(self, users: List[dict], role: RoleNameEnum) -> Dict[str, int]:
+		role_id = await self.get_role_id(role)
+		statement = insert_ignore_conflicts(self.db, User, [User.email])
+		if statement is None:
+			existing = set(await self.db.scalars(
+				select(User.email).where(User.email.in_([user['email'] for user in users]))
+			))
+			users = [user for user in users if user['email'] not in existing]
+			statement = insert(User)
+
+		created: Dict[str, int] = {}
+		if users:
+			result = await self.db.execute(statement.returning(User.id, User.email), users)
+			created = {row.email: row.id for row in result}
+		if created:
+			await self.db.execute(insert(user_role_association),
+			                      [{'user_id': user_id, 'role_id': role_id} for user_id in created.values()])
+		await self.db.commit()
+		return created
+
+	async def iter_users_with_roles(self, batch_size: int = 1000) -> AsyncIterator[ExportRow]:
+		result = await self.db.stream(_users_with_roles_statement(batch_size))
+		rows: List = []
+		async for row in result:
+			if rows and rows[0].id != row.id:
+				yield _export_row(rows)
+				rows = []
+			rows.append(row)
+
+		if rows:
+			yield _export_row(rows)
+
+	async def create_user_with_role(self, user: User, role: RoleNameEnum) -> User:
+		role_id = await self.get_role_id(role)
+		self.db.add(user)
+		await self.db.flush()
+		await self.db.execute(insert(user_role_association).values(user_id=user.id, role_id=role_id))
+		await self.db.commit()
+		return await self.get_by_id(user.id)
+
+	async def set_password(self, user_id: int, new_password: str) -> User:
+		user = await self.get_by_id(user_id)
+		user.password = new_password
+		user.version = User.version + 1
+		user.updated_at = datetime.utcnow()
+		await self.db.commit()
+		await self.db.refresh(user)
+		return user
@@ -1,16 +1,25 @@
-from typing import List
+import json
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 
 from .schema import (
 	UserCreate,
 	UserTokenResponse,
 	LiteUser,
-	UserUpdate, UserRoles
+	UserUpdate, UserRoles,
+	BulkUsersResponse,
+	BulkRoleRequest,
+	BulkRoleResponse,
+	ExportFormat
 )
+from .conditional import NOT_MODIFIED_RESPONSES, is_conditional, not_modified_response, set_validators
+from .encoders import encoded_response, lite_user_encoder, user_roles_encoder
+from .export import EXPORT_MEDIA_TYPES
 from .service import UserService
 from ..auth.permissions import RolePermissions
-from ..database import db_helper
+from ..database import db_helper, Database, next_cursor, query_budget
 from ..models import RoleNameEnum
 
 user_router = APIRouter(
@@ -20,75 +29,194 @@ user_router = APIRouter(
 	responses={status.HTTP_404_NOT_FOUND: {"description": "Not found"}},
 )
 
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
 permissions_admin_moderator = RolePermissions([RoleNameEnum.ADMIN, RoleNameEnum.Moderator])
 permissions_user = RolePermissions([RoleNameEnum.USER])
 
-user_service = UserService(next(db_helper.session_dependency()))
 
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+BULK_REQUEST_BODY = {
+	'requestBody': {
+		'required': True,
+		'content': {
+			'application/json': {
+				'schema': {'type': 'array', 'items': UserCreate.schema()},
+			},
+			NDJSON_MEDIA_TYPE: {
+				'schema': {'type': 'string', 'description': 'One UserCreate JSON object per line'},
+			},
+		},
+	},
+}
+
+
+def get_user_service(db: Database = Depends(db_helper.session_dependency)) -> UserService:
+	return UserService(db)
+
+
+async def read_bulk_records(request: Request) -> List[dict]:
+	"""
+	Read the bulk import body: a JSON array, or NDJSON with one record per line
+	"""
+	body = await request.body()
+	try:
+		if request.headers.get('content-type', '').startswith(NDJSON_MEDIA_TYPE):
+			return [json.loads(line) for line in body.splitlines() if line.strip()]
 
-@user_router.get("/", response_model=List[LiteUser])
+		records = json.loads(body)
+	except ValueError as err:
+		raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid JSON: {err}")
+
+	if not isinstance(records, list):
+		raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON array of users")
+	return records
+
+
+def export_response(chunks, export_format: ExportFormat) -> StreamingResponse:
+	return StreamingResponse(
+		chunks,
+		media_type=EXPORT_MEDIA_TYPES[export_format],
+		headers={'Content-Disposition': f'attachment; filename="users.{export_format.value}"'}
+	)
+
+
+@user_router.get("/", response_model=List[LiteUser], dependencies=[query_budget(2)])
 def get_users(
+		response: Response,
 		skip: int = 0,
 		limit: int = 10,
-		access: bool = Depends(permissions_user.get_permissions)
+		after: Optional[str] = None,
+		access: bool = Depends(permissions_user.get_permissions),
+		user_service: UserService = Depends(get_user_service)
+):
+	if after is None:
+		users = user_service.get_all_users(skip, limit)
+	else:
+		users = user_service.get_users_after(after, limit)
+
+	cursor = next_cursor(users, limit)
+	if cursor is not None:
+		response.headers[NEXT_CURSOR_HEADER] = cursor
+	return encoded_response(users, lite_user_encoder.encode_many, response=response)
+
+
+@user_router.post("/users/bulk", response_model=BulkUsersResponse, openapi_extra=BULK_REQUEST_BODY)
+def bulk_create_users(
+		records: List[dict] = Depends(read_bulk_records),
+		access: bool = Depends(permissions_admin_moderator.get_permissions),
+		user_service: UserService = Depends(get_user_service)
 ):
-	return user_service.get_all_users(skip, limit)
+	return user_service.bulk_create(records)
 
 
-@user_router.get("/{user_id}", response_model=LiteUser)
+@user_router.get("/users/export", response_class=StreamingResponse)
+def export_users(
+		export_format: ExportFormat = Query(ExportFormat.NDJSON, alias='format'),
+		access: bool = Depends(permissions_admin_moderator.get_permissions),
+		user_service: UserService = Depends(get_user_service)
+):
+	return export_response(user_service.export_users(export_format), export_format)
+
+
+@user_router.get("/{user_id}", response_model=LiteUser, responses=NOT_MODIFIED_RESPONSES,
+                 dependencies=[query_budget(3)])
 def get_user(
+		request: Request,
+		response: Response,
 		user_id: int = 1,
-		access: bool = Depends(permissions_user.get_permissions)
+		access: bool = Depends(permissions_user.get_permissions),
+		user_service: UserService = Depends(get_user_service)
 ):
-	return user_service.get_by_id(user_id)
+	if is_conditional(request):
+		not_modified = not_modified_response(request, user_service.get_version(user_id))
+		if not_modified is not None:
+			return not_modified
 
+	user = user_service.get_by_id(user_id)
+	return encoded_response(user, lite_user_encoder.encode, response=set_validators(response, user))
 
-@user_router.post("/", response_model=UserTokenResponse, status_code=201)
+
+@user_router.post("/", response_model=UserTokenResponse, status_code=201, dependencies=[query_budget(3)])
 def create_user(
 		user: UserCreate,
-		access: bool = Depends(permissions_admin_moderator.get_permissions)
+		access: bool = Depends(permissions_admin_moderator.get_permissions),
+		user_service: UserService = Depends(get_user_service)
 ):
 	return user_service.create(user)
 
 
-@user_router.patch("/{user_id}", response_model=UserTokenResponse)
+@user_router.patch("/{user_id}", response_model=UserTokenResponse, dependencies=[query_budget(3)])
 def update_user(
 		user_id: int,
 		user: UserUpdate,
-		access: bool = Depends(permissions_admin_moderator.get_permissions)
+		access: bool = Depends(permissions_admin_moderator.get_permissions),
+		user_service: UserService = Depends(get_user_service)
 ):
 	return user_service.update(user_id, user)
 
 
-@user_router.delete("/{user_id}", response_model=LiteUser)
+@user_router.delete("/{user_id}", response_model=LiteUser, dependencies=[query_budget(3)])
 def delete_user(
 		user_id: int,
-		access: bool = Depends(permissions_admin_moderator.get_permissions)
+		access: bool = Depends(permissions_admin_moderator.get_permissions),
+		user_service: UserService = Depends(get_user_service)
 ):
 	return user_service.delete(user_id)
 
 
-@user_router.get("/user/role/{user_id}", response_model=UserRoles)
+@user_router.post("/user/role/bulk", response_model=BulkRoleResponse)
+def bulk_add_user_role(
+		request: BulkRoleRequest,
+		access: bool = Depends(permissions_admin_moderator.get_permissions),
+		user_service: UserService = Depends(get_user_service)
+):
+	return user_service.bulk_add_role(request)
+
+
+@user_router.delete("/user/role/bulk", response_model=BulkRoleResponse)
+def bulk_delete_user_role(
+		request: BulkRoleRequest,
+		access: bool = Depends(permissions_admin_moderator.get_permissions),
+		user_service: UserService = Depends(get_user_service)
+):
+	return user_service.bulk_delete_role(request)
+
+
+@user_router.get("/user/role/{user_id}", response_model=UserRoles, responses=NOT_MODIFIED_RESPONSES,
+                 dependencies=[query_budget(3)])
 def get_user_roles(
+		request: Request,
+		response: Response,
 		user_id: int,
-		access: bool = Depends(permissions_admin_moderator.get_permissions)
+		access: bool = Depends(permissions_admin_moderator.get_permissions),
+		user_service: UserService = Depends(get_user_service)
 ):
-	return user_service.get_user_roles(user_id)
+	if is_conditional(request):
+		not_modified = not_modified_response(request, user_service.get_version(user_id))
+		if not_modified is not None:
+			return not_modified
+
+	user = user_service.get_user_roles(user_id)
+	return encoded_response(user, user_roles_encoder.encode, response=set_validators(response, user))
 
 
-@user_router.post("/user/role/{user_id}", response_model=UserRoles)
+@user_router.post("/user/role/{user_id}", response_model=UserRoles, dependencies=[query_budget(5)])
 def add_user_role(
 		user_id: int,
 		role: RoleNameEnum,
-		access: bool = Depends(permissions_admin_moderator.get_permissions)
+		access: bool = Depends(permissions_admin_moderator.get_permissions),
+		user_service: UserService = Depends(get_user_service)
 ):
-	return user_service.add_role_for_user(user_id, role)
+	return encoded_response(user_service.add_role_for_user(user_id, role), user_roles_encoder.encode)
 
 
-@user_router.delete("/user/role/{user_id}", response_model=UserRoles)
+@user_router.delete("/user/role/{user_id}", response_model=UserRoles, dependencies=[query_budget(5)])
 def add_user_role(
 		user_id: int,
 		role: RoleNameEnum,
-		access: bool = Depends(permissions_admin_moderator.get_permissions)
+		access: bool = Depends(permissions_admin_moderator.get_permissions),
+		user_service: UserService = Depends(get_user_service)
 ):
-	return user_service.delete_user_role(user_id, role)
+	return encoded_response(user_service.delete_user_role(user_id, role), user_roles_encoder.encode)
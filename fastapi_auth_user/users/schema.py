@@ -1,6 +1,7 @@
 import re
 from datetime import datetime
-from typing import List
+from enum import Enum
+from typing import List, FrozenSet, Optional
 
 from pydantic import (
 	BaseModel,
@@ -8,6 +9,8 @@ from pydantic import (
 	validator
 )
 
+from ..models import RoleNameEnum
+
 
 class UserBase(BaseModel):
 	username: str = Field(..., min_length=5)
@@ -94,6 +97,50 @@ class UserTokenResponse(UserToken, LiteUser):
 		orm_mode = True
 
 
+class Principal(BaseModel):
+	id: int
+	email: str
+	roles: FrozenSet[str]
+
+
+class BulkRowStatus(str, Enum):
+	CREATED = 'created'
+	EXISTS = 'exists'
+	DUPLICATE = 'duplicate'
+	INVALID = 'invalid'
+	ERROR = 'error'
+
+
+class BulkUserResult(BaseModel):
+	index: int
+	email: Optional[str] = None
+	id: Optional[int] = None
+	status: BulkRowStatus
+	detail: Optional[str] = None
+
+
+class BulkUsersResponse(BaseModel):
+	created: int
+	failed: int
+	results: List[BulkUserResult]
+
+
+class ExportFormat(str, Enum):
+	NDJSON = 'ndjson'
+	CSV = 'csv'
+
+
+class BulkRoleRequest(BaseModel):
+	user_ids: List[int] = Field(..., min_items=1)
+	role: RoleNameEnum
+
+
+class BulkRoleResponse(BaseModel):
+	role: RoleNameEnum
+	changed: List[int]
+	unchanged: List[int]
+
+
 class UserUpdate(BaseModel):
 	id: int = None
 	username: str = None
@@ -1,20 +1,117 @@
-from typing import List, Union
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 from fastapi import HTTPException
 from fastapi import status
+from pydantic import ValidationError
+from sqlalchemy import Row
+from sqlalchemy.orm.interfaces import LoaderOption
 
 from ..logger import FastApiAuthLogger, LogLevel
-from .repository import UserRepository
-from .schema import UserCreate, LiteUser, UserTokenResponse, UserUpdate, UserRoles
-from ..auth.permissions import auth_service
-from ..database import Database, RepositoryException
+from .export import export_chunks, export_chunks_async
+from .repository import (
+	UserRepository,
+	AsyncUserRepository,
+	load_user_roles,
+	load_users_roles,
+	lite_user_columns,
+	versioned_lite_user_columns
+)
+from .schema import (
+	UserCreate,
+	LiteUser,
+	UserTokenResponse,
+	UserUpdate,
+	UserRoles,
+	BulkRowStatus,
+	BulkUserResult,
+	BulkUsersResponse,
+	BulkRoleRequest,
+	BulkRoleResponse,
+	ExportFormat
+)
+from ..auth.cache import token_cache
+from ..auth.service import AuthenticationService, AsyncAuthenticationService
+from ..config import settings
+from ..database import Database, AsyncDatabase, RepositoryException, decode_cursor
+from ..metrics import instrument_methods
 from ..models import RoleNameEnum, User
 
 
+BulkBatch = List[Tuple[int, UserCreate]]
+
+
+def _validate_bulk_records(records: List[dict]) -> Tuple[List[Optional[BulkUserResult]], BulkBatch]:
+	"""
+	Return: a result slot per record (filled for invalid and repeated ones) and the records to insert
+	"""
+	results: List[Optional[BulkUserResult]] = [None] * len(records)
+	valid: BulkBatch = []
+	seen = set()
+	for index, record in enumerate(records):
+		try:
+			user = UserCreate.parse_obj(record)
+		except ValidationError as err:
+			email = record.get('email') if isinstance(record, dict) else None
+			results[index] = BulkUserResult(
+				index=index,
+				email=email if isinstance(email, str) else None,
+				status=BulkRowStatus.INVALID,
+				detail='; '.join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in err.errors()),
+			)
+			continue
+
+		if user.email in seen:
+			results[index] = BulkUserResult(index=index, email=user.email, status=BulkRowStatus.DUPLICATE,
+			                                detail="Email repeated in this import")
+			continue
+
+		seen.add(user.email)
+		valid.append((index, user))
+
+	return results, valid
+
+
+def _bulk_batches(valid: BulkBatch) -> List[BulkBatch]:
+	batch_size = max(int(settings.BULK_INSERT_BATCH_SIZE), 1)
+	return [valid[start:start + batch_size] for start in range(0, len(valid), batch_size)]
+
+
+def _bulk_rows(batch: BulkBatch, passwords: List[str]) -> List[dict]:
+	return [dict(user, password=password) for (_, user), password in zip(batch, passwords)]
+
+
+def _mark_bulk_batch(results: List[Optional[BulkUserResult]], batch: BulkBatch,
+                     created: Optional[Dict[str, int]], detail: str = None):
+	for index, user in batch:
+		if created is None:
+			results[index] = BulkUserResult(index=index, email=user.email, status=BulkRowStatus.ERROR, detail=detail)
+		elif user.email in created:
+			results[index] = BulkUserResult(index=index, email=user.email, id=created[user.email],
+			                                status=BulkRowStatus.CREATED)
+		else:
+			results[index] = BulkUserResult(index=index, email=user.email, status=BulkRowStatus.EXISTS,
+			                                detail="Already exist with this email")
+
+
+def _bulk_role_response(request: BulkRoleRequest, changed: List[int]) -> BulkRoleResponse:
+	for user_id in changed:
+		token_cache.invalidate_user(user_id)
+
+	unchanged = sorted(set(request.user_ids).difference(changed))
+	return BulkRoleResponse(role=request.role, changed=changed, unchanged=unchanged)
+
+
+def _bulk_response(results: List[BulkUserResult]) -> BulkUsersResponse:
+	created = sum(1 for result in results if result.status == BulkRowStatus.CREATED)
+	return BulkUsersResponse(created=created, failed=len(results) - created, results=results)
+
+
+@instrument_methods
 class UserService:
 	def __init__(self, db: Database):
 		self.__db = db
 		self.__logger = FastApiAuthLogger("user service", LogLevel.INFO)
+		self.__auth_service = AuthenticationService(db)
 		self._user_repository = UserRepository(db)
 
 	@property
@@ -25,74 +122,116 @@ class UserService:
 	def repository(self, db: Database):
 		self._user_repository = UserRepository(db)
 
-	def get_all_users(self, skip: int = 0, limit: int = 100) -> List[LiteUser]:
+	def get_all_users(self, skip: int = 0, limit: int = 100, options: Sequence[LoaderOption] = ()) -> List[LiteUser]:
+		"""
+		Return: LiteUser column rows; User entities only when loader options ask for relationships
+		"""
 		try:
-			users = self._user_repository.get_all(skip, limit)
-			self.__logger.info(f"Method[{self.get_all_users.__name__}]: Success")
+			columns = () if options else lite_user_columns
+			users = self._user_repository.get_all(skip, limit, options, columns)
+			self.__logger.info("Method[%s]: Success", self.get_all_users.__name__)
 			return users
 
 		except RepositoryException as re:
-			self.__logger.error(f"Method[{self.get_all_users.__name__}]({str(re.message)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.get_all_users.__name__, re.message)
 			raise HTTPException(status_code=re.status_code, detail=str(re.message))
 
 		except HTTPException as http_err:
-			self.__logger.error(f"Method[{self.get_all_users.__name__}]({str(http_err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.get_all_users.__name__, http_err)
 			raise http_err
 
 		except Exception as err:
-			self.__logger.error(f"Method[{self.get_all_users.__name__}]({str(err.args[0])}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.get_all_users.__name__, err.args[0])
 			raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
 			                    detail=str(err.args[0]))
 
+	def get_users_after(self, cursor: str, limit: int = 100) -> List[LiteUser]:
+		try:
+			users = self._user_repository.get_page(decode_cursor(cursor) if cursor else None, limit,
+			                                       columns=lite_user_columns)
+			self.__logger.info("Method[%s]: Success", self.get_users_after.__name__)
+			return users
+
+		except RepositoryException as re:
+			self.__logger.error("Method[%s](%s): Error", self.get_users_after.__name__, re.message)
+			raise HTTPException(status_code=re.status_code, detail=str(re.message))
+
+		except Exception as err:
+			self.__logger.error("Method[%s](%s): Error", self.get_users_after.__name__, err)
+			raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+			                    detail=str(err))
+
 	def create(self, user: UserCreate) -> UserTokenResponse:
 		try:
-			self.__is_user_exist(user)
-			user.password = auth_service.password_hash(user.password)
+			user.password = self.__auth_service.password_hash(user.password)
 			created_user = self._user_repository.create(user)
 			user_token = self.__create_user_token_response(created_user)
-			self.__logger.info(f"Method[{self.create.__name__}]: Success")
+			self.__logger.info("Method[%s]: Success", self.create.__name__)
 			return user_token
 
 		except RepositoryException as re:
-			self.__logger.error(f"Method[{self.create.__name__}]({str(re.message)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.create.__name__, re.message)
 			raise HTTPException(status_code=re.status_code, detail=str(re.message))
 
 		except HTTPException as http_err:
-			self.__logger.error(f"Method[{self.create.__name__}]({str(http_err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.create.__name__, http_err)
 			raise http_err
 
 		except Exception as err:
-			self.__logger.error(f"Method[{self.create.__name__}]({str(err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.create.__name__, err)
 			raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
 			                    detail=str(err))
 
+	def bulk_create(self, records: List[dict]) -> BulkUsersResponse:
+		results, valid = _validate_bulk_records(records)
+		for batch in _bulk_batches(valid):
+			try:
+				passwords = self.__auth_service.hash_many([user.password for _, user in batch])
+				created = self._user_repository.bulk_create(_bulk_rows(batch, passwords), RoleNameEnum.USER)
+			except Exception as err:
+				self.__db.rollback()
+				self.__logger.error("Method[%s](%s): Error", self.bulk_create.__name__, err)
+				_mark_bulk_batch(results, batch, None, str(err))
+				continue
+
+			_mark_bulk_batch(results, batch, created)
+
+		response = _bulk_response(results)
+		self.__logger.info("Method[%s](%s/%s): Success", self.bulk_create.__name__, response.created, len(records))
+		return response
+
 	def get_by_id(self, user_id: int) -> LiteUser:
 		try:
-			user: LiteUser = self._user_repository.get_by_id(user_id)
-			self.__logger.info(f"{self.get_by_id.__name__} Success")
+			user: LiteUser = self._user_repository.get_by_id(user_id, columns=versioned_lite_user_columns)
+			self.__logger.info("Method[%s]: Success", self.get_by_id.__name__)
 			return user
 
 		except HTTPException as http_err:
-			self.__logger.error(f"Method[{self.get_by_id.__name__}]({str(http_err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.get_by_id.__name__, http_err)
 			raise http_err
 
 		except Exception as err:
-			self.__logger.error(f"Method[{self.get_by_id.__name__}]({str(err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.get_by_id.__name__, err)
 			raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
 			                    detail=str(err))
 
 	def delete(self, user_id: int) -> LiteUser:
 		try:
 			user: LiteUser = self._user_repository.delete(user_id)
-			self.__logger.info(f"Method[{self.delete.__name__}]: Success")
+			token_cache.invalidate_user(user_id)
+			self.__logger.info("Method[%s]: Success", self.delete.__name__)
 			return user
 
+		except RepositoryException as re:
+			self.__logger.error("Method[%s](%s): Error", self.delete.__name__, re.message)
+			raise HTTPException(status_code=re.status_code, detail=str(re.message))
+
 		except HTTPException as http_err:
-			self.__logger.error(f"Method[{self.delete.__name__}]({str(http_err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.delete.__name__, http_err)
 			raise http_err
 
 		except Exception as err:
-			self.__logger.error(f"Method[{self.delete.__name__}]({str(err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.delete.__name__, err)
 			raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
 			                    detail=str(err))
 
@@ -100,63 +239,126 @@ class UserService:
 		try:
 			self.__is_user_exist(user)
 			if user.password is not None:
-				user.password = auth_service.password_hash(user.password)
+				user.password = self.__auth_service.password_hash(user.password)
 			updated_user: LiteUser = self._user_repository.update(user_id, user)
+			token_cache.invalidate_user(user_id)
 			user_token = self.__create_user_token_response(updated_user)
-			self.__logger.info(f"{self.update.__name__} Success")
+			self.__logger.info("Method[%s]: Success", self.update.__name__)
 			return user_token
 
+		except RepositoryException as re:
+			self.__logger.error("Method[%s](%s): Error", self.update.__name__, re.message)
+			raise HTTPException(status_code=re.status_code, detail=str(re.message))
+
 		except HTTPException as http_err:
-			self.__logger.error(f"Method[{self.update.__name__}]({str(http_err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.update.__name__, http_err)
 			raise http_err
 
 		except Exception as err:
-			self.__logger.error(f"Method[{self.update.__name__}]({str(err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.update.__name__, err)
 			raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
 			                    detail=str(err))
 
-	def get_user_roles(self, user_id: int) -> UserRoles:
+	def export_users(self, export_format: ExportFormat) -> Iterator[str]:
+		"""
+		Stream all users with their roles as `export_format` text chunks. The response has
+		already started when rows are read, so failures are logged and end the stream.
+		"""
 		try:
-			user = self._user_repository.get_by_id(user_id)
-			user_roles: UserRoles = UserRoles.from_orm(user)
-			self.__logger.info(f"{self.get_user_roles.__name__} Success")
-			return user_roles
+			rows = self._user_repository.iter_users_with_roles(settings.EXPORT_BATCH_SIZE)
+			yield from export_chunks(rows, export_format, settings.EXPORT_BATCH_SIZE)
+			self.__logger.info("Method[%s]: Success", self.export_users.__name__)
+
+		except Exception as err:
+			self.__logger.error("Method[%s](%s): Error", self.export_users.__name__, err)
+			raise
+
+	def get_version(self, user_id: int) -> Optional[Row]:
+		"""
+		Return: id, version and updated_at for conditional GETs, None when the user does not exist
+		"""
+		return self._user_repository.get_version(user_id)
+
+	def get_user_roles(self, user_id: int) -> User:
+		"""
+		Return: the user entity with roles loaded (UserRoles fields plus the version)
+		"""
+		try:
+			user: User = self._user_repository.get_by_id(user_id, (load_user_roles,))
+			self.__logger.info("Method[%s]: Success", self.get_user_roles.__name__)
+			return user
 		except HTTPException as http_err:
-			self.__logger.error(f"Method[{self.get_user_roles.__name__}]({str(http_err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.get_user_roles.__name__, http_err)
 			raise http_err
 
 		except Exception as err:
-			self.__logger.error(f"Method[{self.get_user_roles.__name__}]({str(err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.get_user_roles.__name__, err)
 			raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
 			                    detail="Cannot get role this user")
 
 	def add_role_for_user(self, user_id: int, role: RoleNameEnum) -> UserRoles:
 		try:
 			user = self._user_repository.add_role(user_id, role)
+			token_cache.invalidate_user(user_id)
 			user_roles: UserRoles = UserRoles.from_orm(user)
-			self.__logger.info(f"{self.add_role_for_user.__name__} Success")
+			self.__logger.info("Method[%s]: Success", self.add_role_for_user.__name__)
 			return user_roles
 		except HTTPException as http_err:
-			self.__logger.error(f"Method[{self.add_role_for_user.__name__}]({str(http_err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.add_role_for_user.__name__, http_err)
 			raise http_err
 
 		except Exception as err:
-			self.__logger.error(f"Method[{self.add_role_for_user.__name__}]({str(err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.add_role_for_user.__name__, err)
 			raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
 			                    detail=str(err))
 
 	def delete_user_role(self, user_id: int, role: RoleNameEnum) -> UserRoles:
 		try:
 			user = self._user_repository.delete_role(user_id, role)
+			token_cache.invalidate_user(user_id)
 			user_roles: UserRoles = UserRoles.from_orm(user)
-			self.__logger.info(f"{self.delete_user_role.__name__} Success")
+			self.__logger.info("Method[%s]: Success", self.delete_user_role.__name__)
 			return user_roles
 		except HTTPException as http_err:
-			self.__logger.error(f"Method[{self.delete_user_role.__name__}]({str(http_err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.delete_user_role.__name__, http_err)
 			raise http_err
 
 		except Exception as err:
-			self.__logger.error(f"Method[{self.delete_user_role.__name__}]({str(err)}): Error")
+			self.__logger.error("Method[%s](%s): Error", self.delete_user_role.__name__, err)
+			raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+			                    detail=str(err))
+
+	def bulk_add_role(self, request: BulkRoleRequest) -> BulkRoleResponse:
+		try:
+			changed = self._user_repository.bulk_add_role(request.user_ids, request.role)
+			response = _bulk_role_response(request, changed)
+			self.__logger.info("Method[%s](%s/%s): Success", self.bulk_add_role.__name__, len(changed), len(request.user_ids))
+			return response
+
+		except RepositoryException as re:
+			self.__logger.error("Method[%s](%s): Error", self.bulk_add_role.__name__, re.message)
+			raise HTTPException(status_code=re.status_code, detail=str(re.message))
+
+		except Exception as err:
+			self.__db.rollback()
+			self.__logger.error("Method[%s](%s): Error", self.bulk_add_role.__name__, err)
+			raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+			                    detail=str(err))
+
+	def bulk_delete_role(self, request: BulkRoleRequest) -> BulkRoleResponse:
+		try:
+			changed = self._user_repository.bulk_delete_role(request.user_ids, request.role)
+			response = _bulk_role_response(request, changed)
+			self.__logger.info("Method[%s](%s/%s): Success", self.bulk_delete_role.__name__, len(changed), len(request.user_ids))
+			return response
+
+		except RepositoryException as re:
+			self.__logger.error("Method[%s](%s): Error", self.bulk_delete_role.__name__, re.message)
+			raise HTTPException(status_code=re.status_code, detail=str(re.message))
+
+		except Exception as err:
+			self.__db.rollback()
+			self.__logger.error("Method[%s](%s): Error", self.bulk_delete_role.__name__, err)
 			raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
 			                    detail=str(err))
 
@@ -174,8 +376,277 @@ class UserService:
 			                    detail="Already exist with this email")
 
 	def __create_user_token_response(self, user) -> UserTokenResponse:
-		user_dict = UserCreate.from_orm(user).dict()
-		access_token = auth_service.create_token(data=user_dict)
+		user_dict = self.__auth_service.token_claims(user)
+		access_token = self.__auth_service.create_token(data=user_dict)
+		user_token = UserTokenResponse(
+			id=user.id,
+			username=user.email,
+			email=user.email,
+			token=access_token,
+		)
+		return user_token
+
+
+@instrument_methods
+class AsyncUserService:
+	def __init__(self, db: AsyncDatabase):
+		self.__db = db
+		self.__logger = FastApiAuthLogger("user service", LogLevel.INFO)
+		self.__auth_service = AsyncAuthenticationService(db)
+		self._user_repository = AsyncUserRepository(db)
+
+	@property
+	def repository(self):
+		return self._user_repository
+
+	@repository.setter
+	def repository(self, db: AsyncDatabase):
+		self._user_repository = AsyncUserRepository(db)
+
+	async def get_all_users(self, skip: int = 0, limit: int = 100) -> List[LiteUser]:
+		try:
+			users = await self._user_repository.get_all(skip, limit, lite_user_columns)
+			self.__logger.info("Method[%s]: Success", self.get_all_users.__name__)
+			return users
+
+		except RepositoryException as re:
+			self.__logger.error("Method[%s](%s): Error", self.get_all_users.__name__, re.message)
+			raise HTTPException(status_code=re.status_code, detail=str(re.message))
+
+		except HTTPException as http_err:
+			self.__logger.error("Method[%s](%s): Error", self.get_all_users.__name__, http_err)
+			raise http_err
+
+		except Exception as err:
+			self.__logger.error("Method[%s](%s): Error", self.get_all_users.__name__, err.args[0])
+			raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+			                    detail=str(err.args[0]))
+
+	async def get_users_after(self, cursor: str, limit: int = 100) -> List[LiteUser]:
+		try:
+			users = await self._user_repository.get_page(decode_cursor(cursor) if cursor else None, limit,
+			                                             lite_user_columns)
+			self.__logger.info("Method[%s]: Success", self.get_users_after.__name__)
+			return users
+
+		except RepositoryException as re:
+			self.__logger.error("Method[%s](%s): Error", self.get_users_after.__name__, re.message)
+			raise HTTPException(status_code=re.status_code, detail=str(re.message))
+
+		except Exception as err:
+			self.__logger.error("Method[%s](%s): Error", self.get_users_after.__name__, err)
+			raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+			                    detail=str(err))
+
+	async def create(self, user: UserCreate) -> UserTokenResponse:
+		try:
+			user.password = await self.__auth_service.hash_async(user.password)
+			created_user = await self._user_repository.create(user)
+			user_token = self.__create_user_token_response(created_user)
+			self.__logger.info("Method[%s]: Success", self.create.__name__)
+			return user_token
+
+		except RepositoryException as re:
+			self.__logger.error("Method[%s](%s): Error", self.create.__name__, re.message)
+			raise HTTPException(status_code=re.status_code, detail=str(re.message))
+
+		except HTTPException as http_err:
+			self.__logger.error("Method[%s](%s): Error", self.create.__name__, http_err)
+			raise http_err
+
+		except Exception as err:
+			self.__logger.error("Method[%s](%s): Error", self.create.__name__, err)
+			raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                    detail=str(err))
+
+	async def bulk_create(self, records: List[dict]) -> BulkUsersResponse:
+		results, valid = _validate_bulk_records(records)
+		for batch in _bulk_batches(valid):
+			try:
+				passwords = await self.__auth_service.hash_many_async([user.password for _, user in batch])
+				created = await self._user_repository.bulk_create(_bulk_rows(batch, passwords), RoleNameEnum.USER)
+			except Exception as err:
+				await self.__db.rollback()
+				self.__logger.error("Method[%s](%s): Error", self.bulk_create.__name__, err)
+				_mark_bulk_batch(results, batch, None, str(err))
+				continue
+
+			_mark_bulk_batch(results, batch, created)
+
+		response = _bulk_response(results)
+		self.__logger.info("Method[%s](%s/%s): Success", self.bulk_create.__name__, response.created, len(records))
+		return response
+
+	async def get_by_id(self, user_id: int) -> LiteUser:
+		try:
+			user: LiteUser = await self._user_repository.get_by_id(user_id, versioned_lite_user_columns)
+			self.__logger.info("Method[%s]: Success", self.get_by_id.__name__)
+			return user
+
+		except HTTPException as http_err:
+			self.__logger.error("Method[%s](%s): Error", self.get_by_id.__name__, http_err)
+			raise http_err
+
+		except Exception as err:
+			self.__logger.error("Method[%s](%s): Error", self.get_by_id.__name__, err)
+			raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                    detail=str(err))
+
+	async def delete(self, user_id: int) -> LiteUser:
+		try:
+			user: LiteUser = await self._user_repository.delete(user_id)
+			token_cache.invalidate_user(user_id)
+			self.__logger.info("Method[%s]: Success", self.delete.__name__)
+			return user
+
+		except RepositoryException as re:
+			self.__logger.error("Method[%s](%s): Error", self.delete.__name__, re.message)
+			raise HTTPException(status_code=re.status_code, detail=str(re.message))
+
+		except HTTPException as http_err:
+			self.__logger.error("Method[%s](%s): Error", self.delete.__name__, http_err)
+			raise http_err
+
+		except Exception as err:
+			self.__logger.error("Method[%s](%s): Error", self.delete.__name__, err)
+			raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                    detail=str(err))
+
+	async def update(self, user_id: int, user: UserUpdate) -> UserTokenResponse:
+		try:
+			await self.__is_user_exist(user)
+			if user.password is not None:
+				user.password = await self.__auth_service.hash_async(user.password)
+			options = (load_users_roles,) if self.__auth_service.claims_options else ()
+			updated_user: LiteUser = await self._user_repository.update(user_id, user, options)
+			token_cache.invalidate_user(user_id)
+			user_token = self.__create_user_token_response(updated_user)
+			self.__logger.info("Method[%s]: Success", self.update.__name__)
+			return user_token
+
+		except RepositoryException as re:
+			self.__logger.error("Method[%s](%s): Error", self.update.__name__, re.message)
+			raise HTTPException(status_code=re.status_code, detail=str(re.message))
+
+		except HTTPException as http_err:
+			self.__logger.error("Method[%s](%s): Error", self.update.__name__, http_err)
+			raise http_err
+
+		except Exception as err:
+			self.__logger.error("Method[%s](%s): Error", self.update.__name__, err)
+			raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                    detail=str(err))
+
+	async def export_users(self, export_format: ExportFormat) -> AsyncIterator[str]:
+		try:
+			rows = self._user_repository.iter_users_with_roles(settings.EXPORT_BATCH_SIZE)
+			async for chunk in export_chunks_async(rows, export_format, settings.EXPORT_BATCH_SIZE):
+				yield chunk
+			self.__logger.info("Method[%s]: Success", self.export_users.__name__)
+
+		except Exception as err:
+			self.__logger.error("Method[%s](%s): Error", self.export_users.__name__, err)
+			raise
+
+	async def get_version(self, user_id: int) -> Optional[Row]:
+		return await self._user_repository.get_version(user_id)
+
+	async def get_user_roles(self, user_id: int) -> User:
+		try:
+			user: User = await self._user_repository.get_by_id(user_id)
+			self.__logger.info("Method[%s]: Success", self.get_user_roles.__name__)
+			return user
+		except HTTPException as http_err:
+			self.__logger.error("Method[%s](%s): Error", self.get_user_roles.__name__, http_err)
+			raise http_err
+
+		except Exception as err:
+			self.__logger.error("Method[%s](%s): Error", self.get_user_roles.__name__, err)
+			raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			                    detail="Cannot get role this user")
+
+	async def add_role_for_user(self, user_id: int, role: RoleNameEnum) -> UserRoles:
+		try:
+			user = await self._user_repository.add_role(user_id, role)
+			token_cache.invalidate_user(user_id)
+			user_roles: UserRoles = UserRoles.from_orm(user)
+			self.__logger.info("Method[%s]: Success", self.add_role_for_user.__name__)
+			return user_roles
+		except HTTPException as http_err:
+			self.__logger.error("Method[%s](%s): Error", self.add_role_for_user.__name__, http_err)
+			raise http_err
+
+		except Exception as err:
+			self.__logger.error("Method[%s](%s): Error", self.add_role_for_user.__name__, err)
+			raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+			                    detail=str(err))
+
+	async def delete_user_role(self, user_id: int, role: RoleNameEnum) -> UserRoles:
+		try:
+			user = await self._user_repository.delete_role(user_id, role)
+			token_cache.invalidate_user(user_id)
+			user_roles: UserRoles = UserRoles.from_orm(user)
+			self.__logger.info("Method[%s]: Success", self.delete_user_role.__name__)
+			return user_roles
+		except HTTPException as http_err:
+			self.__logger.error("Method[%s](%s): Error", self.delete_user_role.__name__, http_err)
+			raise http_err
+
+		except Exception as err:
+			self.__logger.error("Method[%s](%s): Error", self.delete_user_role.__name__, err)
+			raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+			                    detail=str(err))
+
+	async def bulk_add_role(self, request: BulkRoleRequest) -> BulkRoleResponse:
+		try:
+			changed = await self._user_repository.bulk_add_role(request.user_ids, request.role)
+			response = _bulk_role_response(request, changed)
+			self.__logger.info("Method[%s](%s/%s): Success", self.bulk_add_role.__name__, len(changed), len(request.user_ids))
+			return response
+
+		except RepositoryException as re:
+			self.__logger.error("Method[%s](%s): Error", self.bulk_add_role.__name__, re.message)
+			raise HTTPException(status_code=re.status_code, detail=str(re.message))
+
+		except Exception as err:
+			await self.__db.rollback()
+			self.__logger.error("Method[%s](%s): Error", self.bulk_add_role.__name__, err)
+			raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+			                    detail=str(err))
+
+	async def bulk_delete_role(self, request: BulkRoleRequest) -> BulkRoleResponse:
+		try:
+			changed = await self._user_repository.bulk_delete_role(request.user_ids, request.role)
+			response = _bulk_role_response(request, changed)
+			self.__logger.info("Method[%s](%s/%s): Success", self.bulk_delete_role.__name__, len(changed), len(request.user_ids))
+			return response
+
+		except RepositoryException as re:
+			self.__logger.error("Method[%s](%s): Error", self.bulk_delete_role.__name__, re.message)
+			raise HTTPException(status_code=re.status_code, detail=str(re.message))
+
+		except Exception as err:
+			await self.__db.rollback()
+			self.__logger.error("Method[%s](%s): Error", self.bulk_delete_role.__name__, err)
+			raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+			                    detail=str(err))
+
+	def has_role(self, user: User, role: RoleNameEnum) -> bool:
+		for user_role in user.roles:
+			if role.value == user_role.name:
+				return True
+
+		return False
+
+	async def __is_user_exist(self, user: Union[UserCreate, UserUpdate]):
+		isExist = await self._user_repository.get_user_by_email(user.email)
+		if isExist is not None:
+			raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+			                    detail="Already exist with this email")
+
+	def __create_user_token_response(self, user) -> UserTokenResponse:
+		user_dict = self.__auth_service.token_claims(user)
+		access_token = self.__auth_service.create_token(data=user_dict)
 		user_token = UserTokenResponse(
 			id=user.id,
 			username=user.email,